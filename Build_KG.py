@@ -1,6 +1,8 @@
 # run.py
+from pathlib import Path
 from Create_KG import KnowledgeGraphCreator
 from RAG import HistoricalQA
+from langchain_community.embeddings import OpenAIEmbeddings
 
 def main():
     # 1. 创建知识图谱
@@ -10,21 +12,51 @@ def main():
         password="12345678" # 为创建过程中的初始密码
     )
     
-    print("正在处理JSON数据...")
-    df = creator.json_to_csv("./data/re")
+    # 已有列式三元组时直接读取（RE数据更新后删除该文件即可重新解析），否则解析JSON并同时写出CSV和Parquet
+    if Path("triples.parquet").exists():
+        print("正在读取三元组 triples.parquet...")
+        df = creator.load_triples("triples.parquet")
+    else:
+        print("正在处理JSON数据...")
+        df = creator.json_to_csv("./data/re", output_format="both")
     
     print("\n正在连接知识图谱数据库...")
-    creator.connect_to_neo4j()
+    creator.connect_to_neo4j()  # 小型部署可改用 creator.connect_to_sqlite("./kg_artifacts/graph.sqlite")，无需Neo4j服务
     
     print("\n正在清空数据库...")
     creator.clear_database()
     
     print("\n正在导入数据至知识图谱...")
-    creator.create_knowledge_graph(df)
+    creator.create_knowledge_graph(
+        df,
+        workers=4,  # 并发写入线程数，设为1则逐条写入
+        sentence_nodes=True  # 原文句子只存一份，关系通过 context_id 引用
+    )
     creator.verify_import()
 
+    print("\n正在计算图谱中心度和社区...")
+    creator.compute_graph_analytics("./kg_artifacts/graph_analytics.npz")
+    creator.export_typeahead_index("./kg_artifacts/typeahead.npz")
+
+    print("\n正在导出图谱快照...")
+    creator.export_snapshot(df, "./kg_artifacts/kg_snapshot.bin")
+    creator.export_era_index(df, "./kg_artifacts/era_index.npz")
+
+    print("\n正在导出三元组向量产物...")
+    creator.export_embedding_artifact(
+        df,
+        OpenAIEmbeddings(model="text-embedding-ada-002"),
+        output_dir="./kg_artifacts/embeddings"
+    )
+
     # 2. 初始化问答系统
-    qa_system = HistoricalQA(creator.graph)
+    qa_system = HistoricalQA(
+        creator.graph,
+        embedding_artifact="./kg_artifacts/embeddings",
+        snapshot_path="./kg_artifacts/kg_snapshot.bin",
+        era_index="./kg_artifacts/era_index.npz",
+        max_neighbors=50  # 高度数实体只检索重要度最高的50个邻居
+    )
     
     # 3. 测试问答
     questions = [
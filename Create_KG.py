@@ -3,6 +3,8 @@ import pandas as pd
 from pathlib import Path
 from langchain_community.graphs import Neo4jGraph
 from typing import Dict, List, Optional
+from embedding_artifact import write_embedding_artifact, context_id
+from kg_snapshot import build_snapshot, write_snapshot
 
 class KnowledgeGraphCreator:
     # 实体类型映射和颜色
@@ -29,8 +31,14 @@ class KnowledgeGraphCreator:
         '别名': '#D8BFD8'
     }
 
-    def __init__(self, neo4j_url: str, username: str, password: str):
-        """初始化知识图谱创建器"""
+    # 记录图谱版本号的元数据节点标签
+    GRAPH_META_LABEL = 'KGMeta'
+
+    # 句子节点模式下原文句子的节点标签
+    SENTENCE_LABEL = 'Sentence'
+
+    def __init__(self, neo4j_url: Optional[str] = None, username: Optional[str] = None, password: Optional[str] = None):
+        """初始化知识图谱创建器（使用SQLite嵌入式图谱时无需Neo4j连接参数）"""
         self.graph = None
         self.neo4j_url = neo4j_url
         self.username = username
@@ -83,8 +91,15 @@ class KnowledgeGraphCreator:
             
         return triples
 
-    def json_to_csv(self, data_folder: str) -> pd.DataFrame:
-        """将JSON数据处理并转换为CSV"""
+    def json_to_csv(self, data_folder: str, output_format: str = "csv") -> pd.DataFrame:
+        """
+        将JSON数据处理并转换为CSV
+        Args:
+            data_folder: RE数据目录
+            output_format: 输出格式，"csv"、"parquet"（字典编码的列式存储）或 "both"
+        """
+        if output_format not in ("csv", "parquet", "both"):
+            raise ValueError(f"不支持的输出格式: {output_format}")
         re_folder = Path(data_folder)
         all_triples = []
         
@@ -114,11 +129,23 @@ class KnowledgeGraphCreator:
                 'context'
             ])
             df = df.drop_duplicates(subset=['head_entity', 'relation', 'tail_entity'])
-            df.to_csv('triples.csv', index=False)
-            print("\n结果已保存至 triples.csv")
+            if output_format in ("csv", "both"):
+                df.to_csv('triples.csv', index=False)
+                print("\n结果已保存至 triples.csv")
+            if output_format in ("parquet", "both"):
+                from triples_store import write_triples_parquet
+                write_triples_parquet(df, 'triples.parquet')
+                print("\n结果已保存至 triples.parquet")
             return df
         return pd.DataFrame()
 
+    def load_triples(self, path: str = "triples.csv") -> pd.DataFrame:
+        """读取 json_to_csv 输出的三元组，按文件后缀选择CSV或Parquet格式"""
+        if Path(path).suffix == ".parquet":
+            from triples_store import read_triples_parquet
+            return read_triples_parquet(path)
+        return pd.read_csv(path)
+
     def connect_to_neo4j(self) -> None:
         """连接到Neo4j数据库"""
         try:
@@ -133,21 +160,89 @@ class KnowledgeGraphCreator:
             print(f"连接Neo4j数据库失败: {str(e)}")
             raise
 
+    def connect_to_sqlite(self, path: str = "./kg_artifacts/graph.sqlite") -> None:
+        """打开（不存在时创建）SQLite嵌入式图谱，用于无Neo4j服务的小型部署"""
+        from sqlite_graph import SQLiteGraph
+        self.graph = SQLiteGraph(path)
+        print(f"已打开SQLite图谱: {path}")
+
+    @property
+    def embedded(self) -> bool:
+        """当前是否连接的是SQLite嵌入式图谱"""
+        from sqlite_graph import SQLiteGraph
+        return isinstance(self.graph, SQLiteGraph)
+
     def clear_database(self) -> None:
         """清空数据库"""
         try:
-            self.graph.query("MATCH (n) DETACH DELETE n")
+            if self.embedded:
+                self.graph.clear()
+                print("数据库已完全清空")
+                return
+            # 保留图谱元数据节点，使版本号在重新导入后继续递增
+            self.graph.query(f"MATCH (n) WHERE NOT n:{self.GRAPH_META_LABEL} DETACH DELETE n")
             self.graph.query("CALL apoc.schema.assert({},{}); ")
             print("数据库已完全清空")
         except Exception as e:
             print(f"清空数据库时出错: {str(e)}")
 
-    def create_knowledge_graph(self, df: pd.DataFrame) -> None:
-        """创建知识图谱"""
-        # 创建索引
+    def create_indexes(self, sentence_nodes: bool = False) -> None:
+        """
+        为各实体标签的name属性创建索引，句子节点模式下为句子id创建唯一约束，
+        并为各关系类型的 context_id 创建索引（按年号索引得到的句子取关系）
+        """
+        if self.embedded:
+            # SQLite图谱的索引随表结构一同创建
+            return
         for entity_info in self.ENTITY_LABEL_MAP.values():
             label = entity_info['label']
             self.graph.query(f"CREATE INDEX IF NOT EXISTS FOR (n:{label}) ON (n.name)")
+        if sentence_nodes:
+            self.graph.query(
+                f"CREATE CONSTRAINT IF NOT EXISTS FOR (s:{self.SENTENCE_LABEL}) REQUIRE s.id IS UNIQUE"
+            )
+            for relation_type in self.RELATION_COLOR_MAP:
+                self.graph.query(f"CREATE INDEX IF NOT EXISTS FOR ()-[r:{relation_type}]-() ON (r.context_id)")
+
+    def create_knowledge_graph(
+        self,
+        df: pd.DataFrame,
+        workers: int = 1,
+        batch_size: int = 500,
+        sentence_nodes: bool = False
+    ) -> None:
+        """
+        创建知识图谱
+        Args:
+            df: 三元组DataFrame
+            workers: 并发写入线程数，大于1时使用分区并发写入
+            batch_size: 并发写入时每批的节点/关系数量
+            sentence_nodes: 是否将原文句子存为Sentence节点（按内容哈希去重），关系上只保存 context_id
+        """
+        if self.embedded:
+            # SQLite图谱总是将原文句子单独存表，关系上只保存 context_id
+            counts = self.graph.write_triples(df, self.ENTITY_LABEL_MAP, self.RELATION_COLOR_MAP)
+            version = self.bump_graph_version()
+            print(f"知识图谱创建完成（{counts['entities']} 个实体，{counts['sentences']} 个句子，图谱版本: {version}）")
+            return
+
+        # 创建索引
+        self.create_indexes(sentence_nodes)
+        
+        if workers > 1:
+            from parallel_ingest import PartitionedWriter
+            writer = PartitionedWriter(
+                self.graph,
+                self.ENTITY_LABEL_MAP,
+                self.RELATION_COLOR_MAP,
+                workers=workers,
+                batch_size=batch_size,
+                sentence_label=self.SENTENCE_LABEL if sentence_nodes else None
+            )
+            writer.write(df)
+            version = self.bump_graph_version()
+            print(f"知识图谱创建完成（图谱版本: {version}）")
+            return
         
         # 创建实体节点
         for _, row in df.iterrows():
@@ -167,7 +262,12 @@ class KnowledgeGraphCreator:
             """.format(label=tail_info['label']), 
             {'name': row['tail_entity'], 'color': tail_info['color']})
         
+        # 创建句子节点
+        if sentence_nodes:
+            self.create_sentence_nodes(df, batch_size)
+        
         # 创建关系
+        context_property = 'context_id' if sentence_nodes else 'context'
         for _, row in df.iterrows():
             head_info = self.ENTITY_LABEL_MAP.get(row['head_entity_label'], {'label': 'Entity'})
             tail_info = self.ENTITY_LABEL_MAP.get(row['tail_entity_label'], {'label': 'Entity'})
@@ -180,19 +280,146 @@ class KnowledgeGraphCreator:
             MERGE (head)-[r:{relation_type}]->(tail)
             SET r.color = $relation_color,
                 r.original_type = $original_type,
-                r.context = $context
+                r.{context_property} = $context
             """, {
                 'head_name': row['head_entity'],
                 'tail_name': row['tail_entity'],
                 'relation_color': relation_color,
                 'original_type': row['relation'],
-                'context': row['context']
+                'context': context_id(row['context']) if sentence_nodes else row['context']
             })
-        print("知识图谱创建完成")
+        version = self.bump_graph_version()
+        print(f"知识图谱创建完成（图谱版本: {version}）")
+
+    def create_sentence_nodes(self, df: pd.DataFrame, batch_size: int = 500) -> int:
+        """为每个不同的原文句子创建一个Sentence节点（id为内容哈希），返回句子数"""
+        sentences = {context_id(context): context for context in df['context'].unique()}
+        rows = [{'id': sentence_id, 'text': text} for sentence_id, text in sentences.items()]
+        for start in range(0, len(rows), batch_size):
+            self.graph.query(f"""
+            UNWIND $rows AS row
+            MERGE (s:{self.SENTENCE_LABEL} {{id: row.id}})
+            SET s.text = row.text
+            """, {'rows': rows[start:start + batch_size]})
+        print(f"句子节点: {len(rows)} 个（三元组 {len(df)} 条）")
+        return len(rows)
+
+    def get_graph_version(self) -> Optional[int]:
+        """获取当前图谱版本号"""
+        result = self.graph.query(f"""
+        MATCH (m:{self.GRAPH_META_LABEL} {{key: 'graph'}})
+        RETURN m.version as version
+        """)
+        return result[0]['version'] if result else None
+
+    def bump_graph_version(self) -> int:
+        """导入完成后递增图谱版本号，使依赖旧图谱的快照和缓存失效"""
+        if self.embedded:
+            return self.graph.bump_version()
+        result = self.graph.query(f"""
+        MERGE (m:{self.GRAPH_META_LABEL} {{key: 'graph'}})
+        SET m.version = coalesce(m.version, 0) + 1,
+            m.updated_at = timestamp()
+        RETURN m.version as version
+        """)
+        return result[0]['version']
+
+    def compute_graph_analytics(self, side_index_path: Optional[str] = "./kg_artifacts/graph_analytics.npz"):
+        """
+        离线计算节点的度数、PageRank和社区编号，写回为节点属性并保存侧索引
+        需在导入完成后执行，问答系统据此按邻居重要度排序和分页检索
+        """
+        from graph_analytics import GraphAnalytics
+
+        analytics = GraphAnalytics.from_graph(self.graph)
+        if self.embedded:
+            self.graph.write_analytics(analytics)
+        else:
+            analytics.write_to_graph(self.graph)
+        if side_index_path:
+            analytics.save(side_index_path)
+        communities = int(analytics.community.max()) + 1 if len(analytics) else 0
+        print(f"图分析完成: {len(analytics)} 个节点，{communities} 个社区")
+        print("PageRank最高的实体: " + "、".join(name for (_, name), _ in analytics.top(10)))
+        return analytics
+
+    def export_typeahead_index(self, path: str = "./kg_artifacts/typeahead.npz"):
+        """导出实体名称补全索引（繁简两种写法，按度数排序），需在 compute_graph_analytics 之后执行"""
+        from entity_typeahead import EntityTypeahead
+
+        index = EntityTypeahead.from_graph(self.graph, graph_version=self.get_graph_version())
+        index.save(path)
+        print(f"实体名称补全索引已保存至 {path}（{len(index)} 个实体，{len(index.keys)} 个检索键）")
+        return index
+
+    def export_era_index(self, df: pd.DataFrame, path: str = "./kg_artifacts/era_index.npz"):
+        """导出年号/干支倒排索引（时期 → 原文句子、实体），供问答系统按时期检索史料"""
+        from era_index import EraIndex
+
+        index = EraIndex.build(df, graph_version=self.get_graph_version())
+        index.save(path)
+        print(f"年号索引已保存至 {path}（{len(index)} 个时期，{len(index.context_ids)} 个句子）")
+        return index
+
+    def export_bulk_import(
+        self,
+        df: pd.DataFrame,
+        output_dir: str = "./kg_artifacts/bulk_import",
+        graph_version: int = 1,
+        sentence_nodes: bool = False
+    ) -> Dict:
+        """
+        导出 neo4j-admin database import 所需的节点和关系CSV，用于首次离线导入
+        导入完成并启动数据库后，需调用 create_indexes()（句子节点模式下传入 sentence_nodes=True）创建索引
+        """
+        from bulk_import import write_bulk_import_files, verify_bulk_import_files, import_command
+        
+        files = write_bulk_import_files(
+            df,
+            output_dir,
+            self.ENTITY_LABEL_MAP,
+            self.RELATION_COLOR_MAP,
+            self.GRAPH_META_LABEL,
+            graph_version,
+            sentence_label=self.SENTENCE_LABEL if sentence_nodes else None
+        )
+        result = verify_bulk_import_files(files)
+        print(f"导入文件已保存至 {output_dir}（{result['nodes']} 个节点，{result['relationships']} 条关系）")
+        if result['errors']:
+            print(f"导入文件校验发现 {len(result['errors'])} 个问题:")
+            for error in result['errors'][:20]:
+                print(f"  {error}")
+        else:
+            print("导入文件校验通过，可执行以下命令（需先停止数据库）:")
+            print(import_command(files))
+        return files
+
+    def export_snapshot(self, df: pd.DataFrame, path: str = "./kg_artifacts/kg_snapshot.bin") -> None:
+        """导出图谱快照（实体词表、jieba用户词典和实体关系映射），供问答系统快速启动"""
+        snapshot = build_snapshot(df, self.get_graph_version(), self.ENTITY_LABEL_MAP)
+        write_snapshot(snapshot, path)
+        print(f"图谱快照已保存至 {path}（{len(snapshot['lexicon'])} 个实体，图谱版本: {snapshot['graph_version']}）")
+
+    def export_embedding_artifact(
+        self,
+        df: pd.DataFrame,
+        embedding_model,
+        output_dir: str = "./kg_artifacts/embeddings"
+    ) -> Dict:
+        """导出三元组向量矩阵产物，供问答系统以内存映射方式加载"""
+        return write_embedding_artifact(df, embedding_model, output_dir)
 
     def verify_import(self) -> None:
         """验证导入结果"""
         print("\n知识图谱节点和关系统计:")
+        if self.embedded:
+            label_counts = self.graph.label_counts()
+            for label in ['人物', '地点', '官衔', '书籍']:
+                print(f"{label}实体数量: {label_counts.get(label, 0)}")
+            print("\n关系统计:")
+            for relation_type, count in self.graph.relation_counts().items():
+                print(f"{relation_type}: {count}")
+            return
         # 验证各类型节点数量
         for label in ['人物', '地点', '官衔', '书籍']:
             result = self.graph.query(f"""
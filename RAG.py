@@ -1,53 +1,52 @@
 # RAG.py
 import os
-import openai
+import time
 import jieba
 import jieba.posseg as pseg
 import uuid
 import asyncio
-import nest_asyncio
-nest_asyncio.apply()
-
-from typing import Dict, List, Any, Optional
-from opencc import OpenCC
-from langchain_openai import ChatOpenAI
-from langchain_community.embeddings import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_core.prompts import ChatPromptTemplate
-from langchain.chains import create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-
-
-# 缓存
-from redis import Redis
+import functools
 import pickle
 import hashlib
 
-# ragas imports
-from ragas import evaluate
-from ragas.metrics import (
-    faithfulness, 
-    answer_relevancy, 
-    context_precision,
-    context_utilization
+from typing import Dict, List, Any, Optional, Tuple, TYPE_CHECKING
+from dataclasses import dataclass
+from contextlib import contextmanager
+
+from kg_queries import (
+    ENTITY_LEXICON_QUERY,
+    ALL_RELATIONS_QUERY,
+    NEIGHBORHOOD_QUERY,
+    TYPED_NEIGHBORHOOD_QUERY,
+    RANKED_NEIGHBORHOOD_QUERY,
+    SENTENCES_QUERY,
+    CONTEXT_EDGES_QUERY,
+    GRAPH_VERSION_QUERY
 )
-from ragas.metrics.critique import SUPPORTED_ASPECTS, harmfulness
-from ragas.run_config import RunConfig
-from ragas.metrics.base import MetricWithLLM, MetricWithEmbeddings
+from query_planner import RelationQueryPlanner, RelationFilter, RelationPlan
+from fast_path import OneHopFastPath
 
-# ragas langchain wrappers
-from ragas.llms import LangchainLLMWrapper
-from ragas.embeddings import LangchainEmbeddingsWrapper
+# 评估（ragas）、追踪（langfuse）、可视化（pyvis）、缓存（redis）、向量库（FAISS）
+# 以及langchain链等较重的依赖均在首次使用时才导入，避免拖慢模块导入和应用冷启动
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
 
-# langfuse
-from langfuse.callback import CallbackHandler
-from langfuse.decorators import observe, langfuse_context
-from dataclasses import dataclass
-from langfuse import Langfuse
-from contextlib import contextmanager
 
-from pyvis.network import Network
+def _observed(func):
+    """仅在评估模式开启时才用langfuse的observe装饰器包装方法"""
+    traced = None
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        nonlocal traced
+        if not self.eval_config.enable:
+            return func(self, *args, **kwargs)
+        if traced is None:
+            from langfuse.decorators import observe
+            traced = observe()(func)
+        return traced(self, *args, **kwargs)
+
+    return wrapper
 
 @dataclass
 class EvalConfig:
@@ -56,6 +55,13 @@ class EvalConfig:
     trace_name: str = "historical_qa_eval"
     user_id: str = "default_user"
     metrics: List = None
+    # 后台评估队列：回答路径只入队，评分在后台线程中批量进行
+    sample_rate: float = 1.0       # 评估的抽样比例
+    workers: int = 2               # 后台评分线程数
+    max_queue: int = 256           # 排队任务数上限
+    batch_size: int = 8            # 每批评分的任务数
+    overflow: str = "drop"         # 队列已满时丢弃(drop)或溢写到磁盘(spill)
+    spill_path: str = "./kg_artifacts/eval_spill.jsonl"
 
 class HistoricalQA:
     def __init__(
@@ -65,7 +71,21 @@ class HistoricalQA:
         openai_api_key=None,
         langfuse_public_key=None,
         langfuse_secret_key=None,
-        eval_config: Optional[EvalConfig] = None
+        eval_config: Optional[EvalConfig] = None,
+        embedding_artifact: Optional[str] = None,
+        snapshot_path: Optional[str] = None,
+        neighborhood_cache_size: int = 1024,
+        neighborhood_cache_redis: bool = False,
+        llm=None,
+        embedding_model=None,
+        dispatcher=None,
+        relation_planning: bool = True,
+        max_neighbors: Optional[int] = None,
+        cassette_path: Optional[str] = None,
+        cassette_mode: str = "replay",
+        cassette_latency: Optional[float] = None,
+        era_index: Optional[str] = None,
+        fast_path: bool = True
     ):
         """
         初始化问答系统
@@ -76,13 +96,30 @@ class HistoricalQA:
             langfuse_public_key: Langfuse公钥
             langfuse_secret_key: Langfuse私钥
             eval_config: 评估配置
+            embedding_artifact: 图谱构建时导出的三元组向量产物目录
+            snapshot_path: 图谱构建时导出的快照文件，版本与图谱一致时跳过全图扫描
+            neighborhood_cache_size: 实体邻域缓存的最大实体数，为0时不缓存
+            neighborhood_cache_redis: 是否使用Redis作为实体邻域的二级缓存
+            llm: 自定义的对话模型（如本地测试桩），为None时使用ChatOpenAI
+            embedding_model: 自定义的向量模型，为None时使用OpenAIEmbeddings
+            dispatcher: 模型调度器（model_dispatcher.ModelDispatcher），合并并发的向量请求并对LLM调用限速
+            relation_planning: 是否根据问题中的关系关键词只检索相关类型和方向的边
+            max_neighbors: 每个实体最多检索的邻居数（按邻居的PageRank排序），为None时不限制
+            cassette_path: 模型调用录制文件（cassette.py），指定后对话模型和向量模型经录制层调用
+            cassette_mode: record（录制）、replay（离线回放，无需API密钥）或 auto（未命中时录制）
+            cassette_latency: 回放时模拟的固定延迟(秒)，为None时按录制时的耗时模拟
+            era_index: 图谱构建时导出的年号/干支倒排索引，问题限定时期时直接按索引检索史料（需关系上保存 context_id，即句子节点模式或SQLite图谱）
+            fast_path: 是否对只涉及一个实体和一种关系的直接查询式问题由图谱直接作答（不调用LLM）
         """
         self.graph = graph
+        self.startup_timings: Dict[str, float] = {}
+        init_start = time.perf_counter()
         
-        # 设置OpenAI API密钥
+        # 设置OpenAI API密钥（离线回放录制文件时不需要）
+        replay_only = cassette_path is not None and cassette_mode == "replay"
         if openai_api_key:
             os.environ["OPENAI_API_KEY"] = openai_api_key
-        elif "OPENAI_API_KEY" not in os.environ:
+        elif "OPENAI_API_KEY" not in os.environ and (llm is None or embedding_model is None) and not replay_only:
             raise ValueError("请提供OpenAI API密钥!")
         
         # 设置Langfuse密钥
@@ -93,21 +130,88 @@ class HistoricalQA:
             if "LANGFUSE_PUBLIC_KEY" not in os.environ or "LANGFUSE_SECRET_KEY" not in os.environ:
                 raise ValueError("评估模式需要提供Langfuse的公钥和私钥!")
         
-        self._init_custom_dictionary()
+        # 实体关系映射在首次使用时构建，快照可直接提供
+        self._entity_relations = None
+        
+        with self._timed("custom_dictionary"):
+            if not (snapshot_path and self._load_snapshot(snapshot_path)):
+                self._init_custom_dictionary()
         
         # 初始化LLM和Embedding模型
-        self.llm = ChatOpenAI(
-            model_name=model_name, 
-            temperature=0,
-            openai_api_key=openai_api_key
-        )
-        self.embedding_model = OpenAIEmbeddings(
-            model="text-embedding-ada-002",
-            openai_api_key=openai_api_key
-        )
+        with self._timed("models"):
+            from langchain_core.prompts import ChatPromptTemplate
+
+            chat_params = None
+            if llm is None:
+                # 默认模型的参数，录制和回放（不创建真实模型）时以同一组参数计算请求哈希
+                chat_params = {"type": "openai-chat", "model_name": model_name, "temperature": 0.0}
+                if not replay_only:
+                    from langchain_openai import ChatOpenAI
+                    llm = ChatOpenAI(
+                        model_name=model_name,
+                        temperature=0,
+                        openai_api_key=openai_api_key
+                    )
+            embedding_params = None
+            if embedding_model is None:
+                embedding_params = {"type": "OpenAIEmbeddings", "model": "text-embedding-ada-002"}
+                if not replay_only:
+                    from langchain_community.embeddings import OpenAIEmbeddings
+                    embedding_model = OpenAIEmbeddings(
+                        model="text-embedding-ada-002",
+                        openai_api_key=openai_api_key
+                    )
+            if cassette_path is not None:
+                from cassette import wrap_models
+                llm, embedding_model = wrap_models(
+                    llm,
+                    embedding_model,
+                    cassette_path,
+                    mode=cassette_mode,
+                    latency=cassette_latency,
+                    chat_params=chat_params,
+                    embedding_params=embedding_params
+                )
+            self.llm = llm
+            self.embedding_model = embedding_model
+            
+            # 调度器包装后的模型用于问答链，评估仍使用原始LLM
+            self.dispatcher = dispatcher
+            self._chain_llm = llm
+            if dispatcher is not None:
+                self.embedding_model = dispatcher.wrap_embeddings(embedding_model)
+                self._chain_llm = dispatcher.wrap_llm(llm)
+        
+        # 以内存映射方式打开预计算的三元组向量
+        self.embedding_artifact = None
+        if embedding_artifact:
+            with self._timed("embedding_artifact"):
+                try:
+                    from embedding_artifact import EmbeddingArtifact
+                    self.embedding_artifact = EmbeddingArtifact(embedding_artifact)
+                    print(f"已加载向量产物: {len(self.embedding_artifact)} 行")
+                except Exception as e:
+                    print(f"向量产物加载失败: {e}")
+                    print("系统将在线计算向量")
         
-        # 初始化转换器（简体到繁体）
-        self.cc = OpenCC('s2t')
+        # 年号/干支倒排索引
+        self.era_index = None
+        if era_index:
+            with self._timed("era_index"):
+                try:
+                    from era_index import EraIndex
+                    index = EraIndex.load(era_index)
+                    graph_version = self._get_graph_version()
+                    if graph_version is None or index.graph_version != graph_version:
+                        print(f"年号索引已过期（索引版本: {index.graph_version}，图谱版本: {graph_version}），不再按时期检索")
+                    else:
+                        self.era_index = index
+                        print(f"已加载年号索引: {len(self.era_index)} 个时期")
+                except Exception as e:
+                    print(f"年号索引加载失败: {e}")
+        
+        # 简繁转换器在首次提取名字时创建
+        self._cc = None
         
         # 初始化提示模板
         self.prompt = ChatPromptTemplate.from_template("""
@@ -131,40 +235,151 @@ class HistoricalQA:
 
         # 评估相关初始化
         self.eval_config = eval_config or EvalConfig()
+        self.eval_queue = None
         if self.eval_config.enable:
-            self._init_evaluation()
+            with self._timed("evaluation"):
+                self._init_evaluation()
+                
+                # 初始化 Langfuse 客户端
+                from langfuse import Langfuse
+                self.langfuse = Langfuse(
+                    public_key=langfuse_public_key,
+                    secret_key=langfuse_secret_key
+                )
+                
+                from eval_queue import EvaluationQueue
+                self.eval_queue = EvaluationQueue(
+                    self._score_batch,
+                    self._report_scores,
+                    workers=self.eval_config.workers,
+                    max_queue=self.eval_config.max_queue,
+                    batch_size=self.eval_config.batch_size,
+                    sample_rate=self.eval_config.sample_rate,
+                    overflow=self.eval_config.overflow,
+                    spill_path=self.eval_config.spill_path
+                )
+        
+        # Redis连接与实体关系映射均在首次使用时建立
+        self.cache_ttl = 3600  # 缓存过期时间(秒)
+        self._redis_client = None
+        self._redis_checked = False
+        
+        # 关系意图规划器
+        self.query_planner = RelationQueryPlanner() if relation_planning else None
+        self.max_neighbors = max_neighbors
+        
+        # 一跳事实问题的快速路径（依赖关系意图规划器）
+        self.fast_path = OneHopFastPath(self.query_planner) if fast_path and self.query_planner is not None else None
+        
+        # 内存分析钩子，回调参数为 (事件名, 对象)，如每个问题创建的向量存储
+        self.memory_hooks: List = []
         
-        # 初始化 Langfuse 客户端
-        if eval_config and eval_config.enable:
-            self.langfuse = Langfuse(
-                public_key=langfuse_public_key,
-                secret_key=langfuse_secret_key
+        # 实体邻域缓存，图谱重新导入（版本号变化）后自动失效
+        self.neighborhood_cache = None
+        if neighborhood_cache_size > 0:
+            from neighborhood_cache import NeighborhoodCache
+            self.neighborhood_cache = NeighborhoodCache(
+                max_entries=neighborhood_cache_size,
+                generation_fn=self._get_graph_version,
+                redis_provider=(lambda: self.redis_client) if neighborhood_cache_redis else None,
+                ttl=self.cache_ttl
             )
         
+        self.startup_timings["total"] = time.perf_counter() - init_start
+
+    @contextmanager
+    def _timed(self, stage: str):
+        """记录初始化各阶段耗时"""
+        start = time.perf_counter()
         try:
-            self.redis_client = Redis(
-                host='localhost',
-                port=6379,
-                db=0,
-                decode_responses=False
-            )
-            self.redis_client.ping()
-            print("Redis缓存服务连接成功")
-            self.cache_ttl = 3600  # 缓存过期时间(秒)
+            yield
+        finally:
+            self.startup_timings[stage] = time.perf_counter() - start
+
+    @property
+    def cc(self):
+        """简体到繁体转换器"""
+        if self._cc is None:
+            from opencc import OpenCC
+            self._cc = OpenCC('s2t')
+        return self._cc
+
+    @property
+    def redis_client(self):
+        """Redis客户端，首次访问时连接，连接失败则以无缓存模式运行"""
+        if not self._redis_checked:
+            self._redis_checked = True
+            try:
+                from redis import Redis
+                client = Redis(
+                    host='localhost',
+                    port=6379,
+                    db=0,
+                    decode_responses=False
+                )
+                client.ping()
+                print("Redis缓存服务连接成功")
+                self._redis_client = client
+            except Exception as e:
+                print(f"Redis连接失败: {e}")
+                print("系统将在无缓存模式下运行")
+                self._redis_client = None
+        return self._redis_client
+
+    @property
+    def entity_relations(self) -> Dict[str, List[Dict]]:
+        """实体关系映射表，首次访问时才扫描全图构建"""
+        if self._entity_relations is None:
+            self._init_entity_relations()
+        return self._entity_relations
+
+    def startup_report(self) -> str:
+        """生成初始化耗时报告"""
+        lines = ["HistoricalQA 初始化耗时:"]
+        for stage, seconds in self.startup_timings.items():
+            lines.append(f"  {stage:<20} {seconds * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    def memory_report(self, include_redis: bool = False) -> str:
+        """生成常驻数据结构的内存报告（深度大小），可选统计Redis中的缓存载荷"""
+        from memory_profile import resident_sizes, redis_payload_sizes, format_report
+        
+        redis_sizes = None
+        if include_redis and self.redis_client:
+            redis_sizes = redis_payload_sizes(self.redis_client)
+        return format_report(resident_sizes(self), redis_sizes)
+
+    def _get_graph_version(self) -> Optional[int]:
+        """查询图谱当前版本号"""
+        try:
+            result = self.graph.query(GRAPH_VERSION_QUERY)
         except Exception as e:
-            print(f"Redis连接失败: {e}")
-            print("系统将在无缓存模式下运行")
-            self.redis_client = None
+            print(f"查询图谱版本失败: {e}")
+            return None
+        return result[0]['version'] if result else None
+
+    def _load_snapshot(self, snapshot_path: str) -> bool:
+        """从快照加载词典和实体关系映射，快照缺失或过期时返回False"""
+        from kg_snapshot import load_snapshot, apply_userdict
+        
+        snapshot = load_snapshot(snapshot_path)
+        if snapshot is None:
+            print("未找到可用的图谱快照，将扫描全图初始化")
+            return False
+        
+        graph_version = self._get_graph_version()
+        if graph_version is None or snapshot['graph_version'] != graph_version:
+            print(f"图谱快照已过期（快照版本: {snapshot['graph_version']}，图谱版本: {graph_version}），将扫描全图初始化")
+            return False
         
-        self._init_entity_relations()
+        apply_userdict(snapshot['userdict'])
+        self._entity_relations = snapshot['entity_relations']
+        print(f"已从快照加载 {len(snapshot['lexicon'])} 个实体（图谱版本: {graph_version}）")
+        return True
 
     def _init_custom_dictionary(self):
         """初始化自定义词典"""
-        query = """
-        MATCH (n)
-        RETURN DISTINCT n.name as name, labels(n) as labels
-        """
-        results = self.graph.query(query)
+        results = self.graph.query(ENTITY_LEXICON_QUERY)
         
         for result in results:
             if result['name']:
@@ -184,6 +399,16 @@ class HistoricalQA:
 
     def _init_evaluation(self):
         """初始化评估系统"""
+        import nest_asyncio
+        nest_asyncio.apply()
+        
+        from ragas.metrics import faithfulness, answer_relevancy
+        from ragas.metrics.critique import harmfulness
+        from ragas.run_config import RunConfig
+        from ragas.metrics.base import MetricWithLLM, MetricWithEmbeddings
+        from ragas.llms import LangchainLLMWrapper
+        from ragas.embeddings import LangchainEmbeddingsWrapper
+        
         # 设置默认指标
         if not self.eval_config.metrics:
             self.eval_config.metrics = [
@@ -225,21 +450,39 @@ class HistoricalQA:
                 print(f"评估指标 {metric.name} 计算失败: {str(e)}")
         return scores
 
-    @observe()
+    def _score_batch(self, jobs) -> List[Dict]:
+        """在后台评分线程中批量计算ragas指标，同一批任务在一个事件循环中并发评分"""
+        async def score_all():
+            return await asyncio.gather(*[
+                self._score_with_ragas(job.question, job.contexts, job.answer)
+                for job in jobs
+            ])
+        
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(score_all())
+        finally:
+            loop.close()
+
+    def _report_scores(self, job, scores: Dict) -> None:
+        """将评分结果关联到问答的Langfuse追踪"""
+        print(f"评估结果（{job.question}）: {scores}")
+        if not job.trace_id:
+            return
+        for name, value in scores.items():
+            self.langfuse.score(trace_id=job.trace_id, name=name, value=value)
+
+    @_observed
     def _get_contexts(self, question: str) -> List[str]:
         """获取相关上下文"""
-        names = self._extract_names(question)
-        all_results = []
-        for name in names:
-            results = self._query_graph(name)
-            all_results.extend(results)
+        _, all_results = self._retrieve(question)
         
         return [
             f"{r['entity1']}与{r['entity2']}之间的关系是{r['relation']}。具体描述：{r['context']}" 
             for r in all_results
         ]
 
-    @observe()
+    @_observed
     def _generate_answer(self, chain, question: str, config: Dict) -> str:
         """生成答案"""
         response = chain.invoke(
@@ -252,7 +495,9 @@ class HistoricalQA:
         return response["answer"]
 
     def _answer_with_evaluation(self, chain, question: str, session_id: Optional[str] = None) -> str:
-        """带评估的问答处理"""
+        """带追踪的问答处理，评估任务只入队，由后台评估队列评分"""
+        from langfuse.callback import CallbackHandler
+        
         # 创建Langfuse处理器
         handler = CallbackHandler(
             trace_name=self.eval_config.trace_name,
@@ -278,23 +523,34 @@ class HistoricalQA:
         )
         answer = response["answer"]
         
+        from eval_queue import EvalJob
+        self.eval_queue.submit(EvalJob(
+            question=question,
+            contexts=[doc.page_content for doc in response.get("context", [])],
+            answer=answer,
+            trace_id=handler.get_trace_id(),
+            session_id=session_id
+        ))
         return answer
 
     def answer_question(self, question: str, session_id: Optional[str] = None) -> str:
         """处理问题并生成答案"""
         print(f"开始处理问题: {question}")
         
-        names = self._extract_names(question)
+        # 分词、时期识别和关系意图规划只做一次，快速路径与完整检索共用
+        analysis = self._analyze(question)
+        fast_answer = self._answer_fast(question, analysis)
+        if fast_answer is not None:
+            answer, contexts = fast_answer
+            if self.eval_queue is not None:
+                self._submit_fast_path_evaluation(question, answer, contexts, session_id)
+            return answer
+        
+        names, all_results = self._retrieve(question, analysis)
         print(f"提取到的名字: {names}")
         
         if not names:
             return "抱歉，我无法从问题中识别出人名或地名。"
-        
-        all_results = []
-        for name in names:
-            results = self._query_graph(name)
-            print(f"查询到 {name} 的结果数量: {len(results)}")
-            all_results.extend(results)
             
         if not all_results:
             return f"抱歉，我没有找到关于 {', '.join(names)} 的相关历史记载。"
@@ -302,9 +558,13 @@ class HistoricalQA:
         print(f"总共找到 {len(all_results)} 条相关记录")
         
         vector_store = self._create_vector_store(all_results)
+        for hook in self.memory_hooks:
+            hook("vector_store", vector_store)
         rag_chain = self._create_rag_chain(vector_store)
         
         try:
+            if self.eval_queue is not None:
+                return self._answer_with_evaluation(rag_chain, question, session_id)
             response = rag_chain.invoke({
                 "input": question,
                 "question": question
@@ -314,37 +574,213 @@ class HistoricalQA:
             print(f"生成答案时出错: {e}")
             return "抱歉，处理您的问题时出现了错误。"
 
+    def _analyze(self, question: str) -> Tuple[List[Tuple[str, str, str]], List[str], Optional[RelationPlan]]:
+        """分析问题，返回 (实体, 时期, 关系意图)；限定时期的问题不规划关系意图"""
+        entities = self._extract_entities(question)
+        periods = self.era_index.detect(question) if self.era_index is not None else []
+        plan = None
+        if self.query_planner is not None and entities and not periods:
+            # 只排除专有名词，"父母"等普通名词（词性n）本身可能就是关系关键词
+            plan = self.query_planner.plan(question, exclude=[word for word, _, flag in entities if flag != 'n'])
+        return entities, periods, plan
+
+    def _answer_fast(self, question: str, analysis: Optional[Tuple] = None) -> Optional[Tuple[str, List[str]]]:
+        """
+        一跳事实问题直接由图谱作答，返回 (回答, 作答所依据的原文)；
+        不适用或有歧义时返回None，由完整的RAG流程处理
+        """
+        if self.fast_path is None:
+            return None
+        entities, periods, plan = analysis or self._analyze(question)
+        if periods or plan is None:
+            return None
+        start = time.perf_counter()
+        match = self.fast_path.match(question, entities, plan)
+        if match is None:
+            return None
+        word, name, flag = match
+        relation_filter = plan.for_entity(flag)
+        # 邻域写入缓存，快速路径不适用时完整检索直接命中
+        results = self._attach_contexts(self._query_graph(name, relation_filter))
+        answer = self.fast_path.answer(word, relation_filter, results)
+        if answer is None:
+            return None
+        print(f"快速路径作答: {name} {plan.relations}（{(time.perf_counter() - start) * 1000:.1f}ms）")
+        contexts = list(dict.fromkeys(r['context'] for r in results if relation_filter.matches(r) and r.get('context')))
+        return answer, contexts
+
+    def _submit_fast_path_evaluation(
+        self,
+        question: str,
+        answer: str,
+        contexts: List[str],
+        session_id: Optional[str] = None
+    ) -> None:
+        """快速路径不经过问答链，手动创建Langfuse追踪，与完整流程一样提交评估任务"""
+        from eval_queue import EvalJob
+
+        trace_id = None
+        try:
+            trace = self.langfuse.trace(
+                name=self.eval_config.trace_name,
+                user_id=self.eval_config.user_id,
+                session_id=session_id or f"session-{str(uuid.uuid4())}",
+                input=question,
+                output=answer,
+                metadata={"fast_path": True}
+            )
+            trace_id = trace.id
+        except Exception as e:
+            print(f"创建Langfuse追踪失败: {e}")
+        self.eval_queue.submit(EvalJob(
+            question=question,
+            contexts=contexts,
+            answer=answer,
+            trace_id=trace_id,
+            session_id=session_id
+        ))
+
+    def _retrieve(self, question: str, analysis: Optional[Tuple] = None) -> Tuple[List[str], List[Dict]]:
+        """提取问题中的实体，并按识别出的关系意图检索相关的边"""
+        entities, periods, plan = analysis or self._analyze(question)
+        if periods:
+            # 年号和干支不是图谱实体，按时期索引检索，不再展开实体邻域
+            print(f"识别到的时期: {periods}")
+            parts = {part for period in periods for part in period.split(':')}
+            names = [name for word, name, _ in entities if not any(part in word for part in parts)]
+            return names + periods, self._retrieve_period(periods, names)
+        names = [name for _, name, _ in entities]
+        if plan is not None:
+            print(f"识别到的关系意图: {plan.relations}")
+        
+        all_results = []
+        for _, name, flag in entities:
+            relation_filter = plan.for_entity(flag) if plan is not None else None
+            results = self._query_graph(name, relation_filter, limit=self.max_neighbors)
+            print(f"查询到 {name} 的结果数量: {len(results)}")
+            all_results.extend(results)
+        return names, self._attach_contexts(all_results)
+
+    def _retrieve_period(self, periods: List[str], names: List[str]) -> List[Dict]:
+        """
+        检索限定时期的史料：由年号索引得到该时期的句子，一次查询取出这些句子上的全部关系，
+        优先保留涉及问题实体的关系，没有时返回该时期的全部关系（按max_neighbors截断），原文从图谱补齐
+        """
+        scope = sorted(self.era_index.context_ids_for(periods))
+        edges = self.graph.query(CONTEXT_EDGES_QUERY, {'ids': scope}) if scope else []
+        name_set = set(names)
+        related = [r for r in edges if r['entity1'] in name_set or r['entity2'] in name_set]
+        print(f"时期 {periods} 的史料: {len(scope)} 个句子、{len(edges)} 条关系，其中涉及问题实体 {len(related)} 条")
+        return self._attach_contexts(self._rank(related or edges, self.max_neighbors))
+
+    def _extract_entities(self, question: str) -> List[Tuple[str, str, str]]:
+        """提取问题中的实体，返回 (原词, 繁体名称, 词性)"""
+        entities = []
+        for word, flag in pseg.cut(question):
+            if flag in ['nr', 'ns', 'nz', 'n']:
+                entities.append((word, self.cc.convert(word), flag))
+        return entities
+
     def _extract_names(self, question: str) -> List[str]:
         """提取问题中的名字并转换为繁体"""
-        words = pseg.cut(question)
-        names = []
-        for word, flag in words:
-            if flag in ['nr', 'ns', 'nz', 'n']:
-                traditional_word = self.cc.convert(word)
-                names.append(traditional_word)
-        return names
+        return [name for _, name, _ in self._extract_entities(question)]
 
-    def _query_graph(self, name: str) -> List[Dict]:
-        """查询图数据库"""
-        query = """
-        MATCH (n1 {name: $name})-[r]->(n2)
-        RETURN 
-            n1.name as entity1,
-            type(r) as relation,
-            n2.name as entity2,
-            r.context as context
-        UNION
-        MATCH (n1)-[r]->(n2 {name: $name})
-        RETURN 
-            n2.name as entity1,
-            type(r) as relation,
-            n1.name as entity2,
-            r.context as context
+    def _query_graph(
+        self,
+        name: str,
+        relation_filter: Optional[RelationFilter] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[Dict]:
+        """
+        查询实体邻域，优先读取邻域缓存
+        指定关系过滤条件时只返回相关类型和方向的边，没有匹配的边时退回完整邻域
+        指定limit时按邻居重要度（PageRank）从高到低分页返回
         """
-        return self.graph.query(query, {'name': name})
+        if self.neighborhood_cache is not None:
+            results = self.neighborhood_cache.get(name)
+            if results is None:
+                # 未命中时总是取完整邻域写入缓存，再在本地按关系过滤和分页，后续任意过滤条件均可命中
+                results = self._query_graph_uncached(name)
+                self.neighborhood_cache.put(name, results)
+            if relation_filter is not None:
+                typed = [r for r in results if relation_filter.matches(r)]
+                if typed:
+                    results = typed
+            return self._rank(results, limit, offset)
+        
+        if limit is not None:
+            return self._query_graph_ranked(name, relation_filter, limit, offset)
+        if relation_filter is not None:
+            typed = self._query_graph_typed(name, relation_filter)
+            if typed:
+                return typed
+        return self._query_graph_uncached(name)
+
+    @staticmethod
+    def _rank(results: List[Dict], limit: Optional[int], offset: int = 0) -> List[Dict]:
+        """按邻居重要度排序后分页"""
+        if limit is None and not offset:
+            return results
+        ranked = sorted(results, key=lambda r: -(r.get('importance') or 0.0))
+        return ranked[offset:] if limit is None else ranked[offset:offset + limit]
+
+    def get_neighbors(
+        self,
+        name: str,
+        limit: int = 20,
+        offset: int = 0,
+        relation_filter: Optional[RelationFilter] = None
+    ) -> List[Dict]:
+        """
+        按重要度分页获取实体的邻居
+        Args:
+            name: 实体名称（繁体）
+            limit: 每页数量
+            offset: 跳过的邻居数
+            relation_filter: 关系类型和方向的过滤条件
+        """
+        return self._attach_contexts(self._query_graph(name, relation_filter, limit=limit, offset=offset))
+
+    def _attach_contexts(self, results: List[Dict]) -> List[Dict]:
+        """句子节点模式下关系只带 context_id，按id一次性批量获取原文，每个句子只传输一次"""
+        ids = {r['context_id'] for r in results if r.get('context') is None and r.get('context_id')}
+        if not ids:
+            return results
+        texts = {row['id']: row['text'] for row in self.graph.query(SENTENCES_QUERY, {'ids': sorted(ids)})}
+        for r in results:
+            if r.get('context') is None and r.get('context_id'):
+                r['context'] = texts.get(r['context_id'], '')
+        return results
+
+    def _query_graph_uncached(self, name: str) -> List[Dict]:
+        """查询图数据库"""
+        return self.graph.query(NEIGHBORHOOD_QUERY, {'name': name})
+
+    def _query_graph_typed(self, name: str, relation_filter: RelationFilter) -> List[Dict]:
+        """按关系类型和方向查询图数据库"""
+        return self.graph.query(TYPED_NEIGHBORHOOD_QUERY, {'name': name, **relation_filter.params()})
+
+    def _query_graph_ranked(
+        self,
+        name: str,
+        relation_filter: Optional[RelationFilter],
+        limit: int,
+        offset: int = 0
+    ) -> List[Dict]:
+        """在图数据库中按邻居重要度排序并分页，过滤后没有匹配的边时退回不过滤的结果"""
+        params = {'name': name, 'skip': offset, 'limit': limit, 'out_types': None, 'in_types': None}
+        if relation_filter is not None:
+            typed = self.graph.query(RANKED_NEIGHBORHOOD_QUERY, {**params, **relation_filter.params()})
+            if typed:
+                return typed
+        return self.graph.query(RANKED_NEIGHBORHOOD_QUERY, params)
 
-    def _create_vector_store(self, results: List[Dict]) -> FAISS:
+    def _create_vector_store(self, results: List[Dict]) -> "FAISS":
         """创建或获取向量存储"""
+        if self.embedding_artifact is not None:
+            return self._create_vector_store_from_artifact(results)
+        
         if not self.redis_client:
             print("⚠️ Redis缓存未启用，将直接创建向量存储")
             return self._create_vector_store_without_cache(results)
@@ -361,6 +797,7 @@ class HistoricalQA:
         if cached_data:
             try:
                 print("🎯 检测到缓存命中！正在从Redis加载向量存储...")
+                from langchain_community.vectorstores import FAISS
                 vector_data = pickle.loads(cached_data)
                 embeddings = vector_data['embeddings']
                 texts = vector_data['texts']
@@ -380,6 +817,9 @@ class HistoricalQA:
             for r in results
         ]
         
+        from langchain_community.vectorstores import FAISS
+        from langchain.text_splitter import CharacterTextSplitter
+        
         docs = CharacterTextSplitter(
             chunk_size=500,
             chunk_overlap=50
@@ -404,8 +844,40 @@ class HistoricalQA:
         
         return vector_store
 
-    def _create_vector_store_without_cache(self, results: List[Dict]) -> FAISS:
+    def _create_vector_store_from_artifact(self, results: List[Dict]) -> "FAISS":
+        """使用预计算的向量产物创建向量存储，仅对产物中缺失的三元组在线向量化"""
+        from langchain_community.vectorstores import FAISS
+        from embedding_artifact import triple_text
+        
+        rows, missing_texts = [], []
+        seen = set()
+        for r in results:
+            row = self.embedding_artifact.lookup(r['entity1'], r['relation'], r['entity2'])
+            if row is not None:
+                if row not in seen:
+                    seen.add(row)
+                    rows.append(row)
+            else:
+                missing_texts.append(triple_text(r['entity1'], r['relation'], r['entity2'], r['context']))
+        
+        texts = [self.embedding_artifact.text(row) for row in rows]
+        vectors = self.embedding_artifact.vectors(rows).tolist() if rows else []
+        if missing_texts:
+            print(f"向量产物中缺少 {len(missing_texts)} 条三元组，正在在线向量化...")
+            texts.extend(missing_texts)
+            vectors.extend(self.embedding_model.embed_documents(missing_texts))
+        
+        return FAISS.from_embeddings(
+            text_embeddings=list(zip(texts, vectors)),
+            embedding=self.embedding_model,
+            metadatas=[{"content": text} for text in texts]
+        )
+
+    def _create_vector_store_without_cache(self, results: List[Dict]) -> "FAISS":
         """不使用缓存创建向量存储"""
+        from langchain_community.vectorstores import FAISS
+        from langchain.text_splitter import CharacterTextSplitter
+        
         texts = [
             f"{r['entity1']}与{r['entity2']}之间的关系是{r['relation']}。具体描述：{r['context']}" 
             for r in results
@@ -420,9 +892,12 @@ class HistoricalQA:
 
     def _create_rag_chain(self, vector_store):
         """创建RAG链"""
+        from langchain.chains import create_retrieval_chain
+        from langchain.chains.combine_documents import create_stuff_documents_chain
+        
         retriever = vector_store.as_retriever(search_kwargs={"k": 100})
         document_chain = create_stuff_documents_chain(
-            llm=self.llm,
+            llm=self._chain_llm,
             prompt=self.prompt,
             document_variable_name="context"
         )
@@ -436,23 +911,15 @@ class HistoricalQA:
         print("正在初始化实体关系映射...")
         
         # 查询所有实体关系
-        query = """
-        MATCH (n1)-[r]->(n2)
-        RETURN 
-            n1.name as entity1,
-            type(r) as relation,
-            n2.name as entity2,
-            r.context as context
-        """
-        all_relations = self.graph.query(query)
+        all_relations = self.graph.query(ALL_RELATIONS_QUERY)
         
         # 构建实体到关系的映射
-        self.entity_relations = {}
+        self._entity_relations = entity_relations = {}
         for relation in all_relations:
             # 处理头实体
-            if relation['entity1'] not in self.entity_relations:
-                self.entity_relations[relation['entity1']] = []
-            self.entity_relations[relation['entity1']].append({
+            if relation['entity1'] not in entity_relations:
+                entity_relations[relation['entity1']] = []
+            entity_relations[relation['entity1']].append({
                 'entity1': relation['entity1'],
                 'relation': relation['relation'],
                 'entity2': relation['entity2'],
@@ -460,9 +927,9 @@ class HistoricalQA:
             })
             
             # 处理尾实体
-            if relation['entity2'] not in self.entity_relations:
-                self.entity_relations[relation['entity2']] = []
-            self.entity_relations[relation['entity2']].append({
+            if relation['entity2'] not in entity_relations:
+                entity_relations[relation['entity2']] = []
+            entity_relations[relation['entity2']].append({
                 'entity1': relation['entity1'],
                 'relation': relation['relation'],
                 'entity2': relation['entity2'],
@@ -475,12 +942,24 @@ class HistoricalQA:
                 self.redis_client.setex(
                     'entity_relations_mapping',
                     self.cache_ttl,
-                    pickle.dumps(self.entity_relations)
+                    pickle.dumps(entity_relations)
                 )
                 print("✅ 实体关系映射已缓存")
             except Exception as e:
                 print(f"❌ 实体关系映射缓存失败: {e}")
 
+    def cache_report(self) -> str:
+        """实体邻域缓存的命中率与内存报告"""
+        if self.neighborhood_cache is None:
+            return "实体邻域缓存未启用"
+        return self.neighborhood_cache.report()
+
+    def evaluation_report(self) -> str:
+        """后台评估队列的统计报告"""
+        if self.eval_queue is None:
+            return "评估未开启"
+        return self.eval_queue.report()
+
     def check_redis_cache(self):
         """检查Redis缓存状态"""
         if not self.redis_client:
@@ -502,6 +981,8 @@ class HistoricalQA:
             print("❌ 未找到实体关系映射缓存")
 
     def get_visualization_data(self, question: str) -> str:
+        from pyvis.network import Network
+        
         # 创建网络图实例
         net = Network(height="400px", width="100%", bgcolor="#ffffff", font_color="black")
         
@@ -511,6 +992,7 @@ class HistoricalQA:
         for name in names:
             results = self._query_graph(name)
             all_results.extend(results)
+        self._attach_contexts(all_results)
         
         # 添加节点和边
         if all_results:
@@ -6,6 +6,7 @@ import os
 from dotenv import load_dotenv
 import streamlit.components.v1 as components
 from urllib.parse import quote
+from sample_questions import SAMPLE_QUESTIONS
 
 # 加载环境变量
 load_dotenv()
@@ -82,35 +83,56 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# 示例问题
-SAMPLE_QUESTIONS = {
-    "人物关系类": [
-        "裕的父母是谁？",
-        "遺直的兄弟是谁？",
-        "李德裕和元穎的关系如何？"
-    ],
-    "官职任命类": [
-        "谁担任过东牟太守？",
-        "輔國將軍是谁担任的？",
-        "中散大夫有哪些人担任过？"
-    ],
-    "历史事件类": [
-        "会昌年间发生了什么重要事件？",
-        "李德裕在位期间有什么政策？",
-        "元穎参与了哪些重要事件？"
-    ]
-}
-
 def initialize_qa_system():
-    """初始化问答系统"""
+    """初始化问答系统（配置了QA_SERVICE_URL时作为问答服务的客户端）"""
+    service_url = os.getenv("QA_SERVICE_URL")
+    if service_url:
+        from qa_service import QAServiceClient
+        return QAServiceClient(service_url)
+    
     creator = KnowledgeGraphCreator(
         neo4j_url="neo4j://localhost:7687/",
         username="neo4j",
         password="12345678"
     )
-    creator.connect_to_neo4j()
+    sqlite_path = os.getenv("KG_SQLITE_PATH")
+    if sqlite_path:
+        # 使用SQLite嵌入式图谱，无需启动Neo4j
+        creator.connect_to_sqlite(sqlite_path)
+    else:
+        creator.connect_to_neo4j()
+    # 补全索引按此版本校验，问答服务客户端模式下无法获取图谱版本，不做校验
+    st.session_state.graph_version = creator.get_graph_version()
     return HistoricalQA(creator.graph)
 
+@st.cache_resource
+def load_typeahead_index(graph_version=None):
+    """加载实体名称补全索引（进程内所有会话共享），索引不存在或与图谱版本不一致时不提供补全"""
+    from entity_typeahead import EntityTypeahead
+    path = os.getenv("TYPEAHEAD_INDEX", "./kg_artifacts/typeahead.npz")
+    try:
+        return EntityTypeahead.load(path, graph_version)
+    except (OSError, ValueError) as e:
+        print(f"实体名称补全索引加载失败: {e}")
+        return None
+
+def display_entity_suggestions(user_input: str):
+    """根据输入末尾正在输入的名称，提示图谱中的规范实体名称，点击后替换"""
+    typeahead = load_typeahead_index(st.session_state.get('graph_version'))
+    if typeahead is None or not user_input:
+        return
+    fragment, suggestions = typeahead.complete(user_input, k=8)
+    if not suggestions or (len(suggestions) == 1 and suggestions[0]['name'] == fragment):
+        return
+    
+    st.caption("图谱中的实体（点击替换）：")
+    cols = st.columns(4)
+    for i, suggestion in enumerate(suggestions):
+        label = f"{suggestion['name']}（{suggestion['label']}）"
+        if cols[i % len(cols)].button(label, key=f"suggest_{suggestion['name']}"):
+            st.session_state.current_question = user_input.rstrip()[:-len(fragment)] + suggestion['name']
+            st.rerun()
+
 def display_chat_history():
     """显示聊天历史"""
     chat_container = st.container()
@@ -193,6 +215,7 @@ def main():
             key="user_input",
             value=st.session_state.get('current_question', ''),
         )
+        display_entity_suggestions(user_input)
         
         # 按钮区域
         col1, col2, col3 = st.columns([2, 2, 4])
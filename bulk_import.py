@@ -0,0 +1,185 @@
+# bulk_import.py
+import csv
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from embedding_artifact import context_id
+
+# neo4j-admin database import 所需的表头
+NODE_HEADER = ['id:ID', 'name', 'color', ':LABEL']
+META_HEADER = ['id:ID', 'key', 'version:long', ':LABEL']
+RELATIONSHIP_HEADER = [':START_ID', ':END_ID', ':TYPE', 'color', 'original_type', 'context']
+# 句子节点模式：句子节点ID即内容哈希（导入后同时作为 id 属性），关系只保存 context_id
+SENTENCE_HEADER = ['id:ID', 'text', ':LABEL']
+SENTENCE_RELATIONSHIP_HEADER = [':START_ID', ':END_ID', ':TYPE', 'color', 'original_type', 'context_id']
+
+RELATIONSHIP_FILE = 'relationships.csv'
+META_FILE = 'nodes_meta.csv'
+SENTENCE_FILE = 'nodes_Sentence.csv'
+
+DEFAULT_ENTITY = {'label': 'Entity', 'color': '#CCCCCC'}
+
+
+def node_id(label: str, name: str) -> str:
+    """节点ID由标签和名称组成，与 MERGE (e:Label {name}) 的去重语义一致"""
+    return f"{label}:{name}"
+
+
+def write_bulk_import_files(
+    df,
+    output_dir: str,
+    label_map: Dict,
+    relation_color_map: Dict,
+    meta_label: str,
+    graph_version: int = 1,
+    sentence_label: Optional[str] = None
+) -> Dict[str, List[Path]]:
+    """
+    将三元组转换为 neo4j-admin database import 可直接使用的节点和关系CSV
+    Args:
+        df: json_to_csv 生成的三元组DataFrame
+        output_dir: 输出目录
+        label_map: 实体类型到标签和颜色的映射（ENTITY_LABEL_MAP）
+        relation_color_map: 关系类型到颜色的映射（RELATION_COLOR_MAP）
+        meta_label: 图谱元数据节点标签
+        graph_version: 写入元数据节点的图谱版本号
+        sentence_label: 句子节点标签，指定时每个不同的原文句子只导出一次，关系通过 context_id 引用
+    Returns:
+        {'nodes': [...], 'relationships': [...]} 生成的文件路径
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # 按实体类型分文件，节点以 (标签, 名称) 去重
+    nodes: Dict[str, Dict[str, List[str]]] = {}
+    relationships: Dict[tuple, List[str]] = {}
+    sentences: Dict[str, List[str]] = {}
+    for row in df.itertuples(index=False):
+        head_type = row.head_entity_label if row.head_entity_label in label_map else 'Entity'
+        tail_type = row.tail_entity_label if row.tail_entity_label in label_map else 'Entity'
+        head_info = label_map.get(head_type, DEFAULT_ENTITY)
+        tail_info = label_map.get(tail_type, DEFAULT_ENTITY)
+
+        head_id = node_id(head_info['label'], row.head_entity)
+        tail_id = node_id(tail_info['label'], row.tail_entity)
+        nodes.setdefault(head_type, {})[head_id] = [head_id, row.head_entity, head_info['color'], head_info['label']]
+        nodes.setdefault(tail_type, {})[tail_id] = [tail_id, row.tail_entity, tail_info['color'], tail_info['label']]
+
+        context = row.context
+        if sentence_label is not None:
+            context = context_id(row.context)
+            sentences[context] = [context, row.context, sentence_label]
+
+        # 与 MERGE (head)-[r:TYPE]->(tail) 一致，同一关系保留最后一次写入的属性
+        relationships[(head_id, row.relation, tail_id)] = [
+            head_id,
+            tail_id,
+            row.relation,
+            relation_color_map.get(row.relation, '#CCCCCC'),
+            row.relation,
+            context
+        ]
+
+    files = {'nodes': [], 'relationships': []}
+    for entity_type, rows in nodes.items():
+        path = output_dir / f"nodes_{entity_type}.csv"
+        _write_csv(path, NODE_HEADER, rows.values())
+        files['nodes'].append(path)
+
+    meta_path = output_dir / META_FILE
+    _write_csv(meta_path, META_HEADER, [[f"{meta_label}:graph", 'graph', graph_version, meta_label]])
+    files['nodes'].append(meta_path)
+
+    relationship_header = RELATIONSHIP_HEADER
+    if sentence_label is not None:
+        sentence_path = output_dir / SENTENCE_FILE
+        _write_csv(sentence_path, SENTENCE_HEADER, sentences.values())
+        files['nodes'].append(sentence_path)
+        relationship_header = SENTENCE_RELATIONSHIP_HEADER
+
+    relationship_path = output_dir / RELATIONSHIP_FILE
+    _write_csv(relationship_path, relationship_header, relationships.values())
+    files['relationships'].append(relationship_path)
+    return files
+
+
+def _write_csv(path: Path, header: List[str], rows) -> None:
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def import_command(files: Dict[str, List[Path]], database: str = "neo4j") -> str:
+    """生成对应的 neo4j-admin 导入命令"""
+    parts = ["neo4j-admin database import full"]
+    parts += [f"--nodes={path}" for path in files['nodes']]
+    parts += [f"--relationships={path}" for path in files['relationships']]
+    parts += ["--multiline-fields=true", "--overwrite-destination=true", database]
+    return " \\\n  ".join(parts)
+
+
+def verify_bulk_import_files(files: Dict[str, List[Path]]) -> Dict:
+    """
+    在本地校验导入文件（无需Neo4j服务）：表头、节点ID唯一性以及关系端点是否存在
+    只校验 write_bulk_import_files 返回的文件，输出目录中上次导出遗留的其他文件不参与校验
+    Args:
+        files: write_bulk_import_files 的返回值
+    Returns:
+        {'nodes': 节点数, 'relationships': 关系数, 'errors': 错误列表}
+    """
+    errors = []
+    node_ids = set()
+
+    for path in map(Path, files['nodes']):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            if 'id:ID' not in header or ':LABEL' not in header:
+                errors.append(f"{path.name}: 表头缺少 id:ID 或 :LABEL 列")
+                continue
+            id_col = header.index('id:ID')
+            label_col = header.index(':LABEL')
+            for line_no, row in enumerate(reader, start=2):
+                if len(row) != len(header):
+                    errors.append(f"{path.name}:{line_no}: 列数与表头不一致")
+                    continue
+                if not row[label_col]:
+                    errors.append(f"{path.name}:{line_no}: 缺少标签")
+                if row[id_col] in node_ids:
+                    errors.append(f"{path.name}:{line_no}: 重复的节点ID {row[id_col]}")
+                node_ids.add(row[id_col])
+
+    relationship_count = 0
+    if not files['relationships']:
+        errors.append("缺少关系文件")
+    for path in map(Path, files['relationships']):
+        if not path.exists():
+            errors.append(f"缺少关系文件 {path.name}")
+            continue
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            missing = [col for col in (':START_ID', ':END_ID', ':TYPE') if col not in header]
+            if missing:
+                errors.append(f"{path.name}: 表头缺少 {', '.join(missing)}")
+                continue
+            start_col = header.index(':START_ID')
+            end_col = header.index(':END_ID')
+            type_col = header.index(':TYPE')
+            for line_no, row in enumerate(reader, start=2):
+                relationship_count += 1
+                if len(row) != len(header):
+                    errors.append(f"{path.name}:{line_no}: 列数与表头不一致")
+                    continue
+                for col in (start_col, end_col):
+                    if row[col] not in node_ids:
+                        errors.append(f"{path.name}:{line_no}: 端点 {row[col]} 不存在")
+                if not row[type_col]:
+                    errors.append(f"{path.name}:{line_no}: 缺少关系类型")
+
+    return {
+        'nodes': len(node_ids),
+        'relationships': relationship_count,
+        'errors': errors
+    }
@@ -0,0 +1,292 @@
+# cassette.py
+# 对话模型与向量模型调用的录制/回放层：录制模式保存 请求→响应，回放模式离线、确定性地返回录制结果
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+RECORD = "record"  # 总是调用真实模型并保存（覆盖已有记录）
+REPLAY = "replay"  # 只读取记录，未命中时报错
+AUTO = "auto"      # 命中则回放，未命中则调用真实模型并保存
+MODES = (RECORD, REPLAY, AUTO)
+
+KIND_CHAT = "chat"
+KIND_EMBEDDING = "embedding"
+
+# 影响回答内容的对话模型参数，与消息一起计入请求哈希
+CHAT_MODEL_PARAMS = ("model_name", "model", "temperature", "top_p", "max_tokens", "seed")
+# 决定向量内容和维度的向量模型参数，与文本一起计入请求哈希
+EMBEDDING_MODEL_PARAMS = ("model", "model_name", "dimensions", "size")
+
+
+class CassetteMiss(KeyError):
+    """回放模式下请求没有对应的录制记录"""
+
+
+def request_key(kind: str, payload: Any) -> str:
+    """请求内容（规范化JSON）的SHA-256"""
+    data = json.dumps([kind, payload], ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class CassetteStore:
+    """
+    基于SQLite的录制存储，以请求哈希为主键
+    对话响应存为zlib压缩的JSON，向量存为float32字节
+    """
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS interactions (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                response BLOB NOT NULL,
+                latency REAL NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    def get(self, key: str) -> Optional[tuple]:
+        """返回 (响应字节, 录制时的耗时)，不存在时返回None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, latency FROM interactions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return row
+
+    def put(self, key: str, kind: str, response: bytes, latency: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO interactions (key, kind, response, latency, created_at) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, response, latency, time.time())
+            )
+            self._conn.commit()
+            self.recorded += 1
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM interactions").fetchone()[0]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT kind, count(*) FROM interactions GROUP BY kind"
+            ).fetchall())
+        return {
+            "path": self.path,
+            "chat": counts.get(KIND_CHAT, 0),
+            "embedding": counts.get(KIND_EMBEDDING, 0),
+            "hits": self.hits,
+            "misses": self.misses,
+            "recorded": self.recorded
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def chat_model_params(llm) -> Dict:
+    """对话模型的类型和 CHAT_MODEL_PARAMS 中已设置的参数，换用其他模型或温度时不会命中旧的录制"""
+    params = {"type": getattr(llm, "_llm_type", type(llm).__name__)}
+    for name in CHAT_MODEL_PARAMS:
+        value = getattr(llm, name, None)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            # 温度等参数统一为浮点数，0 与 0.0 得到相同的哈希
+            value = float(value)
+        if isinstance(value, (str, float)):
+            params[name] = value
+    return params
+
+
+def embedding_model_params(embedding_model) -> Dict:
+    """向量模型的类名和 EMBEDDING_MODEL_PARAMS 中已设置的参数，换用其他模型或维度时不会命中旧的录制"""
+    params = {"type": type(embedding_model).__name__}
+    for name in EMBEDDING_MODEL_PARAMS:
+        value = getattr(embedding_model, name, None)
+        if isinstance(value, (str, int)) and not isinstance(value, bool):
+            params[name] = value
+    return params
+
+
+def _simulate_latency(recorded: float, latency: Optional[float], latency_scale: float) -> None:
+    """latency为None时按录制耗时乘以latency_scale等待，否则等待固定时长"""
+    delay = recorded * latency_scale if latency is None else latency
+    if delay > 0:
+        time.sleep(delay)
+
+
+def _check_mode(mode: str, inner) -> None:
+    if mode not in MODES:
+        raise ValueError(f"未知的录制模式: {mode}（可选: {', '.join(MODES)}）")
+    if mode != REPLAY and inner is None:
+        raise ValueError(f"{mode} 模式需要提供被包装的真实模型")
+
+
+class CassetteChatModel(BaseChatModel):
+    """
+    包装对话模型，按模型参数和消息内容录制或回放回答
+    params 默认由被包装的模型计算（chat_model_params），回放模式不提供模型时须直接指定
+    """
+
+    store: Any
+    inner: Optional[Any] = None
+    mode: str = REPLAY
+    latency: Optional[float] = None
+    latency_scale: float = 1.0
+    params: Optional[Dict[str, Any]] = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        _check_mode(self.mode, self.inner)
+        if self.params is None:
+            if self.inner is None:
+                raise ValueError("回放模式未提供被包装的对话模型时需指定模型参数 params")
+            self.params = chat_model_params(self.inner)
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette-chat"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        key = request_key(KIND_CHAT, {
+            "model": self.params,
+            "messages": [{"type": m.type, "content": m.content} for m in messages],
+            "stop": stop
+        })
+
+        cached = self.store.get(key) if self.mode != RECORD else None
+        if cached is not None:
+            response, recorded = cached
+            _simulate_latency(recorded, self.latency, self.latency_scale)
+            content = json.loads(zlib.decompress(response).decode("utf-8"))["content"]
+        elif self.mode == REPLAY:
+            raise CassetteMiss(f"回放记录中没有该对话请求: {key[:12]}")
+        else:
+            start = time.perf_counter()
+            message = self.inner.invoke(messages, stop=stop)
+            elapsed = time.perf_counter() - start
+            content = message.content
+            payload = json.dumps({"content": content}, ensure_ascii=False).encode("utf-8")
+            self.store.put(key, KIND_CHAT, zlib.compress(payload), elapsed)
+
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+class CassetteEmbeddings(Embeddings):
+    """
+    包装向量模型，按模型参数和单条文本录制或回放向量
+    同一批中缺失的文本合并为一次真实调用
+    params 默认由被包装的模型计算（embedding_model_params），回放模式不提供模型时须直接指定
+    """
+
+    def __init__(
+        self,
+        store: CassetteStore,
+        inner: Optional[Embeddings] = None,
+        mode: str = REPLAY,
+        latency: Optional[float] = None,
+        latency_scale: float = 1.0,
+        params: Optional[Dict[str, Any]] = None
+    ):
+        _check_mode(mode, inner)
+        if params is None:
+            if inner is None:
+                raise ValueError("回放模式未提供被包装的向量模型时需指定模型参数 params")
+            params = embedding_model_params(inner)
+        self.store = store
+        self.inner = inner
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.params = params
+
+    def _embed(self, texts: List[str], kind: str) -> List[List[float]]:
+        keys = [request_key(KIND_EMBEDDING, [self.params, kind, text]) for text in texts]
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+        replayed_latency = 0.0
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self.store.get(key) if self.mode != RECORD else None
+            if cached is None:
+                missing.append(i)
+                continue
+            response, recorded = cached
+            vectors[i] = np.frombuffer(response, dtype=np.float32).tolist()
+            replayed_latency = max(replayed_latency, recorded)
+
+        if missing and self.mode == REPLAY:
+            raise CassetteMiss(f"回放记录中缺少 {len(missing)} 条文本的向量")
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            start = time.perf_counter()
+            if kind == "query":
+                embedded = [self.inner.embed_query(missing_texts[0])]
+            else:
+                embedded = self.inner.embed_documents(missing_texts)
+            elapsed = time.perf_counter() - start
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+                self.store.put(keys[i], KIND_EMBEDDING, np.asarray(vector, dtype=np.float32).tobytes(), elapsed)
+        elif texts:
+            # 整批均为回放：按批内最慢的一次录制耗时模拟
+            _simulate_latency(replayed_latency, self.latency, self.latency_scale)
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "document")
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], "query")[0]
+
+
+def wrap_models(
+    llm,
+    embedding_model,
+    path: str,
+    mode: str = REPLAY,
+    latency: Optional[float] = None,
+    latency_scale: float = 1.0,
+    chat_params: Optional[Dict[str, Any]] = None,
+    embedding_params: Optional[Dict[str, Any]] = None
+):
+    """
+    用同一个录制文件包装对话模型和向量模型，返回 (对话模型, 向量模型)
+    回放模式下llm和embedding_model可以为None，此时需通过chat_params/embedding_params给出录制时模型的参数
+    """
+    store = CassetteStore(path)
+    return (
+        CassetteChatModel(
+            store=store,
+            inner=llm,
+            mode=mode,
+            latency=latency,
+            latency_scale=latency_scale,
+            params=chat_params
+        ),
+        CassetteEmbeddings(store, embedding_model, mode, latency, latency_scale, embedding_params)
+    )
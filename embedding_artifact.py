@@ -0,0 +1,181 @@
+# embedding_artifact.py
+import json
+import hashlib
+import time
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 产物格式版本，格式不兼容时递增
+ARTIFACT_FORMAT_VERSION = 1
+
+MATRIX_FILE = "embeddings.npy"
+META_FILE = "meta.json"
+MANIFEST_FILE = "manifest.json"
+
+
+def context_id(context: str) -> str:
+    """根据句子内容生成稳定的上下文ID"""
+    return hashlib.sha1((context or "").encode("utf-8")).hexdigest()[:16]
+
+
+def triple_text(entity1: str, relation: str, entity2: str, context: str) -> str:
+    """生成三元组的检索文本，与问答系统中的文本格式保持一致"""
+    return f"{entity1}与{entity2}之间的关系是{relation}。具体描述：{context}"
+
+
+def write_embedding_artifact(
+    df,
+    embedding_model,
+    output_dir: str,
+    batch_size: int = 512
+) -> Dict:
+    """
+    计算三元组文本的向量并写出磁盘产物
+    Args:
+        df: json_to_csv 生成的三元组DataFrame
+        embedding_model: 具有 embed_documents 方法的向量模型
+        output_dir: 产物输出目录
+        batch_size: 每批向量化的文本数量
+    Returns:
+        产物的manifest信息
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    entity1, relation, entity2, context_ids = [], [], [], []
+    contexts, texts = {}, []
+    for row in df.itertuples(index=False):
+        cid = context_id(row.context)
+        contexts.setdefault(cid, row.context)
+        entity1.append(row.head_entity)
+        relation.append(row.relation)
+        entity2.append(row.tail_entity)
+        context_ids.append(cid)
+        texts.append(triple_text(row.head_entity, row.relation, row.tail_entity, row.context))
+
+    # 旧的manifest先删除，避免写入中途被读取到不完整的产物
+    manifest_path = output_dir / MANIFEST_FILE
+    if manifest_path.exists():
+        manifest_path.unlink()
+
+    matrix = None
+    for start in range(0, len(texts), batch_size):
+        vectors = np.asarray(
+            embedding_model.embed_documents(texts[start:start + batch_size]),
+            dtype=np.float32
+        )
+        if matrix is None:
+            matrix = np.lib.format.open_memmap(
+                output_dir / MATRIX_FILE,
+                mode="w+",
+                dtype=np.float32,
+                shape=(len(texts), vectors.shape[1])
+            )
+        matrix[start:start + len(vectors)] = vectors
+        print(f"已向量化 {min(start + batch_size, len(texts))}/{len(texts)} 条三元组")
+
+    if matrix is None:
+        raise ValueError("没有可向量化的三元组")
+    matrix.flush()
+    dim = matrix.shape[1]
+    del matrix
+
+    meta = {
+        "entity1": entity1,
+        "relation": relation,
+        "entity2": entity2,
+        "context_id": context_ids,
+        "contexts": contexts
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    with open(output_dir / META_FILE, "wb") as f:
+        f.write(meta_bytes)
+
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "content_hash": _content_hash(output_dir / MATRIX_FILE, meta_bytes),
+        "embedding_model": getattr(embedding_model, "model", type(embedding_model).__name__),
+        "rows": len(texts),
+        "dim": dim,
+        "dtype": "float32",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    print(f"向量产物已保存至 {output_dir}（{len(texts)} 行，维度 {dim}）")
+    return manifest
+
+
+def _content_hash(matrix_path: Path, meta_bytes: bytes) -> str:
+    """计算向量矩阵与元数据的内容哈希"""
+    digest = hashlib.sha256()
+    with open(matrix_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(meta_bytes)
+    return digest.hexdigest()
+
+
+class EmbeddingArtifact:
+    """以内存映射方式只读打开的三元组向量产物"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(
+                f"向量产物版本不兼容: {self.manifest.get('format_version')}，"
+                f"期望 {ARTIFACT_FORMAT_VERSION}"
+            )
+
+        # mmap_mode='r' 返回 numpy.memmap，多个进程共享页缓存，不复制数据
+        self.matrix = np.load(self.path / MATRIX_FILE, mmap_mode="r")
+        if self.matrix.shape != (self.manifest["rows"], self.manifest["dim"]):
+            raise ValueError(f"向量矩阵形状与manifest不一致: {self.matrix.shape}")
+
+        with open(self.path / META_FILE, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self.entity1: List[str] = meta["entity1"]
+        self.relation: List[str] = meta["relation"]
+        self.entity2: List[str] = meta["entity2"]
+        self.context_ids: List[str] = meta["context_id"]
+        self.contexts: Dict[str, str] = meta["contexts"]
+        self._rows = {
+            (h, r, t): i
+            for i, (h, r, t) in enumerate(zip(self.entity1, self.relation, self.entity2))
+        }
+
+    @property
+    def content_hash(self) -> str:
+        return self.manifest["content_hash"]
+
+    def __len__(self) -> int:
+        return self.manifest["rows"]
+
+    def lookup(self, entity1: str, relation: str, entity2: str) -> Optional[int]:
+        """按三元组查找行号，同时兼容查询结果中头尾实体互换的情况"""
+        row = self._rows.get((entity1, relation, entity2))
+        if row is None:
+            row = self._rows.get((entity2, relation, entity1))
+        return row
+
+    def text(self, row: int) -> str:
+        """返回某一行对应的检索文本"""
+        return triple_text(
+            self.entity1[row],
+            self.relation[row],
+            self.entity2[row],
+            self.contexts[self.context_ids[row]]
+        )
+
+    def vectors(self, rows: List[int]) -> np.ndarray:
+        """读取指定行的向量（仅复制所需的行）"""
+        return np.asarray(self.matrix[rows], dtype=np.float32)
+
+    def verify(self) -> bool:
+        """重新计算内容哈希，校验产物是否完整"""
+        with open(self.path / META_FILE, "rb") as f:
+            meta_bytes = f.read()
+        return _content_hash(self.path / MATRIX_FILE, meta_bytes) == self.content_hash
@@ -0,0 +1,180 @@
+# entity_typeahead.py
+# 实体名称补全索引：图谱中全部实体名称的繁体原形与简体形式，按实体度数排序的前缀查询
+import bisect
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from kg_queries import ENTITY_DEGREE_QUERY
+
+TYPEAHEAD_FORMAT_VERSION = 1
+
+# 与 KnowledgeGraphCreator.ENTITY_LABEL_MAP 的节点标签一致
+ENTITY_LABELS = ('人物', '地点', '官衔', '书籍')
+
+# 补全片段的最短长度；更短的片段只在输入开头或分隔符之后补全
+MIN_FRAGMENT_LENGTH = 2
+DELIMITERS = frozenset('的之 \t，。、；：？！,.;:?!')
+
+
+class EntityTypeahead:
+    """
+    排序数组实现的前缀补全索引
+    - keys: 排序后的检索键（实体名称的繁体原形及其简体形式）
+    - entity: 每个检索键对应的实体编号，实体编号按度数从高到低分配
+    因此前缀查询只需二分定位键区间，区间内编号最小的k个实体即为度数最高的k个
+    """
+
+    def __init__(
+        self,
+        keys: List[str],
+        entity: np.ndarray,
+        names: List[str],
+        labels: List[str],
+        degree: np.ndarray,
+        graph_version: Optional[int] = None
+    ):
+        self.keys = keys
+        self.entity = entity
+        self.names = names
+        self.labels = labels
+        self.degree = degree
+        self.graph_version = graph_version
+        self._max_key_length = max((len(key) for key in keys), default=0)
+
+    @classmethod
+    def build(
+        cls,
+        entities: Iterable[Tuple[str, str, int]],
+        converter=None,
+        graph_version: Optional[int] = None
+    ) -> "EntityTypeahead":
+        """
+        构建索引
+        Args:
+            entities: (名称, 标签, 度数)，同名实体合并，度数相加
+            converter: 繁体转简体的转换器，为None时使用OpenCC('t2s')
+            graph_version: 构建时的图谱版本号
+        """
+        if converter is None:
+            from opencc import OpenCC
+            converter = OpenCC('t2s')
+
+        merged: Dict[str, List] = {}
+        for name, label, degree in entities:
+            if not name:
+                continue
+            entry = merged.setdefault(name, [label, 0])
+            entry[1] += int(degree or 0)
+
+        names = sorted(merged, key=lambda name: (-merged[name][1], name))
+        pairs = set()
+        for i, name in enumerate(names):
+            pairs.add((name, i))
+            simplified = converter.convert(name)
+            if simplified != name:
+                pairs.add((simplified, i))
+        pairs = sorted(pairs)
+
+        return cls(
+            keys=[key for key, _ in pairs],
+            entity=np.array([i for _, i in pairs], dtype=np.int32),
+            names=names,
+            labels=[merged[name][0] for name in names],
+            degree=np.array([merged[name][1] for name in names], dtype=np.int64),
+            graph_version=graph_version
+        )
+
+    @classmethod
+    def from_graph(cls, graph, converter=None, graph_version: Optional[int] = None) -> "EntityTypeahead":
+        """从图谱读取实体名称与度数构建索引"""
+        entities = []
+        for row in graph.query(ENTITY_DEGREE_QUERY):
+            label = next((label for label in row['labels'] if label in ENTITY_LABELS), None)
+            if label is not None:
+                entities.append((row['name'], label, row['degree']))
+        return cls.build(entities, converter, graph_version)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _entry(self, i: int) -> Dict:
+        return {
+            'name': self.names[i],
+            'label': self.labels[i],
+            'degree': int(self.degree[i])
+        }
+
+    def lookup(self, prefix: str, k: int = 10) -> List[Dict]:
+        """返回以prefix开头（繁体或简体）的度数最高的k个实体"""
+        if not prefix:
+            return []
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\U0010ffff', lo)
+        if lo >= hi:
+            return []
+        # 同一实体的繁简两种形式可能同时命中，np.unique 去重并按编号（即度数）排序
+        ids = np.unique(self.entity[lo:hi])[:k]
+        return [self._entry(i) for i in ids]
+
+    def resolve(self, word: str) -> Optional[str]:
+        """将简体或繁体写法映射为图谱中的实体名称，不存在时返回None"""
+        i = bisect.bisect_left(self.keys, word)
+        if i < len(self.keys) and self.keys[i] == word:
+            return self.names[self.entity[i]]
+        return None
+
+    def complete(self, text: str, k: int = 10, min_length: int = MIN_FRAGMENT_LENGTH) -> Tuple[str, List[Dict]]:
+        """
+        补全输入末尾正在输入的实体名称
+        从最长的后缀开始尝试，返回 (匹配的后缀, 候选实体)，没有候选时返回 ("", [])
+        单字实体很多，短于min_length的后缀（如"是谁"末尾的"谁"）只在输入开头或分隔符之后才补全
+        """
+        text = text.rstrip()
+        for n in range(min(len(text), self._max_key_length), 0, -1):
+            start = len(text) - n
+            if n < min_length and start > 0 and text[start - 1] not in DELIMITERS:
+                continue
+            fragment = text[start:]
+            suggestions = self.lookup(fragment, k)
+            if suggestions:
+                return fragment, suggestions
+        return "", []
+
+    def save(self, path: str) -> None:
+        """保存为npz文件"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            format_version=np.int32(TYPEAHEAD_FORMAT_VERSION),
+            graph_version=np.int64(-1 if self.graph_version is None else self.graph_version),
+            keys=np.array(self.keys),
+            entity=self.entity,
+            names=np.array(self.names),
+            labels=np.array(self.labels),
+            degree=self.degree
+        )
+
+    @classmethod
+    def load(cls, path: str, graph_version: Optional[int] = None) -> "EntityTypeahead":
+        """
+        Args:
+            path: save 保存的npz文件
+            graph_version: 当前图谱版本号，指定时与索引构建时的版本不一致则视为过期
+        """
+        data = np.load(path, allow_pickle=False)
+        if int(data['format_version']) != TYPEAHEAD_FORMAT_VERSION:
+            raise ValueError(f"补全索引版本不兼容: {int(data['format_version'])}，期望 {TYPEAHEAD_FORMAT_VERSION}")
+        index_version = int(data['graph_version'])
+        index_version = None if index_version < 0 else index_version
+        if graph_version is not None and index_version != graph_version:
+            raise ValueError(f"补全索引已过期（索引版本: {index_version}，图谱版本: {graph_version}）")
+        return cls(
+            keys=data['keys'].tolist(),
+            entity=data['entity'],
+            names=data['names'].tolist(),
+            labels=data['labels'].tolist(),
+            degree=data['degree'],
+            graph_version=index_version
+        )
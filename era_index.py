@@ -0,0 +1,241 @@
+# era_index.py
+# 年号与干支倒排索引：导入时识别原文句子中的年号和干支纪日/纪年，建立 年号→句子、年号→实体 的倒排表，
+# 问答时按问题中的时期一次查出相关史料，无需扫描全部关系
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from embedding_artifact import context_id
+
+ERA_FORMAT_VERSION = 2
+
+KIND_ERA = 0
+KIND_GANZHI = 1
+
+# 常用年号（简体，与原文句子一致），同名年号不区分朝代
+REIGN_ERAS = {
+    '西汉': '建元 元光 元朔 元狩 元鼎 元封 太初 天汉 太始 征和 后元 始元 元凤 元平 本始 地节 元康 神爵 五凤 甘露 '
+            '黄龙 初元 永光 建昭 竟宁 建始 河平 阳朔 鸿嘉 永始 元延 绥和 建平 元寿 元始 居摄 初始',
+    '新': '始建国 天凤 地皇',
+    '东汉': '建武 永平 建初 元和 章和 永元 元兴 延平 永初 元初 永宁 建光 延光 永建 阳嘉 永和 汉安 建康 永憙 本初 '
+            '建和 和平 元嘉 永兴 永寿 延熹 永康 建宁 熹平 光和 中平 初平 兴平 建安 延康',
+    '三国': '黄初 太和 青龙 景初 正始 嘉平 正元 景元 咸熙 章武 建兴 延熙 景耀 炎兴 黄武 嘉禾 赤乌 太元 神凤 '
+            '太平 永安 宝鼎 建衡 凤凰 天册 天玺 天纪',
+    '晋': '泰始 咸宁 太康 太熙 永熙 元康 太安 光熙 永嘉 大兴 永昌 太宁 咸和 咸康 升平 隆和 兴宁 咸安 宁康 '
+          '隆安 义熙 元熙',
+    '北朝': '登国 皇始 天兴 天赐 神瑞 泰常 始光 神䴥 延和 太延 太平真君 正平 兴安 兴光 天安 皇兴 延兴 承明 '
+            '景明 延昌 熙平 神龟 正光 孝昌 武泰 建义 建明 普泰 中兴 太昌 天平 元象 兴和 武定 大统 天保 乾明 '
+            '皇建 河清 天统 武平 隆化 承光 武成 保定 天和 建德 宣政 大成 大象 大定',
+    '南朝': '景平 孝建 大明 泰豫 元徽 升明 永明 隆昌 永泰 天监 普通 大通 中大通 大同 中大同 太清 大宝 天正 '
+            '承圣 绍泰 永定 天嘉 天康 光大 太建 至德 祯明',
+    '隋': '开皇 仁寿 大业 义宁 皇泰',
+    '唐': '武德 贞观 永徽 显庆 龙朔 麟德 乾封 总章 咸亨 上元 仪凤 调露 永隆 开耀 永淳 弘道 嗣圣 文明 光宅 垂拱 '
+          '载初 天授 如意 长寿 延载 证圣 天册万岁 万岁登封 万岁通天 神功 圣历 久视 大足 长安 神龙 景龙 唐隆 '
+          '景云 太极 先天 开元 天宝 乾元 宝应 广德 大历 建中 兴元 贞元 永贞 长庆 宝历 大和 开成 会昌 大中 '
+          '咸通 乾符 广明 中和 光启 文德 龙纪 大顺 景福 乾宁 光化 天复 天祐',
+    '五代十国': '开平 乾化 贞明 龙德 同光 天成 长兴 应顺 清泰 天福 开运 乾祐 广顺 显德 宝正 昇元 保大 交泰 '
+                '通正 光天 乾德 明德 广政 乾亨 大有 应乾 乾和 龙启 通文 天德 广运',
+    '辽': '神册 天赞 天显 会同 天禄 应历 保宁 统和 开泰 重熙 清宁 咸雍 大康 大安 寿昌 寿隆 乾统 天庆',
+    '宋': '建隆 开宝 太平兴国 雍熙 端拱 淳化 至道 咸平 景德 大中祥符 天禧 乾兴 天圣 明道 景祐 宝元 康定 '
+          '庆历 皇祐 至和 嘉祐 治平 熙宁 元丰 元祐 绍圣 元符 建中靖国 崇宁 大观 政和 重和 宣和 靖康 建炎 '
+          '绍兴 隆兴 乾道 淳熙 绍熙 庆元 嘉泰 开禧 嘉定 宝庆 绍定 端平 嘉熙 淳祐 宝祐 开庆 景定 咸淳 德祐 '
+          '景炎 祥兴',
+    '金': '收国 天辅 天会 天眷 皇统 正隆 明昌 承安 泰和 崇庆 至宁 贞祐 兴定 元光 正大 开兴',
+    '元': '中统 至元 元贞 大德 至大 皇庆 延祐 至治 泰定 致和 天顺 天历 至顺 元统 至正',
+    '明': '洪武 建文 永乐 洪熙 宣德 正统 景泰 成化 弘治 正德 嘉靖 隆庆 万历 泰昌 天启 崇祯',
+    '清': '天命 天聪 崇德 顺治 康熙 雍正 乾隆 嘉庆 道光 咸丰 同治 光绪 宣统'
+}
+
+# 同时是地名或常用词的年号，只有后接具体年份（如"长安二年"）时才视为年号
+AMBIGUOUS_ERAS = {
+    '长安', '建康', '永安', '永兴', '永昌', '建德', '文明', '长寿', '如意', '大足', '太极', '先天',
+    '中和', '和平', '太平', '中兴', '大同', '大明', '黄龙', '凤凰', '嘉禾', '天平', '正大', '大有', '大安',
+    '大成', '甘露', '神龙', '上元'
+}
+
+# 简繁转换后原文中出现的异写（如"乾宁"被转为"干寕"）
+_VARIANT_CHARS = {'乾': '干', '宁': '寕'}
+
+_STEMS = '甲乙丙丁戊己庚辛壬癸'
+_BRANCHES = '子丑寅卯辰巳午未申酉戌亥'
+GANZHI = [_STEMS[i % 10] + _BRANCHES[i % 12] for i in range(60)]
+
+_YEAR = r'(?:元|[一二三四五六七八九十廿]+)年'
+
+
+def _variants(era: str) -> List[str]:
+    variants = {era}
+    for char, variant in _VARIANT_CHARS.items():
+        variants |= {v.replace(char, variant) for v in variants}
+    return sorted(variants)
+
+
+def _era_pattern(eras: Iterable[str], suffix: str) -> re.Pattern:
+    # 较长的年号优先匹配（如"中大通"先于"大通"）
+    alternatives = sorted({v for era in eras for v in _variants(era)}, key=len, reverse=True)
+    return re.compile(f"({'|'.join(map(re.escape, alternatives))})(?={suffix})")
+
+
+ALL_ERAS = sorted({era for eras in REIGN_ERAS.values() for era in eras.split()})
+_CANONICAL = {variant: era for era in ALL_ERAS for variant in _variants(era)}
+
+# 原文：年号后须接年份或"初/中/末/间"；易混淆的年号须接具体年份
+_SENTENCE_ERA = _era_pattern([e for e in ALL_ERAS if e not in AMBIGUOUS_ERAS], f"{_YEAR}|[初中末间]")
+_SENTENCE_AMBIGUOUS_ERA = _era_pattern(AMBIGUOUS_ERAS, _YEAR)
+# 问题："会昌年间"、"会昌时"等口语说法也视为年号
+_QUESTION_ERA = _era_pattern([e for e in ALL_ERAS if e not in AMBIGUOUS_ERAS], f"{_YEAR}|年|[初中末间时]")
+_GANZHI = re.compile(f"[{_STEMS}][{_BRANCHES}]")
+
+
+def detect_periods(text: str, question: bool = False) -> List[Tuple[int, str]]:
+    """
+    识别文本中的年号和干支，返回去重后的 (类型, 键)
+    干支单独出现时无法确定所指年份/日期，只与同一文本中的年号组合为"年号:干支"（如"会昌:乙酉"）
+    Args:
+        text: 原文句子或用户问题（简体）
+        question: 是否为用户问题，问题中的年号允许"年间"、"时"等更宽松的后缀
+    """
+    patterns = (_QUESTION_ERA, _SENTENCE_AMBIGUOUS_ERA) if question else (_SENTENCE_ERA, _SENTENCE_AMBIGUOUS_ERA)
+    eras = list(dict.fromkeys(_CANONICAL[m.group(1)] for pattern in patterns for m in pattern.finditer(text)))
+    if not eras:
+        return []
+    ganzhi = list(dict.fromkeys(m.group(0) for m in _GANZHI.finditer(text) if m.group(0) in GANZHI))
+    return [(KIND_ERA, era) for era in eras] + [(KIND_GANZHI, f"{era}:{gz}") for era in eras for gz in ganzhi]
+
+
+def _offsets(groups: List[list]) -> np.ndarray:
+    offsets = np.zeros(len(groups) + 1, dtype=np.int32)
+    offsets[1:] = np.cumsum([len(g) for g in groups])
+    return offsets
+
+
+def _csr(postings: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """将每个键的编号列表压缩为 (偏移, 编号) 两个数组"""
+    offsets = _offsets(postings)
+    values = np.fromiter((v for p in postings for v in p), dtype=np.int32, count=int(offsets[-1]))
+    return offsets, values
+
+
+class EraIndex:
+    """
+    年号/干支倒排索引，只保存含时期信息的句子的 context_id，三元组和原文仍由图谱查询
+    - keys/kinds: 排序后的年号和"年号:干支"
+    - sentence_offsets/sentence_postings: 键 → 句子编号（context_ids 的下标）
+    - entity_offsets/entity_postings: 键 → 实体编号，按该时期出现的句子数从多到少排列
+    """
+
+    def __init__(self, arrays: Dict[str, np.ndarray], graph_version: Optional[int] = None):
+        self.keys: List[str] = arrays['keys'].tolist()
+        self.kinds = arrays['kinds']
+        self.sentence_offsets = arrays['sentence_offsets']
+        self.sentence_postings = arrays['sentence_postings']
+        self.entity_offsets = arrays['entity_offsets']
+        self.entity_postings = arrays['entity_postings']
+        self.context_ids: List[str] = arrays['context_ids'].tolist()
+        self.entity_names: List[str] = arrays['entity_names'].tolist()
+        self.graph_version = graph_version
+        self._key_index = {key: i for i, key in enumerate(self.keys)}
+
+    @classmethod
+    def build(cls, df: pd.DataFrame, graph_version: Optional[int] = None) -> "EraIndex":
+        """由三元组DataFrame构建索引（每个不同的原文句子只识别一次）"""
+        entity_index: Dict[str, int] = {}
+        key_sentences: Dict[Tuple[int, str], List[int]] = {}
+        key_entities: Dict[Tuple[int, str], Dict[int, int]] = {}
+        context_ids = []
+
+        for context, group in df.groupby('context', sort=False):
+            periods = detect_periods(context)
+            if not periods:
+                continue
+            sentence = len(context_ids)
+            context_ids.append(context_id(context))
+            entities = {entity_index.setdefault(e, len(entity_index))
+                        for e in pd.concat([group['head_entity'], group['tail_entity']])}
+            for period in periods:
+                key_sentences.setdefault(period, []).append(sentence)
+                counts = key_entities.setdefault(period, {})
+                for e in entities:
+                    counts[e] = counts.get(e, 0) + 1
+
+        periods = sorted(key_sentences, key=lambda p: p[1])
+        sentence_offsets, sentence_postings = _csr([key_sentences[p] for p in periods])
+        entity_offsets, entity_postings = _csr([
+            sorted(key_entities[p], key=lambda e: (-key_entities[p][e], e)) for p in periods
+        ])
+        return cls({
+            'keys': np.array([key for _, key in periods], dtype=str),
+            'kinds': np.array([kind for kind, _ in periods], dtype=np.int8),
+            'sentence_offsets': sentence_offsets,
+            'sentence_postings': sentence_postings,
+            'entity_offsets': entity_offsets,
+            'entity_postings': entity_postings,
+            'context_ids': np.array(context_ids, dtype=str),
+            'entity_names': np.array(list(entity_index), dtype=str)
+        }, graph_version)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._key_index
+
+    def detect(self, question: str) -> List[str]:
+        """
+        识别问题中出现且在索引中有记录的时期
+        问题同时给出年号和干支且索引中有该组合时只返回组合键，否则返回年号
+        """
+        periods = [(kind, key) for kind, key in detect_periods(question, question=True) if key in self._key_index]
+        combined = [key for kind, key in periods if kind == KIND_GANZHI]
+        if combined:
+            return combined
+        return [key for _, key in periods]
+
+    def sentences(self, key: str) -> np.ndarray:
+        """该时期的句子编号"""
+        i = self._key_index.get(key)
+        if i is None:
+            return np.empty(0, dtype=np.int32)
+        return self.sentence_postings[self.sentence_offsets[i]:self.sentence_offsets[i + 1]]
+
+    def entities(self, key: str) -> List[str]:
+        """该时期句子中出现的实体名称（繁体，与图谱一致），出现次数多的在前"""
+        i = self._key_index.get(key)
+        if i is None:
+            return []
+        return [self.entity_names[e] for e in self.entity_postings[self.entity_offsets[i]:self.entity_offsets[i + 1]]]
+
+    def context_ids_for(self, keys: List[str]) -> set:
+        """多个时期的句子 context_id 并集"""
+        return {self.context_ids[s] for key in keys for s in self.sentences(key)}
+
+    def save(self, path: str) -> None:
+        """保存为npz文件"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            format_version=np.int32(ERA_FORMAT_VERSION),
+            graph_version=np.int64(-1 if self.graph_version is None else self.graph_version),
+            keys=np.array(self.keys, dtype=str),
+            kinds=self.kinds,
+            sentence_offsets=self.sentence_offsets,
+            sentence_postings=self.sentence_postings,
+            entity_offsets=self.entity_offsets,
+            entity_postings=self.entity_postings,
+            context_ids=np.array(self.context_ids, dtype=str),
+            entity_names=np.array(self.entity_names, dtype=str)
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "EraIndex":
+        data = np.load(path, allow_pickle=False)
+        if int(data['format_version']) != ERA_FORMAT_VERSION:
+            raise ValueError(f"年号索引版本不兼容: {int(data['format_version'])}，期望 {ERA_FORMAT_VERSION}")
+        graph_version = int(data['graph_version'])
+        return cls(
+            {name: data[name] for name in data.files if name not in ('format_version', 'graph_version')},
+            None if graph_version < 0 else graph_version
+        )
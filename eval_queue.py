@@ -0,0 +1,253 @@
+# eval_queue.py
+# 后台评估队列：回答路径只负责入队，评分由有界的后台线程池批量完成
+import os
+import json
+import time
+import queue
+import atexit
+import random
+import threading
+from dataclasses import dataclass, asdict, field
+from typing import Callable, Dict, List, Optional
+
+# 队列已满时的处理方式
+OVERFLOW_DROP = "drop"    # 丢弃新任务
+OVERFLOW_SPILL = "spill"  # 写入磁盘，队列空闲时再读回
+
+
+@dataclass
+class EvalJob:
+    """一次问答的评估任务"""
+    question: str
+    contexts: List[str]
+    answer: str
+    trace_id: Optional[str] = None
+    session_id: Optional[str] = None
+    enqueued_at: float = field(default_factory=time.time)
+
+
+class EvaluationQueue:
+    """
+    有界的后台评估队列
+    - submit 从不阻塞：按采样率抽样，队列已满时丢弃或溢写到磁盘
+    - 后台线程每次取出最多 batch_size 个任务批量评分，评分失败只记录不重试
+    """
+
+    def __init__(
+        self,
+        score_fn: Callable[[List[EvalJob]], List[Dict]],
+        result_fn: Optional[Callable[[EvalJob, Dict], None]] = None,
+        workers: int = 2,
+        max_queue: int = 256,
+        batch_size: int = 8,
+        batch_wait: float = 0.5,
+        sample_rate: float = 1.0,
+        overflow: str = OVERFLOW_DROP,
+        spill_path: Optional[str] = None
+    ):
+        """
+        Args:
+            score_fn: 批量评分函数，返回与任务一一对应的指标字典
+            result_fn: 处理单个任务评分结果的函数（如上报Langfuse）
+            workers: 后台评分线程数
+            max_queue: 内存中排队的任务数上限
+            batch_size: 每批评分的最大任务数
+            batch_wait: 凑批的最长等待时间(秒)
+            sample_rate: 评估的抽样比例（0~1）
+            overflow: 队列已满时的处理方式，drop 或 spill
+            spill_path: 溢写文件路径（JSON Lines），overflow 为 spill 时必填
+        """
+        if overflow not in (OVERFLOW_DROP, OVERFLOW_SPILL):
+            raise ValueError(f"未知的溢出处理方式: {overflow}")
+        if overflow == OVERFLOW_SPILL and not spill_path:
+            raise ValueError("溢写到磁盘需要提供 spill_path")
+
+        self.score_fn = score_fn
+        self.result_fn = result_fn
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.sample_rate = sample_rate
+        self.overflow = overflow
+        self.spill_path = spill_path
+
+        self._queue: "queue.Queue[EvalJob]" = queue.Queue(maxsize=max_queue)
+        self._spill_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._random = random.Random()
+
+        self.submitted = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.restored = 0
+        self.scored = 0
+        self.failed = 0
+        self.batches = 0
+        self.total_delay = 0.0
+
+        self._workers = [
+            threading.Thread(target=self._run, name=f"eval-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        atexit.register(self.close)
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    def submit(self, job: EvalJob) -> bool:
+        """提交评估任务，不阻塞调用方；返回任务是否进入队列（含溢写）"""
+        if self._closed.is_set():
+            return False
+        self._count("submitted")
+        if self.sample_rate < 1.0 and self._random.random() >= self.sample_rate:
+            self._count("sampled_out")
+            return False
+        try:
+            self._queue.put_nowait(job)
+            return True
+        except queue.Full:
+            if self.overflow == OVERFLOW_SPILL:
+                self._spill([job])
+                return True
+            self._count("dropped")
+            return False
+
+    def _spill(self, jobs: List[EvalJob]) -> None:
+        try:
+            with self._spill_lock:
+                os.makedirs(os.path.dirname(os.path.abspath(self.spill_path)), exist_ok=True)
+                with open(self.spill_path, "a", encoding="utf-8") as f:
+                    for job in jobs:
+                        f.write(json.dumps(asdict(job), ensure_ascii=False) + "\n")
+            self._count("spilled", len(jobs))
+        except OSError as e:
+            print(f"评估任务溢写失败: {e}")
+            self._count("dropped", len(jobs))
+
+    def _restore_spilled(self) -> None:
+        """队列空闲时读回溢写的任务，放不下的部分写回文件"""
+        if self.overflow != OVERFLOW_SPILL or not os.path.exists(self.spill_path):
+            return
+        with self._spill_lock:
+            try:
+                with open(self.spill_path, "r", encoding="utf-8") as f:
+                    lines = f.readlines()
+                os.remove(self.spill_path)
+            except OSError:
+                return
+
+            remaining = []
+            for line in lines:
+                if remaining:
+                    remaining.append(line)
+                    continue
+                try:
+                    job = EvalJob(**json.loads(line))
+                except (ValueError, TypeError):
+                    continue
+                try:
+                    self._queue.put_nowait(job)
+                    self._count("restored")
+                except queue.Full:
+                    remaining.append(line)
+            if remaining:
+                with open(self.spill_path, "w", encoding="utf-8") as f:
+                    f.writelines(remaining)
+
+    def _next_batch(self) -> List[EvalJob]:
+        try:
+            batch = [self._queue.get(timeout=1.0)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._closed.is_set():
+            batch = self._next_batch()
+            if not batch:
+                self._restore_spilled()
+                continue
+            try:
+                results = self.score_fn(batch)
+            except Exception as e:
+                print(f"批量评估失败: {e}")
+                self._count("failed", len(batch))
+                continue
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+            now = time.time()
+            for job, scores in zip(batch, results):
+                if self.result_fn is not None:
+                    try:
+                        self.result_fn(job, scores)
+                    except Exception as e:
+                        print(f"评估结果上报失败: {e}")
+            self._count("batches")
+            self._count("scored", len(batch))
+            self._count("total_delay", sum(now - job.enqueued_at for job in batch))
+            if self._queue.empty():
+                self._restore_spilled()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """等待当前排队的任务全部评分完成（用于离线评估和测试）"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def close(self) -> None:
+        """停止后台线程，溢写模式下把尚未评分的任务写入磁盘"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        pending = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+                self._queue.task_done()
+            except queue.Empty:
+                break
+        if pending and self.overflow == OVERFLOW_SPILL:
+            self._spill(pending)
+        elif pending:
+            self._count("dropped", len(pending))
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            return {
+                "queued": self._queue.qsize(),
+                "submitted": self.submitted,
+                "sampled_out": self.sampled_out,
+                "dropped": self.dropped,
+                "spilled": self.spilled,
+                "restored": self.restored,
+                "scored": self.scored,
+                "failed": self.failed,
+                "batches": self.batches,
+                "avg_delay": self.total_delay / self.scored if self.scored else 0.0
+            }
+
+    def report(self) -> str:
+        stats = self.stats()
+        return (
+            f"评估队列: 排队 {stats['queued']}，已评分 {stats['scored']}（{stats['batches']} 批，"
+            f"平均延后 {stats['avg_delay']:.1f}s），未抽中 {stats['sampled_out']}，"
+            f"丢弃 {stats['dropped']}，溢写 {stats['spilled']}（已读回 {stats['restored']}），失败 {stats['failed']}"
+        )
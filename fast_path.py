@@ -0,0 +1,119 @@
+# fast_path.py
+# 一跳事实问题的快速路径：问题只涉及一个实体和一种关系时直接由图谱作答，不构建向量库、不调用LLM
+import re
+from typing import Dict, List, Optional, Tuple
+
+from query_planner import RelationFilter, RelationQueryPlanner, RelationPlan, OUT, IN
+
+# 直接查询式的问法（"……是谁"、"谁担任过……"），其余问法（原因、经过、比较等）交给完整的RAG流程
+LOOKUP_PATTERN = re.compile(r'^谁|(是谁|有谁|(什么|哪些|哪里|何处|何地)[^，。,]{0,4})[？?。]?$')
+COMPLEX_PATTERN = re.compile(r'为什么|为何|如何|怎样|怎么|经过|原因|影响|评价|比较|区别|和|与|及')
+
+# 无方向含义的关系，两个方向的边合并作答
+SYMMETRIC_RELATIONS = {'兄弟', '同僚', '别名', '敌对攻伐'}
+
+# (关系类型, 被查询实体的方向) → 回答模板，关系类型与 KnowledgeGraphCreator.RELATION_COLOR_MAP 一致
+# 图谱中 父母 关系的头实体为父/母，尾实体为子女；上下级 关系的头实体为上级
+ANSWER_TEMPLATES: Dict[Tuple[str, str], str] = {
+    ('父母', IN): "{entity}的父母为{answers}",
+    ('父母', OUT): "{entity}的子女有{answers}",
+    ('兄弟', OUT): "{entity}的兄弟有{answers}",
+    ('别名', OUT): "{entity}又称{answers}",
+    ('任职', OUT): "{entity}曾任{answers}",
+    ('任职', IN): "曾任{entity}者有{answers}",
+    ('管理', OUT): "{entity}曾管理{answers}",
+    ('管理', IN): "管理过{entity}的有{answers}",
+    ('驻守', OUT): "{entity}曾驻守{answers}",
+    ('驻守', IN): "驻守过{entity}的有{answers}",
+    ('到达', OUT): "{entity}曾到达{answers}",
+    ('到达', IN): "到达过{entity}的有{answers}",
+    ('出生于某地', OUT): "{entity}出生于{answers}",
+    ('出生于某地', IN): "出生于{entity}的有{answers}",
+    ('敌对攻伐', OUT): "与{entity}交战的有{answers}",
+    ('上下级', OUT): "{entity}的下属有{answers}",
+    ('上下级', IN): "{entity}的上级有{answers}",
+    ('同僚', OUT): "{entity}的同僚有{answers}",
+    ('政治奥援', OUT): "{entity}援引或支持过{answers}",
+    ('政治奥援', IN): "援引或支持过{entity}的有{answers}"
+}
+
+
+class OneHopFastPath:
+    """
+    模板匹配的一跳问答
+    - match: 问题为直接查询式问法，且只包含一个实体和一种关系意图时返回查询条件
+    - answer: 由邻域中匹配的边生成固定格式的回答并附原文；非对称关系两个方向都有结果时视为有歧义
+    """
+
+    def __init__(self, planner: RelationQueryPlanner, max_answers: int = 20, max_sources: int = 5):
+        """
+        Args:
+            planner: 关系意图规划器
+            max_answers: 回答中最多列出的实体数
+            max_sources: 最多附上的原文句子数
+        """
+        self.planner = planner
+        self.max_answers = max_answers
+        self.max_sources = max_sources
+        self._t2s = None
+
+    def simplified(self, text: str) -> str:
+        """图谱中的实体名称为繁体，回答统一使用简体"""
+        if self._t2s is None:
+            from opencc import OpenCC
+            self._t2s = OpenCC('t2s')
+        return self._t2s.convert(text)
+
+    def match(
+        self,
+        question: str,
+        entities: List[Tuple[str, str, str]],
+        plan: Optional[RelationPlan]
+    ) -> Optional[Tuple[str, str, str]]:
+        """
+        Args:
+            question: 用户问题
+            entities: HistoricalQA._extract_entities 的结果 (原词, 繁体名称, 词性)
+            plan: 问题的关系意图（与完整检索共用）
+        Returns:
+            (原词, 繁体名称, 词性)，不适合快速作答时返回None
+        """
+        if plan is None or len(plan.relations) != 1:
+            return None
+        question = question.strip()
+        if not LOOKUP_PATTERN.search(question) or COMPLEX_PATTERN.search(question):
+            return None
+        # "父母"、"官职"等关系关键词本身也会被识别为名词，不算作实体
+        candidates = [(word, name, flag) for word, name, flag in entities if self.planner.plan(word) is None]
+        if len({name for _, name, _ in candidates}) != 1:
+            return None
+        return candidates[0]
+
+    def answer(self, word: str, relation_filter: RelationFilter, results: List[Dict]) -> Optional[str]:
+        """由邻域查询结果生成回答，没有匹配的边或存在歧义时返回None"""
+        matched = [r for r in results if relation_filter.matches(r)]
+        if not matched:
+            return None
+        relation = matched[0]['relation']
+        directions = {r['direction'] for r in matched}
+        if relation in SYMMETRIC_RELATIONS:
+            direction = OUT
+        elif len(directions) == 1:
+            direction = directions.pop()
+        else:
+            return None
+        template = ANSWER_TEMPLATES.get((relation, direction))
+        if template is None:
+            return None
+
+        answers = list(dict.fromkeys(self.simplified(r['entity2']) for r in matched))
+        listed = "、".join(answers[:self.max_answers])
+        if len(answers) > self.max_answers:
+            listed += f"等{len(answers)}个"
+        sources = list(dict.fromkeys(r['context'] for r in matched if r.get('context')))
+
+        lines = ["根据史料记载，" + template.format(entity=word, answers=listed) + "。"]
+        if sources:
+            lines.append("史料原文：")
+            lines += [f"{i}. {context}" for i, context in enumerate(sources[:self.max_sources], 1)]
+        return "\n".join(lines)
@@ -0,0 +1,140 @@
+# kg_queries.py
+# 问答系统对图谱执行的Cypher查询。除Neo4j外的图后端（如测试桩）按这些查询语句提供同样的结果
+
+# 所有实体名称及标签，用于构建自定义词典
+ENTITY_LEXICON_QUERY = """
+MATCH (n)
+RETURN DISTINCT n.name as name, labels(n) as labels
+"""
+
+# 所有关系，用于构建实体关系映射（句子节点模式下从Sentence节点取原文）
+ALL_RELATIONS_QUERY = """
+MATCH (n1)-[r]->(n2)
+OPTIONAL MATCH (s:Sentence {id: r.context_id})
+RETURN 
+    n1.name as entity1,
+    type(r) as relation,
+    n2.name as entity2,
+    coalesce(r.context, s.text) as context
+"""
+
+# 实体的一跳邻域（entity1 始终为被查询的实体，direction 表示它是头实体(out)还是尾实体(in)，
+# importance 为邻居节点的PageRank，由 graph_analytics 在导入后写入；
+# 句子节点模式下关系上只有 context_id，context 为null，原文通过 SENTENCES_QUERY 按id批量获取）
+NEIGHBORHOOD_QUERY = """
+MATCH (n1 {name: $name})-[r]->(n2)
+RETURN 
+    n1.name as entity1,
+    type(r) as relation,
+    n2.name as entity2,
+    r.context as context,
+    r.context_id as context_id,
+    'out' as direction,
+    coalesce(n2.pagerank, 0.0) as importance
+UNION
+MATCH (n1)-[r]->(n2 {name: $name})
+RETURN 
+    n2.name as entity1,
+    type(r) as relation,
+    n1.name as entity2,
+    r.context as context,
+    r.context_id as context_id,
+    'in' as direction,
+    coalesce(n1.pagerank, 0.0) as importance
+"""
+
+# 按关系类型和方向过滤的一跳邻域
+TYPED_NEIGHBORHOOD_QUERY = """
+MATCH (n1 {name: $name})-[r]->(n2)
+WHERE type(r) IN $out_types
+RETURN 
+    n1.name as entity1,
+    type(r) as relation,
+    n2.name as entity2,
+    r.context as context,
+    r.context_id as context_id,
+    'out' as direction,
+    coalesce(n2.pagerank, 0.0) as importance
+UNION
+MATCH (n1)-[r]->(n2 {name: $name})
+WHERE type(r) IN $in_types
+RETURN 
+    n2.name as entity1,
+    type(r) as relation,
+    n1.name as entity2,
+    r.context as context,
+    r.context_id as context_id,
+    'in' as direction,
+    coalesce(n1.pagerank, 0.0) as importance
+"""
+
+# 按邻居重要度排序并分页的一跳邻域，out_types/in_types 为null时不过滤关系类型
+RANKED_NEIGHBORHOOD_QUERY = """
+CALL {
+    MATCH (n1 {name: $name})-[r]->(n2)
+    WHERE $out_types IS NULL OR type(r) IN $out_types
+    RETURN 
+        n1.name as entity1,
+        type(r) as relation,
+        n2.name as entity2,
+        r.context as context,
+        r.context_id as context_id,
+        'out' as direction,
+        coalesce(n2.pagerank, 0.0) as importance
+    UNION
+    MATCH (n1)-[r]->(n2 {name: $name})
+    WHERE $in_types IS NULL OR type(r) IN $in_types
+    RETURN 
+        n2.name as entity1,
+        type(r) as relation,
+        n1.name as entity2,
+        r.context as context,
+        r.context_id as context_id,
+        'in' as direction,
+        coalesce(n1.pagerank, 0.0) as importance
+}
+RETURN entity1, relation, entity2, context, context_id, direction, importance
+ORDER BY importance DESC
+SKIP $skip
+LIMIT $limit
+"""
+
+# 按id批量获取句子节点的原文（句子节点模式）
+SENTENCES_QUERY = """
+MATCH (s:Sentence)
+WHERE s.id IN $ids
+RETURN s.id as id, s.text as text
+"""
+
+# 原文句子为指定id的全部关系（entity1 为头实体），用于按年号索引得到的句子一次取出某时期的关系；
+# 只适用于关系上保存 context_id 的图谱（句子节点模式或SQLite图谱），Neo4j需为各关系类型的 context_id 建立索引
+CONTEXT_EDGES_QUERY = """
+MATCH (n1)-[r]->(n2)
+WHERE r.context_id IN $ids
+RETURN 
+    n1.name as entity1,
+    type(r) as relation,
+    n2.name as entity2,
+    r.context as context,
+    r.context_id as context_id,
+    'out' as direction,
+    coalesce(n2.pagerank, 0.0) as importance
+"""
+
+# 实体名称、标签及度数（优先使用 graph_analytics 写入的degree属性），用于构建实体名称补全索引
+ENTITY_DEGREE_QUERY = """
+MATCH (n)
+WHERE n.name IS NOT NULL
+RETURN n.name as name, labels(n) as labels, coalesce(n.degree, size([(n)--() | 1])) as degree
+"""
+
+# 图谱版本号（由KnowledgeGraphCreator在每次导入后递增）
+GRAPH_VERSION_QUERY = """
+MATCH (m:KGMeta {key: 'graph'})
+RETURN m.version as version
+"""
+
+
+def normalize_query(query: str) -> str:
+    """去除多余空白，便于非Neo4j后端按语句匹配查询"""
+    return " ".join(query.split())
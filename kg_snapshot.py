@@ -0,0 +1,135 @@
+# kg_snapshot.py
+import os
+import time
+import pickle
+import jieba
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 快照文件头与格式版本，格式不兼容时递增
+SNAPSHOT_MAGIC = b"CHKGSNAP"
+SNAPSHOT_FORMAT_VERSION = 1
+
+# 实体标签对应的jieba词性
+LABEL_TAGS = {
+    '人物': 'nr',
+    '地点': 'ns',
+    '官衔': 'nz'
+}
+
+# 问答中常用的关系词
+COMMON_WORDS = ['官职', '父母', '兄弟', '任职']
+
+WORD_FREQ = 1000
+
+
+def word_tag(labels: List[str]) -> Optional[str]:
+    """根据节点标签确定jieba词性"""
+    for label, tag in LABEL_TAGS.items():
+        if label in labels:
+            return tag
+    return None
+
+
+def build_snapshot(df, graph_version: Optional[int], label_map: Dict) -> Dict:
+    """
+    根据导入图谱的三元组构建快照
+    Args:
+        df: json_to_csv 生成的三元组DataFrame
+        graph_version: 导入完成后的图谱版本号
+        label_map: 实体类型到节点标签的映射（KnowledgeGraphCreator.ENTITY_LABEL_MAP）
+    """
+    lexicon: Dict[str, List[str]] = {}
+    entity_relations: Dict[str, List[Dict]] = {}
+    for row in df.itertuples(index=False):
+        for name, entity_type in ((row.head_entity, row.head_entity_label),
+                                  (row.tail_entity, row.tail_entity_label)):
+            label = label_map.get(entity_type, {'label': 'Entity'})['label']
+            labels = lexicon.setdefault(name, [])
+            if label not in labels:
+                labels.append(label)
+
+        relation = {
+            'entity1': row.head_entity,
+            'relation': row.relation,
+            'entity2': row.tail_entity,
+            'context': row.context
+        }
+        entity_relations.setdefault(row.head_entity, []).append(relation)
+        entity_relations.setdefault(row.tail_entity, []).append(relation)
+
+    return {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'graph_version': graph_version,
+        'created_at': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'lexicon': lexicon,
+        'userdict': build_userdict(lexicon),
+        'entity_relations': entity_relations
+    }
+
+
+def build_userdict(lexicon: Dict[str, List[str]]) -> Dict:
+    """预先计算jieba词典的增量（词频、词性和前缀），加载时只需合并字典"""
+    words = {}
+    tags = {}
+    for name, labels in lexicon.items():
+        if not name:
+            continue
+        words[name] = WORD_FREQ
+        tag = word_tag(labels)
+        if tag:
+            tags[name] = tag
+    for word in COMMON_WORDS:
+        words[word] = WORD_FREQ
+
+    prefixes = set()
+    for word in words:
+        for i in range(1, len(word)):
+            prefixes.add(word[:i])
+    return {
+        'words': words,
+        'tags': tags,
+        'prefixes': sorted(prefixes - set(words))
+    }
+
+
+def apply_userdict(userdict: Dict) -> None:
+    """将预构建的用户词典合并进jieba，效果等同于逐个调用 jieba.add_word"""
+    tokenizer = jieba.dt
+    tokenizer.check_initialized()
+    with tokenizer.lock:
+        freq = tokenizer.FREQ
+        for prefix in userdict['prefixes']:
+            freq.setdefault(prefix, 0)
+        freq.update(userdict['words'])
+        tokenizer.total += sum(userdict['words'].values())
+        tokenizer.user_word_tag_tab.update(userdict['tags'])
+
+
+def write_snapshot(snapshot: Dict, path: str) -> None:
+    """写出快照文件（先写临时文件再替换，避免读到写了一半的快照）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str) -> Optional[Dict]:
+    """一次性读取快照文件，文件不存在或格式不兼容时返回None"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+
+    if not data.startswith(SNAPSHOT_MAGIC):
+        print(f"快照文件格式无法识别: {path}")
+        return None
+    snapshot = pickle.loads(data[len(SNAPSHOT_MAGIC):])
+    if snapshot.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+        print(f"快照格式版本不兼容: {snapshot.get('format_version')}")
+        return None
+    return snapshot
@@ -0,0 +1,420 @@
+# load_test.py
+# 压测工具：模拟多个Streamlit会话并发访问问答层，统计吞吐、延迟分位数、错误率和争用热点
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sample_questions import SAMPLE_QUESTIONS
+
+# HistoricalQA 捕获异常后返回的回答，计为错误
+ERROR_ANSWERS = ("抱歉，处理您的问题时出现了错误",)
+# 未识别实体或未检索到史料时的回答，计为无结果
+EMPTY_ANSWERS = ("抱歉，我无法从问题中识别出", "抱歉，我没有找到关于")
+
+SESSION_THREAD_PREFIX = "session"
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+# 线程栈顶为这些Python函数时视为阻塞等待（time.sleep等C函数不产生栈帧，计入其调用者）
+BLOCKING_FUNCTIONS = {"acquire", "wait", "sleep", "join", "result", "_wait_for_tstate_lock", "select", "recv_into"}
+
+
+def question_mix(weights: Optional[Dict[str, float]] = None) -> Tuple[List[str], List[float]]:
+    """
+    由示例问题生成加权问题集，类别权重平均分配给类别内的问题
+    Args:
+        weights: 类别权重，未列出的类别权重为0；为None时各类别权重相同
+    """
+    questions, question_weights = [], []
+    for category, items in SAMPLE_QUESTIONS.items():
+        weight = 1.0 if weights is None else weights.get(category, 0.0)
+        if weight <= 0:
+            continue
+        for question in items:
+            questions.append(question)
+            question_weights.append(weight / len(items))
+    if not questions:
+        raise ValueError("问题集为空，请检查类别权重")
+    return questions, question_weights
+
+
+def parse_weights(spec: Optional[str]) -> Optional[Dict[str, float]]:
+    """解析形如 "人物关系类=3,官职任命类=1" 的类别权重"""
+    if not spec:
+        return None
+    weights = {}
+    for item in spec.split(","):
+        category, _, weight = item.partition("=")
+        category = category.strip()
+        if category not in SAMPLE_QUESTIONS:
+            raise ValueError(f"未知的问题类别: {category}（可选: {', '.join(SAMPLE_QUESTIONS)}）")
+        weights[category] = float(weight)
+    return weights
+
+
+def percentile(values: List[float], p: float) -> float:
+    """线性插值的分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+class Recorder:
+    """线程安全的延迟与结果记录"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Counter] = defaultdict(Counter)
+        self.exceptions: Counter = Counter()
+
+    def record(self, op: str, seconds: float, outcome: str = "ok", error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self.latencies[op].append(seconds)
+            self.outcomes[op][outcome] += 1
+            if error is not None:
+                self.exceptions[f"{op}: {type(error).__name__}: {error}"[:160]] += 1
+
+
+class StackSampler:
+    """
+    定期采样会话线程的调用栈，统计各线程所处的项目内代码位置
+    栈顶为锁等待、sleep等阻塞调用的样本计为阻塞，阻塞占比高的位置即为争用热点
+    """
+
+    def __init__(self, interval: float = 0.01, thread_prefix: str = SESSION_THREAD_PREFIX):
+        self.interval = interval
+        self.thread_prefix = thread_prefix
+        self.samples: Counter = Counter()
+        self.blocked: Counter = Counter()
+        self.total = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            threads = {
+                t.ident for t in threading.enumerate()
+                if t.name.startswith(self.thread_prefix)
+            }
+            for ident, frame in sys._current_frames().items():
+                if ident in threads:
+                    self._sample(frame)
+
+    def _sample(self, frame) -> None:
+        leaf = frame.f_code.co_name
+        location = None
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(PROJECT_DIR) and not filename.endswith("load_test.py"):
+                location = f"{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+                break
+            frame = frame.f_back
+        if location is None:
+            return
+        self.total += 1
+        self.samples[location] += 1
+        if leaf in BLOCKING_FUNCTIONS:
+            self.blocked[location] += 1
+
+    def hotspots(self, top: int = 10) -> List[Tuple[str, float, float]]:
+        """返回 (位置, 样本占比, 其中阻塞占比)"""
+        if not self.total:
+            return []
+        return [
+            (location, count / self.total, self.blocked[location] / count)
+            for location, count in self.samples.most_common(top)
+        ]
+
+
+class LoadTest:
+    """按目标并发（闭环）或目标速率（开环）回放加权问题集"""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], object],
+        questions: List[str],
+        weights: List[float],
+        visualization_ratio: float = 1.0,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            session_factory: 创建会话问答系统的函数（对应应用中的initialize_qa_system）
+            questions: 问题集
+            weights: 问题权重
+            visualization_ratio: 回答后再请求知识图谱可视化的比例，应用中每个问题都会请求
+            seed: 随机种子
+        """
+        self.session_factory = session_factory
+        self.questions = questions
+        self.weights = weights
+        self.visualization_ratio = visualization_ratio
+        self.random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.recorder = Recorder()
+
+        # 所有会话共享同一个 temp_graph.html，统计可视化请求重叠的次数
+        self._visualization_lock = threading.Lock()
+        self._visualizations_in_flight = 0
+        self.visualization_overlaps = 0
+
+    def _pick(self) -> Tuple[str, bool]:
+        with self._random_lock:
+            question = self.random.choices(self.questions, self.weights)[0]
+            return question, self.random.random() < self.visualization_ratio
+
+    def _timed(self, op: str, fn: Callable, *args, started: Optional[float] = None):
+        start = time.perf_counter() if started is None else started
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self.recorder.record(op, time.perf_counter() - start, "exception", e)
+            return None
+        outcome = "ok"
+        if isinstance(result, str):
+            if result.startswith(ERROR_ANSWERS):
+                outcome = "error"
+            elif result.startswith(EMPTY_ANSWERS):
+                outcome = "empty"
+        self.recorder.record(op, time.perf_counter() - start, outcome)
+        return result
+
+    def _visualize(self, session, question: str):
+        with self._visualization_lock:
+            self._visualizations_in_flight += 1
+            if self._visualizations_in_flight > 1:
+                self.visualization_overlaps += 1
+        try:
+            return session.get_visualization_data(question)
+        finally:
+            with self._visualization_lock:
+                self._visualizations_in_flight -= 1
+
+    def create_session(self):
+        return self._timed("initialize", self.session_factory)
+
+    def request(self, session, scheduled: Optional[float] = None) -> None:
+        """一次用户交互：回答问题，并按比例请求可视化"""
+        question, visualize = self._pick()
+        self._timed("answer", session.answer_question, question, started=scheduled)
+        if visualize:
+            self._timed("visualization", self._visualize, session, question)
+
+    def run_closed(self, concurrency: int, duration: float, think_time: float = 0.0) -> float:
+        """闭环压测：concurrency 个会话各自循环提问，返回实际耗时"""
+        deadline = time.perf_counter() + duration
+
+        def session_loop():
+            session = self.create_session()
+            if session is None:
+                return
+            while time.perf_counter() < deadline:
+                self.request(session)
+                if think_time:
+                    time.sleep(think_time)
+
+        threads = [
+            threading.Thread(target=session_loop, name=f"{SESSION_THREAD_PREFIX}-{i}")
+            for i in range(concurrency)
+        ]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    def run_open(self, rate: float, duration: float, sessions: int, max_workers: int) -> float:
+        """
+        开环压测：按泊松过程以 rate 次/秒 到达，请求轮流分配给 sessions 个会话
+        延迟从计划到达时刻起算，包含排队时间
+        """
+        with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix=SESSION_THREAD_PREFIX) as pool:
+            pool_sessions = [s for s in pool.map(lambda _: self.create_session(), range(sessions)) if s is not None]
+        if not pool_sessions:
+            return 0.0
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=SESSION_THREAD_PREFIX) as pool:
+            scheduled = start
+            i = 0
+            while scheduled < start + duration:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.request, pool_sessions[i % len(pool_sessions)], scheduled)
+                i += 1
+                with self._random_lock:
+                    scheduled += self.random.expovariate(rate)
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float, sampler: Optional[StackSampler] = None, top: int = 10) -> str:
+        recorder = self.recorder
+        lines = [f"压测耗时 {elapsed:.1f}s"]
+        lines.append(
+            f"{'操作':<14}{'次数':>6}{'吞吐(次/s)':>12}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>9}"
+            f"{'错误率':>9}{'无结果':>8}"
+        )
+        for op in ("initialize", "answer", "visualization"):
+            values = recorder.latencies.get(op)
+            if not values:
+                continue
+            outcomes = recorder.outcomes[op]
+            count = len(values)
+            failed = outcomes["error"] + outcomes["exception"]
+            lines.append(
+                f"{op:<14}{count:>6}{count / elapsed if elapsed else 0:>12.2f}"
+                + "".join(f"{percentile(values, p) * 1000:>7.0f}ms" for p in (50, 90, 95, 99))
+                + f"{max(values) * 1000:>7.0f}ms{failed / count:>9.1%}{outcomes['empty'] / count:>8.1%}"
+            )
+
+        if recorder.exceptions:
+            lines.append("异常:")
+            for message, count in recorder.exceptions.most_common(top):
+                lines.append(f"  {count:>5} × {message}")
+        if self.visualization_overlaps:
+            lines.append(
+                f"⚠️ 可视化请求重叠 {self.visualization_overlaps} 次，"
+                "各会话共享的 temp_graph.html 可能被互相覆盖"
+            )
+        if sampler is not None and sampler.total:
+            lines.append(f"争用热点（{sampler.total} 个栈样本）:")
+            for location, share, blocked in sampler.hotspots(top):
+                lines.append(f"  {share:>6.1%}  阻塞 {blocked:>6.1%}  {location}")
+        return "\n".join(lines)
+
+
+def build_session_factory(args) -> Callable[[], object]:
+    """根据命令行参数创建会话工厂，图谱、向量模型和对话模型可分别替换为带延迟的测试桩"""
+    if args.service_url:
+        from qa_service import QAServiceClient
+        return lambda: QAServiceClient(args.service_url)
+
+    from RAG import HistoricalQA
+
+    # 图谱在所有会话间共享（对应同一个Neo4j实例）
+    if args.graph == "stub":
+        from stubs import InMemoryGraph
+        graph = InMemoryGraph(args.triples, latency=args.graph_latency)
+    elif args.graph == "sqlite":
+        from sqlite_graph import SQLiteGraph
+        graph = SQLiteGraph(args.sqlite)
+    else:
+        from Create_KG import KnowledgeGraphCreator
+        creator = KnowledgeGraphCreator(
+            neo4j_url=args.neo4j_url,
+            username=args.username,
+            password=args.password
+        )
+        creator.connect_to_neo4j()
+        graph = creator.graph
+
+    def create_models():
+        llm = embedding_model = None
+        if args.llm == "stub":
+            from stubs import StubChatModel
+            llm = StubChatModel(latency=args.llm_latency)
+        if args.embeddings == "stub":
+            from stubs import StubEmbeddings
+            embedding_model = StubEmbeddings(latency=args.embedding_latency)
+        return llm, embedding_model
+
+    def create_system():
+        # 离线回放不调用模型，但测试桩对话模型的参数决定回放记录的请求哈希，仍需传入
+        llm, embedding_model = create_models()
+        return HistoricalQA(
+            graph,
+            llm=llm,
+            embedding_model=embedding_model,
+            snapshot_path=args.snapshot,
+            cassette_path=args.cassette,
+            cassette_mode=args.cassette_mode,
+            cassette_latency=args.cassette_latency
+        )
+
+    if args.shared_system:
+        shared = create_system()
+        return lambda: shared
+
+    # 与应用一致：每个会话各自构建HistoricalQA
+    return create_system
+
+
+def main():
+    parser = argparse.ArgumentParser(description="问答系统并发压测（模拟多个Streamlit会话）")
+    parser.add_argument("--concurrency", type=int, default=10, help="闭环模式下的并发会话数")
+    parser.add_argument("--rate", type=float, help="开环模式下的请求到达速率(次/秒)，指定后忽略 --concurrency")
+    parser.add_argument("--sessions", type=int, default=10, help="开环模式下的会话数")
+    parser.add_argument("--max-workers", type=int, default=50, help="开环模式下同时处理的请求数上限")
+    parser.add_argument("--duration", type=float, default=30.0, help="压测时长(秒)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="闭环模式下每次提问后的等待(秒)")
+    parser.add_argument("--weights", help="问题类别权重，如 人物关系类=3,官职任命类=1")
+    parser.add_argument("--visualization-ratio", type=float, default=1.0, help="请求知识图谱可视化的比例")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--graph", choices=["stub", "sqlite", "neo4j"], default="stub")
+    parser.add_argument("--llm", choices=["stub", "openai"], default="stub")
+    parser.add_argument("--embeddings", choices=["stub", "openai"], default="stub")
+    parser.add_argument("--graph-latency", type=float, default=0.005, help="测试桩图谱每次查询的延迟(秒)")
+    parser.add_argument("--llm-latency", type=float, default=1.0, help="测试桩对话模型每次调用的延迟(秒)")
+    parser.add_argument("--embedding-latency", type=float, default=0.2, help="测试桩向量模型每次调用的延迟(秒)")
+    parser.add_argument("--shared-system", action="store_true", help="所有会话共享一个HistoricalQA实例")
+    parser.add_argument("--cassette", help="模型调用录制文件，配合 --cassette-mode 录制或离线回放")
+    parser.add_argument("--cassette-mode", choices=["record", "replay", "auto"], default="replay")
+    parser.add_argument("--cassette-latency", type=float, help="回放时的固定延迟(秒)，默认按录制耗时模拟")
+    parser.add_argument("--service-url", help="压测独立问答服务（qa_service.py）而不是进程内的HistoricalQA")
+    parser.add_argument("--triples", default="triples.csv", help="测试桩图谱加载的三元组")
+    parser.add_argument("--snapshot", default=None, help="图谱快照文件")
+    parser.add_argument("--sqlite", default="./kg_artifacts/graph.sqlite", help="SQLite嵌入式图谱文件")
+    parser.add_argument("--neo4j-url", default="neo4j://localhost:7687/")
+    parser.add_argument("--username", default="neo4j")
+    parser.add_argument("--password", default="12345678")
+    parser.add_argument("--sample-interval", type=float, default=0.01, help="调用栈采样间隔(秒)，为0时不采样")
+    args = parser.parse_args()
+
+    questions, weights = question_mix(parse_weights(args.weights))
+    test = LoadTest(
+        build_session_factory(args),
+        questions,
+        weights,
+        visualization_ratio=args.visualization_ratio,
+        seed=args.seed
+    )
+
+    sampler = StackSampler(args.sample_interval) if args.sample_interval > 0 else None
+    if sampler is not None:
+        sampler.start()
+    try:
+        if args.rate:
+            print(f"开环压测: {args.rate} 次/秒，{args.sessions} 个会话，持续 {args.duration}s")
+            elapsed = test.run_open(args.rate, args.duration, args.sessions, args.max_workers)
+        else:
+            print(f"闭环压测: {args.concurrency} 个并发会话，持续 {args.duration}s")
+            elapsed = test.run_closed(args.concurrency, args.duration, args.think_time)
+    finally:
+        if sampler is not None:
+            sampler.stop()
+
+    print()
+    print(test.report(elapsed, sampler))
+
+
+if __name__ == "__main__":
+    main()
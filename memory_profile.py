@@ -0,0 +1,299 @@
+# memory_profile.py
+# HistoricalQA 常驻数据结构的内存分析：深度大小统计、Redis缓存载荷统计与 tracemalloc 快照对比
+import gc
+import sys
+import types
+import argparse
+import tracemalloc
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# 不向下展开的对象类型：代码、模块和类由所有会话共享，不计入单个实例
+_OPAQUE_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.CodeType
+)
+
+# HistoricalQA 写入Redis的键
+REDIS_KEY_PATTERNS = {
+    'vector_store': 'vector_store:*',
+    'neighborhood': 'neighborhood:*',
+    'entity_relations': 'entity_relations_mapping'
+}
+
+
+def deep_sizeof(obj, seen: Optional[set] = None) -> int:
+    """
+    统计对象及其引用的全部对象占用的字节数，共享对象只计一次
+    numpy数组按 sys.getsizeof 计算（内存映射的数组不含映射的数据）
+    """
+    seen = set() if seen is None else seen
+    size = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _OPAQUE_TYPES):
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+
+        if isinstance(current, (str, bytes, bytearray, int, float, bool, np.ndarray)) or current is None:
+            continue
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        else:
+            if hasattr(current, '__dict__'):
+                stack.append(current.__dict__)
+            for slot in getattr(type(current), '__slots__', ()):
+                if hasattr(current, slot):
+                    stack.append(getattr(current, slot))
+    return size
+
+
+def vector_store_size(vector_store) -> Dict[str, int]:
+    """估算FAISS向量存储的内存：索引中的向量与文档存储"""
+    index = vector_store.index
+    return {
+        'vectors': vector_store.index.ntotal,
+        'index_bytes': index.ntotal * index.d * np.dtype(np.float32).itemsize,
+        'docstore_bytes': deep_sizeof(vector_store.docstore) + deep_sizeof(vector_store.index_to_docstore_id)
+    }
+
+
+def resident_sizes(qa_system) -> Dict[str, Dict]:
+    """
+    统计HistoricalQA常驻数据结构的深度大小（字节）
+    尚未构建的结构（如延迟初始化的实体关系映射）不会被触发构建
+    """
+    import jieba
+    import jieba.posseg
+
+    sizes = {}
+
+    # jieba词典为进程级全局对象，多会话部署时所有会话共享一份
+    seen = set()
+    sizes['jieba_dictionary'] = {
+        'bytes': deep_sizeof(jieba.dt.FREQ, seen) + deep_sizeof(jieba.dt.user_word_tag_tab, seen)
+        + deep_sizeof(jieba.posseg.dt.word_tag_tab, seen),
+        'items': len(jieba.dt.FREQ),
+        'shared': True
+    }
+
+    entity_relations = qa_system._entity_relations
+    sizes['entity_relations'] = {
+        'bytes': deep_sizeof(entity_relations) if entity_relations is not None else 0,
+        'items': len(entity_relations) if entity_relations is not None else 0,
+        'shared': False
+    }
+
+    cache = qa_system.neighborhood_cache
+    if cache is not None:
+        sizes['neighborhood_cache'] = {
+            'bytes': deep_sizeof(cache._entries),
+            'items': len(cache._entries),
+            'shared': False
+        }
+
+    artifact = qa_system.embedding_artifact
+    if artifact is not None:
+        sizes['embedding_artifact'] = {
+            'bytes': deep_sizeof([
+                artifact.entity1, artifact.relation, artifact.entity2,
+                artifact.context_ids, artifact.contexts, artifact._rows
+            ]),
+            'items': len(artifact),
+            # 向量矩阵以内存映射方式打开，由操作系统页缓存在进程间共享
+            'mapped_bytes': int(artifact.matrix.nbytes),
+            'shared': False
+        }
+    return sizes
+
+
+def redis_payload_sizes(redis_client, patterns: Optional[Dict[str, str]] = None) -> Dict[str, Dict]:
+    """统计Redis中各类缓存键的数量与序列化载荷大小"""
+    patterns = patterns or REDIS_KEY_PATTERNS
+    sizes = {}
+    for name, pattern in patterns.items():
+        keys, total, largest = 0, 0, 0
+        for key in redis_client.scan_iter(match=pattern, count=500):
+            length = redis_client.strlen(key)
+            keys += 1
+            total += length
+            largest = max(largest, length)
+        sizes[name] = {'keys': keys, 'bytes': total, 'largest': largest}
+    return sizes
+
+
+def format_bytes(size: float) -> str:
+    for unit in ('B', 'KB', 'MB'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def format_report(sizes: Dict[str, Dict], redis_sizes: Optional[Dict[str, Dict]] = None) -> str:
+    lines = ["HistoricalQA 常驻内存:"]
+    for name, info in sizes.items():
+        line = f"  {name:<20} {format_bytes(info['bytes']):>12}  {info['items']} 项"
+        if 'mapped_bytes' in info:
+            line += f"，内存映射 {format_bytes(info['mapped_bytes'])}"
+        if info.get('shared'):
+            line += "（进程内共享）"
+        lines.append(line)
+    if redis_sizes:
+        lines.append("Redis缓存载荷:")
+        for name, info in redis_sizes.items():
+            lines.append(
+                f"  {name:<20} {format_bytes(info['bytes']):>12}  {info['keys']} 个键，"
+                f"最大 {format_bytes(info['largest'])}"
+            )
+    return "\n".join(lines)
+
+
+class MemoryProfiler:
+    """
+    用 tracemalloc 快照记录启动与每个问题前后的内存变化
+    对同一组问题重复多轮，若每轮结束后内存持续增长则可能存在泄漏
+    """
+
+    def __init__(self, frames: int = 1):
+        self.frames = frames
+        self.snapshots: List = []
+        self.labels: List[str] = []
+        self.vector_stores: List[Dict] = []
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self.take("baseline")
+
+    def take(self, label: str):
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")
+        ))
+        self.snapshots.append(snapshot)
+        self.labels.append(label)
+        return snapshot
+
+    def attach(self, qa_system) -> None:
+        """记录每个问题创建的向量存储大小"""
+        qa_system.memory_hooks.append(self._on_vector_store)
+
+    def _on_vector_store(self, event: str, vector_store) -> None:
+        if event == "vector_store":
+            self.vector_stores.append(vector_store_size(vector_store))
+
+    def traced_bytes(self, index: int = -1) -> int:
+        return sum(stat.size for stat in self.snapshots[index].statistics("filename"))
+
+    def diff(self, start: int, end: int = -1, top: int = 10) -> List:
+        """对比两个快照，返回增长最多的分配位置"""
+        stats = self.snapshots[end].compare_to(self.snapshots[start], "lineno")
+        return [stat for stat in stats if stat.size_diff > 0][:top]
+
+    def profile_questions(self, qa_system, questions: List[str], rounds: int = 3) -> List[int]:
+        """
+        重复回答同一组问题，返回每轮结束后相对于第一轮结束时的内存增量（字节）
+        第一轮会填充缓存和惰性结构，从第二轮起的持续增长才视为泄漏
+        """
+        round_ends = []
+        for i in range(rounds):
+            for question in questions:
+                qa_system.answer_question(question)
+                self.take(f"round{i + 1}:{question}")
+            round_ends.append(len(self.snapshots) - 1)
+
+        first = self.traced_bytes(round_ends[0])
+        return [self.traced_bytes(index) - first for index in round_ends]
+
+
+def build_stub_system(triples_path: str, **kwargs):
+    """使用内存图谱和测试桩模型构建问答系统"""
+    from RAG import HistoricalQA
+    from stubs import InMemoryGraph, StubChatModel, StubEmbeddings
+    return HistoricalQA(
+        InMemoryGraph(triples_path),
+        llm=StubChatModel(),
+        embedding_model=StubEmbeddings(),
+        **kwargs
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HistoricalQA 内存占用与泄漏检测报告")
+    parser.add_argument("--stub", action="store_true", help="使用内存图谱和测试桩模型（无需Neo4j和OpenAI）")
+    parser.add_argument("--triples", default="triples.csv", help="测试桩模式下加载的三元组")
+    parser.add_argument("--neo4j-url", default="neo4j://localhost:7687/")
+    parser.add_argument("--username", default="neo4j")
+    parser.add_argument("--password", default="12345678")
+    parser.add_argument("--snapshot", default="./kg_artifacts/kg_snapshot.bin")
+    parser.add_argument("--question", action="append", help="参与分析的问题，可多次指定")
+    parser.add_argument("--rounds", type=int, default=3, help="重复回答问题的轮数")
+    parser.add_argument("--top", type=int, default=10, help="列出增长最多的分配位置数")
+    parser.add_argument("--redis", action="store_true", help="同时统计Redis中的缓存载荷")
+    parser.add_argument("--leak-threshold", type=float, default=64.0, help="每轮增长超过该值(KB)才视为泄漏")
+    args = parser.parse_args()
+
+    if args.question:
+        questions = args.question
+    else:
+        from sample_questions import all_questions
+        questions = all_questions()[:3]
+
+    profiler = MemoryProfiler()
+    profiler.start()
+    if args.stub:
+        qa_system = build_stub_system(args.triples)
+    else:
+        from Create_KG import KnowledgeGraphCreator
+        creator = KnowledgeGraphCreator(
+            neo4j_url=args.neo4j_url,
+            username=args.username,
+            password=args.password
+        )
+        creator.connect_to_neo4j()
+        from RAG import HistoricalQA
+        qa_system = HistoricalQA(creator.graph, snapshot_path=args.snapshot)
+    profiler.take("startup")
+    print(f"启动后 tracemalloc 记录的内存: {format_bytes(profiler.traced_bytes())}")
+    for stat in profiler.diff(0, top=args.top):
+        print(f"  {stat}")
+
+    profiler.attach(qa_system)
+    growth = profiler.profile_questions(qa_system, questions, args.rounds)
+
+    print()
+    print(qa_system.memory_report(include_redis=args.redis))
+    if profiler.vector_stores:
+        largest = max(profiler.vector_stores, key=lambda s: s['index_bytes'] + s['docstore_bytes'])
+        print(
+            f"单个问题的向量存储最大约 {format_bytes(largest['index_bytes'] + largest['docstore_bytes'])}"
+            f"（{largest['vectors']} 条向量），问题结束后释放"
+        )
+
+    print(f"\n{args.rounds} 轮 × {len(questions)} 个问题后的内存增量（相对第一轮结束）:")
+    for i, delta in enumerate(growth, 1):
+        print(f"  第{i}轮 {format_bytes(delta):>12}")
+    per_round = growth[-1] / (len(growth) - 1) if len(growth) > 1 else 0
+    if len(growth) > 2 and all(b > a for a, b in zip(growth[1:], growth[2:])) \
+            and per_round > args.leak_threshold * 1024:
+        print("⚠️ 内存随轮数持续增长，可能存在泄漏，增长最多的分配位置:")
+        for stat in profiler.diff(len(questions) + 1, top=args.top):
+            print(f"  {stat}")
+    else:
+        print(f"✅ 第一轮之后内存未持续增长（每轮 {format_bytes(per_round)}，阈值 {args.leak_threshold:.0f} KB）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+# model_dispatcher.py
+# 并发请求间的模型调用调度：向量请求微批合并，LLM请求令牌桶限速与自适应并发
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """判断是否为服务商限流错误"""
+    return type(error).__name__ == 'RateLimitError' or '429' in str(error)
+
+
+class TokenBucket:
+    """令牌桶限速器：平均速率为 rate 次/秒，允许最多 capacity 次突发"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+                self.waited += wait
+            time.sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD并发限制：调用成功时并发上限缓慢增加，遇到限流时减半"""
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, rate_limited: bool = False) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if rate_limited:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class _EmbeddingRequest:
+    __slots__ = ('texts', 'result', 'error', 'done')
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class EmbeddingBatcher(Embeddings):
+    """
+    向量请求微批合并：第一个到达的请求等待 window 秒收集其他线程的请求，
+    然后合并（并去重）为尽量少的批量调用，再把结果拆分回各请求
+    """
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        window: float = 0.005,
+        max_batch_size: int = 512,
+        rate_limiter: Optional[TokenBucket] = None
+    ):
+        self.inner = inner
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self.rate_limiter = rate_limiter
+        self._pending: List[_EmbeddingRequest] = []
+        self._collecting = False
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.texts = 0
+        self.provider_calls = 0
+        self.provider_texts = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        request = _EmbeddingRequest(list(texts))
+        with self._lock:
+            self._pending.append(request)
+            self.requests += 1
+            self.texts += len(texts)
+            leader = not self._collecting
+            if leader:
+                self._collecting = True
+
+        if leader:
+            time.sleep(self.window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._collecting = False
+            self._flush(batch)
+
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def _flush(self, batch: List[_EmbeddingRequest]) -> None:
+        unique = list(dict.fromkeys(text for request in batch for text in request.texts))
+        try:
+            vectors = {}
+            for start in range(0, len(unique), self.max_batch_size):
+                chunk = unique[start:start + self.max_batch_size]
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
+                for text, vector in zip(chunk, self.inner.embed_documents(chunk)):
+                    vectors[text] = vector
+                with self._lock:
+                    self.provider_calls += 1
+                    self.provider_texts += len(chunk)
+            for request in batch:
+                request.result = [vectors[text] for text in request.texts]
+        except Exception as e:
+            for request in batch:
+                request.error = e
+        finally:
+            for request in batch:
+                request.done.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'texts': self.texts,
+                'provider_calls': self.provider_calls,
+                'provider_texts': self.provider_texts,
+                'avg_batch_size': self.provider_texts / self.provider_calls if self.provider_calls else 0.0
+            }
+
+
+class LLMDispatcher:
+    """LLM调用调度：令牌桶限速 + 自适应并发，遇到限流时退避重试"""
+
+    def __init__(
+        self,
+        requests_per_second: float = 5.0,
+        burst: Optional[float] = None,
+        initial_concurrency: int = 4,
+        max_concurrency: int = 32,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0
+    ):
+        self.bucket = TokenBucket(requests_per_second, burst)
+        self.limiter = AdaptiveConcurrencyLimiter(initial_concurrency, 1, max_concurrency)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.calls = 0
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    def call(self, fn: Callable, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            self.limiter.acquire()
+            limited = False
+            try:
+                with self._lock:
+                    self.calls += 1
+                return fn(*args, **kwargs)
+            except Exception as e:
+                limited = is_rate_limited(e)
+                if not limited or attempt == self.max_retries:
+                    raise
+                with self._lock:
+                    self.rate_limited += 1
+            finally:
+                self.limiter.release(rate_limited=limited)
+            time.sleep(self.retry_backoff * (2 ** attempt))
+
+    def wrap(self, llm):
+        """包装为Runnable，可直接用于langchain链中替代原LLM"""
+        from langchain_core.runnables import RunnableLambda
+
+        def invoke(input, config):
+            return self.call(llm.invoke, input, config)
+
+        return RunnableLambda(invoke, name=f"dispatched_{type(llm).__name__}")
+
+    def stats(self) -> Dict:
+        return {
+            'calls': self.calls,
+            'rate_limited': self.rate_limited,
+            'concurrency_limit': round(self.limiter.limit, 2),
+            'in_flight': self.limiter.in_flight,
+            'throttled_seconds': round(self.bucket.waited, 3)
+        }
+
+
+class ModelDispatcher:
+    """HistoricalQA 的模型调度入口，包装向量模型和LLM"""
+
+    def __init__(
+        self,
+        embedding_window: float = 0.005,
+        embedding_max_batch_size: int = 512,
+        embedding_requests_per_second: Optional[float] = None,
+        llm_requests_per_second: float = 5.0,
+        llm_initial_concurrency: int = 4,
+        llm_max_concurrency: int = 32
+    ):
+        self.embedding_window = embedding_window
+        self.embedding_max_batch_size = embedding_max_batch_size
+        self.embedding_rate_limiter = (
+            TokenBucket(embedding_requests_per_second) if embedding_requests_per_second else None
+        )
+        self.llm = LLMDispatcher(
+            requests_per_second=llm_requests_per_second,
+            initial_concurrency=llm_initial_concurrency,
+            max_concurrency=llm_max_concurrency
+        )
+        # 每个向量模型只创建一个合并器，共享调度器的各会话（HistoricalQA）的请求在同一窗口内合并
+        self._batchers: Dict[int, EmbeddingBatcher] = {}
+        self._lock = threading.Lock()
+
+    def wrap_embeddings(self, embedding_model: Embeddings) -> EmbeddingBatcher:
+        """返回该向量模型的合并器，同一模型实例多次包装时返回同一个合并器"""
+        with self._lock:
+            batcher = self._batchers.get(id(embedding_model))
+            if batcher is None:
+                batcher = EmbeddingBatcher(
+                    embedding_model,
+                    window=self.embedding_window,
+                    max_batch_size=self.embedding_max_batch_size,
+                    rate_limiter=self.embedding_rate_limiter
+                )
+                self._batchers[id(embedding_model)] = batcher
+            return batcher
+
+    def wrap_llm(self, llm):
+        return self.llm.wrap(llm)
+
+    def stats(self) -> Dict:
+        """向量请求统计为全部合并器之和"""
+        with self._lock:
+            batchers = list(self._batchers.values())
+        embeddings = None
+        if batchers:
+            totals = [batcher.stats() for batcher in batchers]
+            embeddings = {
+                key: sum(stats[key] for stats in totals)
+                for key in ('requests', 'texts', 'provider_calls', 'provider_texts')
+            }
+            calls = embeddings['provider_calls']
+            embeddings['avg_batch_size'] = embeddings['provider_texts'] / calls if calls else 0.0
+        return {
+            'embeddings': embeddings,
+            'llm': self.llm.stats()
+        }
+
+
+if __name__ == "__main__":
+    # 使用本地测试桩演示：多线程并发请求向量，观察合并后的调用次数
+    from concurrent.futures import ThreadPoolExecutor
+    from stubs import StubEmbeddings
+
+    dispatcher = ModelDispatcher(embedding_window=0.01)
+    embeddings = dispatcher.wrap_embeddings(StubEmbeddings(latency=0.05))
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        list(pool.map(lambda i: embeddings.embed_documents([f"文本{i}", f"文本{i + 1}"]), range(64)))
+    print(dispatcher.stats())
@@ -0,0 +1,176 @@
+# neighborhood_cache.py
+import sys
+import time
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 紧凑的边表示: (entity1, relation, entity2, context, direction, importance, context_id)
+# 句子节点模式下 context 为None，只缓存 context_id
+Edge = Tuple[str, str, str, Optional[str], str, float, Optional[str]]
+EDGE_FIELDS = ('entity1', 'relation', 'entity2', 'context', 'direction', 'importance', 'context_id')
+
+
+def _edges_size(edges: List[Edge]) -> int:
+    """估算边列表占用的内存字节数"""
+    size = sys.getsizeof(edges)
+    for edge in edges:
+        size += sys.getsizeof(edge) + sum(sys.getsizeof(field) for field in edge)
+    return size
+
+
+class NeighborhoodCache:
+    """
+    实体邻域缓存（进程内LRU，可选Redis二级缓存）
+    缓存条目带有图谱版本号，重新导入图谱后版本号递增，旧条目自动失效
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        generation_fn: Optional[Callable[[], Optional[int]]] = None,
+        redis_provider: Optional[Callable] = None,
+        ttl: int = 3600,
+        generation_check_interval: float = 30.0
+    ):
+        """
+        Args:
+            max_entries: 进程内最多缓存的实体数
+            generation_fn: 返回当前图谱版本号的函数
+            redis_provider: 返回Redis客户端（或None）的函数，首次未命中时才调用
+            ttl: Redis条目过期时间(秒)
+            generation_check_interval: 检查图谱版本号的最小间隔(秒)
+        """
+        self.max_entries = max_entries
+        self.generation_fn = generation_fn
+        self.redis_provider = redis_provider
+        self.ttl = ttl
+        self.generation_check_interval = generation_check_interval
+
+        self._entries: "OrderedDict[str, List[Edge]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._generation = None
+        self._generation_checked_at = 0.0
+
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def generation(self) -> Optional[int]:
+        """当前图谱版本号，按间隔刷新，版本变化时清空进程内缓存"""
+        now = time.monotonic()
+        if self.generation_fn and now - self._generation_checked_at >= self.generation_check_interval:
+            self._generation_checked_at = now
+            generation = self.generation_fn()
+            with self._lock:
+                if generation != self._generation:
+                    if self._entries:
+                        self.invalidations += 1
+                        print(f"图谱版本已变更（{self._generation} -> {generation}），清空邻域缓存")
+                    self._entries.clear()
+                    self._sizes.clear()
+                    self._bytes = 0
+                    self._generation = generation
+        return self._generation
+
+    def _redis_key(self, generation: Optional[int], name: str) -> str:
+        return f"neighborhood:{generation}:{name}"
+
+    def get(self, name: str) -> Optional[List[Dict]]:
+        """读取实体邻域，未命中返回None"""
+        generation = self.generation
+        with self._lock:
+            edges = self._entries.get(name)
+            if edges is not None:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return self._expand(edges)
+
+        redis_client = self.redis_provider() if self.redis_provider else None
+        if redis_client:
+            try:
+                cached = redis_client.get(self._redis_key(generation, name))
+                if cached:
+                    edges = pickle.loads(cached)
+                    self._store(name, edges)
+                    with self._lock:
+                        self.redis_hits += 1
+                    return self._expand(edges)
+            except Exception as e:
+                print(f"读取邻域缓存失败: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, name: str, results: List[Dict]) -> None:
+        """写入实体邻域"""
+        edges = [tuple(r.get(field) for field in EDGE_FIELDS) for r in results]
+        self._store(name, edges)
+
+        redis_client = self.redis_provider() if self.redis_provider else None
+        if redis_client:
+            try:
+                redis_client.setex(
+                    self._redis_key(self._generation, name),
+                    self.ttl,
+                    pickle.dumps(edges)
+                )
+            except Exception as e:
+                print(f"写入邻域缓存失败: {e}")
+
+    def _store(self, name: str, edges: List[Edge]) -> None:
+        size = _edges_size(edges)
+        with self._lock:
+            if name in self._entries:
+                self._bytes -= self._sizes[name]
+            self._entries[name] = edges
+            self._entries.move_to_end(name)
+            self._sizes[name] = size
+            self._bytes += size
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._bytes -= self._sizes.pop(evicted)
+                self.evictions += 1
+
+    @staticmethod
+    def _expand(edges: List[Edge]) -> List[Dict]:
+        return [dict(zip(EDGE_FIELDS, edge)) for edge in edges]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """缓存命中率与内存统计"""
+        with self._lock:
+            lookups = self.hits + self.redis_hits + self.misses
+            return {
+                'generation': self._generation,
+                'entries': len(self._entries),
+                'edges': sum(len(edges) for edges in self._entries.values()),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'redis_hits': self.redis_hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits + self.redis_hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+    def report(self) -> str:
+        stats = self.stats()
+        return (
+            f"邻域缓存（图谱版本 {stats['generation']}）: {stats['entries']} 个实体，"
+            f"{stats['edges']} 条边，约 {stats['bytes'] / 1024:.1f} KB；"
+            f"命中率 {stats['hit_rate']:.1%}（进程内 {stats['hits']}，Redis {stats['redis_hits']}，"
+            f"未命中 {stats['misses']}），淘汰 {stats['evictions']} 次，失效 {stats['invalidations']} 次"
+        )
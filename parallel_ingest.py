@@ -0,0 +1,243 @@
+# parallel_ingest.py
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from embedding_artifact import context_id
+
+DEFAULT_ENTITY = {'label': 'Entity', 'color': '#CCCCCC'}
+
+NodeKey = Tuple[str, str]  # (标签, 名称)
+
+
+def is_retryable(error: Exception) -> bool:
+    """判断写入错误是否为可重试的死锁或瞬时错误"""
+    code = getattr(error, 'code', '') or ''
+    return (
+        code.startswith('Neo.TransientError')
+        or 'DeadlockDetected' in str(error)
+        or type(error).__name__ in ('TransientError', 'ServiceUnavailable', 'SessionExpired')
+    )
+
+
+class PartitionedWriter:
+    """
+    并发分区写入器
+    先按标签分区并发写入节点，再将关系切分为若干轮，同一轮内的各批次不共享任何节点，
+    从而在多线程并发 MERGE 时避免锁竞争与死锁
+    """
+
+    def __init__(
+        self,
+        graph,
+        label_map: Dict,
+        relation_color_map: Dict,
+        workers: int = 4,
+        batch_size: int = 500,
+        max_retries: int = 5,
+        retry_backoff: float = 0.2,
+        sentence_label: Optional[str] = None
+    ):
+        self.graph = graph
+        self.label_map = label_map
+        self.relation_color_map = relation_color_map
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        # 句子节点标签，指定时每个不同的原文句子只写入一次，关系上只保存 context_id
+        self.sentence_label = sentence_label
+        self._lock = threading.Lock()
+        self.metrics = {}
+
+    def write(self, df) -> Dict:
+        """写入全部节点和关系，返回写入统计"""
+        self.metrics = {
+            'nodes': 0,
+            'sentences': 0,
+            'relationships': 0,
+            'node_batches': 0,
+            'relationship_batches': 0,
+            'relationship_waves': 0,
+            'retries': 0,
+            'node_seconds': 0.0,
+            'relationship_seconds': 0.0
+        }
+        nodes, sentences, edges = self._collect(df)
+
+        start = time.perf_counter()
+        self._write_nodes(nodes, sentences)
+        self.metrics['node_seconds'] = time.perf_counter() - start
+        print(
+            f"节点写入完成: {self.metrics['nodes']} 个实体，{self.metrics['sentences']} 个句子，"
+            f"耗时 {self.metrics['node_seconds']:.2f}s"
+        )
+
+        start = time.perf_counter()
+        self._write_relationships(edges)
+        self.metrics['relationship_seconds'] = time.perf_counter() - start
+        rate = self.metrics['relationships'] / max(self.metrics['relationship_seconds'], 1e-9)
+        print(
+            f"关系写入完成: {self.metrics['relationships']} 条，"
+            f"{self.metrics['relationship_waves']} 轮，耗时 {self.metrics['relationship_seconds']:.2f}s"
+            f"（{rate:.0f} 条/秒，重试 {self.metrics['retries']} 次）"
+        )
+        return self.metrics
+
+    def _collect(self, df) -> Tuple[Dict[str, Dict[str, str]], Dict[str, str], List[Dict]]:
+        """整理去重后的节点（按标签分区）、句子（id到原文）和关系"""
+        nodes: Dict[str, Dict[str, str]] = {}
+        sentences: Dict[str, str] = {}
+        edges: Dict[tuple, Dict] = {}
+        for row in df.itertuples(index=False):
+            head_info = self.label_map.get(row.head_entity_label, DEFAULT_ENTITY)
+            tail_info = self.label_map.get(row.tail_entity_label, DEFAULT_ENTITY)
+            nodes.setdefault(head_info['label'], {})[row.head_entity] = head_info['color']
+            nodes.setdefault(tail_info['label'], {})[row.tail_entity] = tail_info['color']
+
+            # 句子节点模式下关系的 context 字段携带句子id
+            context = row.context
+            if self.sentence_label is not None:
+                context = context_id(row.context)
+                sentences[context] = row.context
+
+            # 与逐条 MERGE 一致，同一关系保留最后一次写入的属性
+            key = (head_info['label'], row.head_entity, row.relation, tail_info['label'], row.tail_entity)
+            edges[key] = {
+                'head': (head_info['label'], row.head_entity),
+                'tail': (tail_info['label'], row.tail_entity),
+                'relation': row.relation,
+                'color': self.relation_color_map.get(row.relation, '#CCCCCC'),
+                'context': context
+            }
+        return nodes, sentences, list(edges.values())
+
+    def _write_nodes(self, nodes: Dict[str, Dict[str, str]], sentences: Dict[str, str]) -> None:
+        """不同标签、同一标签的不同批次之间节点互不重叠，可全部并发写入"""
+        tasks = []
+        for label, names in nodes.items():
+            rows = [{'name': name, 'color': color} for name, color in names.items()]
+            for start in range(0, len(rows), self.batch_size):
+                tasks.append((self._write_node_batch, label, rows[start:start + self.batch_size]))
+        rows = [{'id': sentence_id, 'text': text} for sentence_id, text in sentences.items()]
+        for start in range(0, len(rows), self.batch_size):
+            tasks.append((self._write_sentence_batch, self.sentence_label, rows[start:start + self.batch_size]))
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for future in [pool.submit(fn, label, rows) for fn, label, rows in tasks]:
+                future.result()
+
+    def _write_node_batch(self, label: str, rows: List[Dict]) -> None:
+        self._run_with_retry(f"""
+        UNWIND $rows AS row
+        MERGE (e:{label} {{name: row.name}})
+        SET e.color = row.color
+        """, {'rows': rows})
+        with self._lock:
+            self.metrics['nodes'] += len(rows)
+            self.metrics['node_batches'] += 1
+
+    def _write_sentence_batch(self, label: str, rows: List[Dict]) -> None:
+        self._run_with_retry(f"""
+        UNWIND $rows AS row
+        MERGE (s:{label} {{id: row.id}})
+        SET s.text = row.text
+        """, {'rows': rows})
+        with self._lock:
+            self.metrics['sentences'] += len(rows)
+            self.metrics['node_batches'] += 1
+
+    def plan_waves(self, edges: List[Dict]) -> List[List[List[Dict]]]:
+        """
+        将关系切分为若干轮，每轮最多 workers 个批次，同一轮内任意两个批次不共享节点
+        高连接度节点的关系会被分散到多轮中串行写入
+        """
+        waves = []  # 每轮: {'owner': {节点: 批次序号}, 'batches': [[关系...]]}
+        for edge in edges:
+            for wave in waves:
+                batch = self._choose_batch(wave, edge['head'], edge['tail'])
+                if batch is not None:
+                    break
+            else:
+                wave = {'owner': {}, 'batches': []}
+                waves.append(wave)
+                batch = self._choose_batch(wave, edge['head'], edge['tail'])
+
+            if batch == len(wave['batches']):
+                wave['batches'].append([])
+            wave['batches'][batch].append(edge)
+            wave['owner'][edge['head']] = batch
+            wave['owner'][edge['tail']] = batch
+        return [wave['batches'] for wave in waves]
+
+    def _choose_batch(self, wave: Dict, head: NodeKey, tail: NodeKey) -> Optional[int]:
+        """为关系选择本轮中的批次，返回None表示与本轮已有批次冲突"""
+        batches = wave['batches']
+        head_owner = wave['owner'].get(head)
+        tail_owner = wave['owner'].get(tail)
+        if head_owner is not None and tail_owner is not None and head_owner != tail_owner:
+            return None
+
+        owner = head_owner if head_owner is not None else tail_owner
+        if owner is not None:
+            return owner if len(batches[owner]) < self.batch_size else None
+
+        # 两端节点都未被占用，放入最空的批次，或在未达到并发数时新开批次
+        if len(batches) < self.workers:
+            return len(batches)
+        open_batches = [i for i, batch in enumerate(batches) if len(batch) < self.batch_size]
+        if not open_batches:
+            return None
+        return min(open_batches, key=lambda i: len(batches[i]))
+
+    def _write_relationships(self, edges: List[Dict]) -> None:
+        waves = self.plan_waves(edges)
+        self.metrics['relationship_waves'] = len(waves)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for i, batches in enumerate(waves, start=1):
+                for future in [pool.submit(self._write_relationship_batch, batch) for batch in batches]:
+                    future.result()
+                print(f"关系写入进度: 第 {i}/{len(waves)} 轮，已写入 {self.metrics['relationships']}/{len(edges)} 条")
+
+    def _write_relationship_batch(self, batch: List[Dict]) -> None:
+        # 关系类型和标签无法参数化，按 (头标签, 关系, 尾标签) 分组后各执行一次 UNWIND
+        groups: Dict[tuple, List[Dict]] = {}
+        for edge in batch:
+            key = (edge['head'][0], edge['relation'], edge['tail'][0])
+            groups.setdefault(key, []).append({
+                'head_name': edge['head'][1],
+                'tail_name': edge['tail'][1],
+                'color': edge['color'],
+                'original_type': edge['relation'],
+                'context': edge['context']
+            })
+
+        context_property = 'context' if self.sentence_label is None else 'context_id'
+        for (head_label, relation_type, tail_label), rows in groups.items():
+            self._run_with_retry(f"""
+            UNWIND $rows AS row
+            MATCH (head:{head_label} {{name: row.head_name}})
+            MATCH (tail:{tail_label} {{name: row.tail_name}})
+            MERGE (head)-[r:{relation_type}]->(tail)
+            SET r.color = row.color,
+                r.original_type = row.original_type,
+                r.{context_property} = row.context
+            """, {'rows': rows})
+        with self._lock:
+            self.metrics['relationships'] += len(batch)
+            self.metrics['relationship_batches'] += 1
+
+    def _run_with_retry(self, query: str, params: Dict) -> None:
+        """执行写入，遇到死锁或瞬时错误时指数退避重试"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.graph.query(query, params)
+                return
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                with self._lock:
+                    self.metrics['retries'] += 1
+                time.sleep(self.retry_backoff * (2 ** attempt) * (1 + random.random()))
@@ -0,0 +1,318 @@
+# qa_service.py
+# 独立的问答HTTP服务：所有客户端共享同一个HistoricalQA实例
+import json
+import asyncio
+import argparse
+import threading
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+MAX_BODY_BYTES = 64 * 1024
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable"
+}
+
+
+class ServiceBusy(Exception):
+    """服务排队已满或等待超时"""
+
+
+class SingleFlight:
+    """合并相同键的并发请求：同一时刻只执行一次，其余请求等待并共享结果"""
+
+    def __init__(self):
+        self._inflight: Dict[Any, asyncio.Future] = {}
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key, fn: Callable[[], Awaitable]):
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # 标记异常已被读取，避免没有跟随者时出现未处理异常的警告
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+
+class QAService:
+    """
+    基于asyncio的问答服务
+    - 相同问题的并发请求只计算一次（singleflight）
+    - 最多 max_concurrency 个问题同时计算，最多 max_pending 个问题排队，超出则返回503
+    """
+
+    def __init__(
+        self,
+        qa_system,
+        max_concurrency: int = 4,
+        max_pending: int = 32,
+        queue_timeout: float = 30.0
+    ):
+        self.qa_system = qa_system
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.queue_timeout = queue_timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="qa")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._flights = SingleFlight()
+        # HistoricalQA 的可视化会写入共享的临时HTML文件，需串行执行
+        self._visualization_lock = threading.Lock()
+
+        self.pending = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+
+    async def _run(self, fn: Callable, *args):
+        """在线程池中执行阻塞调用，受排队上限和并发上限约束"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise ServiceBusy("服务繁忙，请稍后重试")
+
+        self.pending += 1
+        try:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise ServiceBusy("排队等待超时，请稍后重试")
+            self.running += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._executor, fn, *args)
+            finally:
+                self.running -= 1
+                self._slots.release()
+        finally:
+            self.pending -= 1
+
+    async def answer(self, question: str) -> str:
+        key = ("answer", question.strip())
+        return await self._flights.do(key, lambda: self._run(self.qa_system.answer_question, question))
+
+    async def visualization(self, question: str) -> str:
+        key = ("visualization", question.strip())
+        return await self._flights.do(key, lambda: self._run(self._visualize, question))
+
+    def _visualize(self, question: str) -> str:
+        with self._visualization_lock:
+            return self.qa_system.get_visualization_data(question)
+
+    def health(self) -> Dict:
+        status = {
+            "status": "ok",
+            "running": self.running,
+            "pending": self.pending,
+            "in_flight_keys": len(self._flights),
+            "coalesced": self._flights.coalesced,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending
+        }
+        if hasattr(self.qa_system, "cache_report"):
+            status["cache"] = self.qa_system.cache_report()
+        if hasattr(self.qa_system, "evaluation_report"):
+            status["evaluation"] = self.qa_system.evaluation_report()
+        return status
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        if path == "/health":
+            if method != "GET":
+                return 405, {"error": "仅支持GET"}
+            return 200, self.health()
+
+        handlers = {
+            "/answer": (self.answer, "answer"),
+            "/visualization": (self.visualization, "html")
+        }
+        if path not in handlers:
+            return 404, {"error": f"未知路径: {path}"}
+        if method != "POST":
+            return 405, {"error": "仅支持POST"}
+
+        try:
+            question = json.loads(body.decode("utf-8"))["question"]
+        except (ValueError, KeyError, TypeError):
+            return 400, {"error": "请求体需为JSON: {\"question\": \"...\"}"}
+        if not isinstance(question, str) or not question.strip():
+            return 400, {"error": "问题不能为空"}
+
+        handler, field = handlers[path]
+        try:
+            result = await handler(question)
+        except ServiceBusy as e:
+            return 503, {"error": str(e)}
+        except Exception as e:
+            self.failed += 1
+            print(f"处理请求时出错: {e}")
+            return 500, {"error": "处理问题时出现了错误"}
+        self.completed += 1
+        return 200, {field: result}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """解析单个HTTP/1.1请求并返回JSON响应（每个连接处理一个请求）"""
+        status, payload = 400, {"error": "请求格式错误"}
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=10)
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+            headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=10)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                status, payload = 413, {"error": "请求体过大"}
+            else:
+                body = await asyncio.wait_for(reader.readexactly(length), timeout=10) if length else b""
+                status, payload = await self._route(method.upper(), path.split("?", 1)[0], body)
+        except (ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            print(f"连接处理出错: {e}")
+            status, payload = 500, {"error": "服务内部错误"}
+
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(data)}",
+            "Connection: close"
+        ]
+        if status == 503:
+            head.append("Retry-After: 1")
+        try:
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8000) -> None:
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        # backlog 限制内核中等待accept的连接数，配合 max_pending 形成背压
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=self.max_pending * 2)
+        print(f"问答服务已启动: http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+class QAServiceClient:
+    """问答服务的轻量客户端，接口与HistoricalQA一致，可直接替换"""
+
+    def __init__(self, base_url: str = "http://127.0.0.1:8000", timeout: float = 120.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path: str, payload: Optional[Dict] = None) -> Dict:
+        data = None
+        headers = {}
+        if payload is not None:
+            data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        request = urllib.request.Request(self.base_url + path, data=data, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            detail = json.loads(e.read().decode("utf-8")).get("error", e.reason)
+            raise RuntimeError(f"问答服务返回 {e.code}: {detail}") from None
+
+    def answer_question(self, question: str, session_id: Optional[str] = None) -> str:
+        return self._request("/answer", {"question": question})["answer"]
+
+    def get_visualization_data(self, question: str) -> str:
+        return self._request("/visualization", {"question": question})["html"]
+
+    def health(self) -> Dict:
+        return self._request("/health")
+
+
+def build_qa_system(args):
+    """根据命令行参数构建共享的HistoricalQA实例"""
+    from RAG import HistoricalQA
+    from model_dispatcher import ModelDispatcher
+
+    # 服务内的并发问题共享同一个调度器，合并向量请求并对LLM调用限速
+    dispatcher = ModelDispatcher(llm_requests_per_second=args.llm_rps)
+    if args.stub:
+        from stubs import InMemoryGraph, StubChatModel, StubEmbeddings
+        return HistoricalQA(
+            InMemoryGraph(args.triples),
+            llm=StubChatModel(),
+            embedding_model=StubEmbeddings(),
+            dispatcher=dispatcher
+        )
+
+    from dotenv import load_dotenv
+    from Create_KG import KnowledgeGraphCreator
+    load_dotenv()
+    creator = KnowledgeGraphCreator(
+        neo4j_url=args.neo4j_url,
+        username=args.username,
+        password=args.password
+    )
+    if args.sqlite:
+        creator.connect_to_sqlite(args.sqlite)
+    else:
+        creator.connect_to_neo4j()
+    return HistoricalQA(creator.graph, snapshot_path=args.snapshot, dispatcher=dispatcher)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="中国古代史知识问答HTTP服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--max-concurrency", type=int, default=4, help="同时计算的问题数")
+    parser.add_argument("--max-pending", type=int, default=32, help="排队与计算中的问题数上限")
+    parser.add_argument("--queue-timeout", type=float, default=30.0, help="排队等待超时(秒)")
+    parser.add_argument("--llm-rps", type=float, default=5.0, help="LLM调用的平均速率上限(次/秒)")
+    parser.add_argument("--stub", action="store_true", help="使用内存图谱和测试桩模型（无需Neo4j和OpenAI）")
+    parser.add_argument("--triples", default="triples.csv", help="测试桩模式下加载的三元组")
+    parser.add_argument("--sqlite", help="SQLite嵌入式图谱文件，指定后不连接Neo4j")
+    parser.add_argument("--neo4j-url", default="neo4j://localhost:7687/")
+    parser.add_argument("--username", default="neo4j")
+    parser.add_argument("--password", default="12345678")
+    parser.add_argument("--snapshot", default="./kg_artifacts/kg_snapshot.bin")
+    args = parser.parse_args()
+
+    service = QAService(
+        build_qa_system(args),
+        max_concurrency=args.max_concurrency,
+        max_pending=args.max_pending,
+        queue_timeout=args.queue_timeout
+    )
+    asyncio.run(service.serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
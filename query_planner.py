@@ -0,0 +1,120 @@
+# query_planner.py
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# 边的方向（相对于被查询的实体）
+OUT = 'out'    # 被查询实体为头实体
+IN = 'in'      # 被查询实体为尾实体
+BOTH = 'both'
+AUTO = 'auto'  # 由实体类型决定：人物作为头实体，其余（地点、官衔）作为尾实体
+
+# 问题关键词到关系意图 (关系类型, 方向) 的映射，关系类型与 KnowledgeGraphCreator.RELATION_COLOR_MAP 一致
+# 图谱中 父母 关系的头实体为父/母，尾实体为子女；上下级 关系的头实体为上级
+RELATION_KEYWORDS: Dict[Tuple[str, str], List[str]] = {
+    ('父母', IN): ['父母', '父亲', '母亲', '生父', '生母', '其父', '其母'],
+    ('父母', OUT): ['儿子', '子女', '孩子', '女儿', '后代', '子嗣', '之子'],
+    ('兄弟', BOTH): ['兄弟', '哥哥', '弟弟', '兄长', '姐妹'],
+    ('别名', BOTH): ['别名', '又名', '别称', '表字', '字号', '称号'],
+    ('任职', AUTO): ['担任', '任职', '官职', '官衔', '职位', '做官', '出任', '任过', '授予', '拜为'],
+    ('管理', AUTO): ['管理', '治理', '管辖', '统辖', '主政'],
+    ('驻守', AUTO): ['驻守', '镇守', '屯驻', '驻扎', '守卫'],
+    ('到达', AUTO): ['到达', '抵达', '前往', '去过', '到过'],
+    ('出生于某地', AUTO): ['出生', '籍贯', '哪里人', '何地人', '故乡', '出身'],
+    ('敌对攻伐', BOTH): ['攻打', '攻伐', '进攻', '讨伐', '征讨', '敌对', '交战', '打仗', '攻击'],
+    ('上下级', IN): ['上级', '上司'],
+    ('上下级', OUT): ['下级', '下属', '部下', '部将', '属下'],
+    ('上下级', BOTH): ['君臣'],
+    ('同僚', BOTH): ['同僚', '同事', '共事'],
+    ('政治奥援', BOTH): ['支持', '援助', '奥援', '盟友', '依附', '投靠', '结盟'],
+}
+
+# jieba词性为人物
+PERSON_TAG = 'nr'
+
+
+@dataclass(frozen=True)
+class RelationFilter:
+    """按关系类型和方向过滤实体邻域"""
+    out_types: FrozenSet[str]
+    in_types: FrozenSet[str]
+
+    def matches(self, result: Dict) -> bool:
+        if result.get('direction') == IN:
+            return result['relation'] in self.in_types
+        return result['relation'] in self.out_types
+
+    def params(self) -> Dict:
+        """TYPED_NEIGHBORHOOD_QUERY 的查询参数"""
+        return {
+            'out_types': sorted(self.out_types),
+            'in_types': sorted(self.in_types)
+        }
+
+
+@dataclass(frozen=True)
+class RelationPlan:
+    """问题中识别出的关系意图"""
+    intents: Tuple[Tuple[str, str], ...]
+
+    def for_entity(self, tag: Optional[str] = None) -> RelationFilter:
+        """根据实体词性确定 AUTO 方向，生成该实体的过滤条件"""
+        out_types, in_types = set(), set()
+        for relation, direction in self.intents:
+            if direction == AUTO:
+                if tag == PERSON_TAG:
+                    direction = OUT
+                elif tag in ('ns', 'nz'):
+                    direction = IN
+                else:
+                    direction = BOTH
+            if direction in (OUT, BOTH):
+                out_types.add(relation)
+            if direction in (IN, BOTH):
+                in_types.add(relation)
+        return RelationFilter(frozenset(out_types), frozenset(in_types))
+
+    @property
+    def relations(self) -> List[str]:
+        return sorted({relation for relation, _ in self.intents})
+
+
+class RelationQueryPlanner:
+    """将问题关键词映射为关系类型和方向，只检索相关类型的边"""
+
+    def __init__(self, relation_types: Optional[Iterable[str]] = None):
+        """
+        Args:
+            relation_types: 图谱中存在的关系类型，为None时使用关键词表中的全部类型
+        """
+        allowed = set(relation_types) if relation_types is not None else None
+        self.keywords: List[Tuple[str, Tuple[str, str]]] = sorted(
+            (
+                (keyword, intent)
+                for intent, keywords in RELATION_KEYWORDS.items()
+                if allowed is None or intent[0] in allowed
+                for keyword in keywords
+            ),
+            key=lambda item: -len(item[0])
+        )
+
+    def plan(self, question: str, exclude: Iterable[str] = ()) -> Optional[RelationPlan]:
+        """
+        识别问题中的关系意图，没有识别到时返回None（检索全部关系）
+        Args:
+            question: 用户问题
+            exclude: 不参与关键词匹配的片段（如问题中的实体名）
+        """
+        text = question
+        for name in exclude:
+            text = text.replace(name, ' ')
+
+        intents = []
+        for keyword, intent in self.keywords:
+            if keyword in text:
+                # 长关键词优先匹配，匹配后移除，避免被其中的短关键词重复匹配
+                text = text.replace(keyword, ' ')
+                if intent not in intents:
+                    intents.append(intent)
+        if not intents:
+            return None
+        return RelationPlan(tuple(intents))
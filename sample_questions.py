@@ -0,0 +1,26 @@
+# sample_questions.py
+# 示例问题（应用侧边栏展示，压测与内存分析工具复用）
+from typing import List
+
+SAMPLE_QUESTIONS = {
+    "人物关系类": [
+        "裕的父母是谁？",
+        "遺直的兄弟是谁？",
+        "李德裕和元穎的关系如何？"
+    ],
+    "官职任命类": [
+        "谁担任过东牟太守？",
+        "輔國將軍是谁担任的？",
+        "中散大夫有哪些人担任过？"
+    ],
+    "历史事件类": [
+        "会昌年间发生了什么重要事件？",
+        "李德裕在位期间有什么政策？",
+        "元穎参与了哪些重要事件？"
+    ]
+}
+
+
+def all_questions() -> List[str]:
+    """按类别顺序展开的全部示例问题"""
+    return [q for questions in SAMPLE_QUESTIONS.values() for q in questions]
@@ -0,0 +1,310 @@
+# sqlite_graph.py
+# 基于SQLite的嵌入式图谱存储：无需Neo4j服务，按 kg_queries 中的查询语句返回与 Neo4jGraph.query 一致的结果
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from kg_queries import (
+    ENTITY_LEXICON_QUERY,
+    ALL_RELATIONS_QUERY,
+    NEIGHBORHOOD_QUERY,
+    TYPED_NEIGHBORHOOD_QUERY,
+    RANKED_NEIGHBORHOOD_QUERY,
+    SENTENCES_QUERY,
+    CONTEXT_EDGES_QUERY,
+    ENTITY_DEGREE_QUERY,
+    GRAPH_VERSION_QUERY,
+    normalize_query
+)
+from embedding_artifact import context_id
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    label TEXT NOT NULL,
+    color TEXT,
+    degree INTEGER,
+    pagerank REAL,
+    community INTEGER,
+    UNIQUE (label, name)
+);
+CREATE TABLE IF NOT EXISTS sentences (
+    id TEXT PRIMARY KEY,
+    text TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS relations (
+    id INTEGER PRIMARY KEY,
+    head_id INTEGER NOT NULL REFERENCES entities (id),
+    tail_id INTEGER NOT NULL REFERENCES entities (id),
+    type TEXT NOT NULL,
+    color TEXT,
+    context_id TEXT NOT NULL REFERENCES sentences (id),
+    UNIQUE (head_id, type, tail_id)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    updated_at REAL
+);
+-- 覆盖索引：按名称定位实体、按头/尾实体和关系类型展开一跳邻域均无需回表
+CREATE INDEX IF NOT EXISTS entities_name ON entities (name, id, label);
+CREATE INDEX IF NOT EXISTS relations_head ON relations (head_id, type, tail_id, context_id);
+CREATE INDEX IF NOT EXISTS relations_tail ON relations (tail_id, type, head_id, context_id);
+-- 按原文句子取关系（年号索引检索）
+CREATE INDEX IF NOT EXISTS relations_context ON relations (context_id);
+"""
+
+# 一跳邻域的出边与入边，{out_filter}/{in_filter} 为关系类型过滤条件
+_NEIGHBORHOOD_SQL = """
+SELECT h.name AS entity1, r.type AS relation, t.name AS entity2, NULL AS context,
+       r.context_id AS context_id, 'out' AS direction, coalesce(t.pagerank, 0.0) AS importance
+FROM entities h
+JOIN relations r ON r.head_id = h.id
+JOIN entities t ON t.id = r.tail_id
+WHERE h.name = :name {out_filter}
+UNION
+SELECT t.name AS entity1, r.type AS relation, h.name AS entity2, NULL AS context,
+       r.context_id AS context_id, 'in' AS direction, coalesce(h.pagerank, 0.0) AS importance
+FROM entities t
+JOIN relations r ON r.tail_id = t.id
+JOIN entities h ON h.id = r.head_id
+WHERE t.name = :name {in_filter}
+"""
+
+# SQLite单条语句的参数个数有上限，IN 列表按批拆分
+_MAX_VARIABLES = 500
+
+
+def _in_clause(column: str, values: Optional[List[str]], prefix: str) -> tuple:
+    """生成 AND column IN (...) 条件及其参数，values为None时不过滤"""
+    if values is None:
+        return "", {}
+    params = {f"{prefix}{i}": value for i, value in enumerate(values)}
+    placeholders = ", ".join(f":{key}" for key in params)
+    return f"AND {column} IN ({placeholders})", params
+
+
+class SQLiteGraph:
+    """
+    嵌入式图谱后端，实体、关系和原文句子分表存储
+    - 关系只保存句子的 context_id（与句子节点模式一致），邻域查询返回的 context 为None，
+      原文由问答系统通过 SENTENCES_QUERY 按id批量获取
+    - WAL模式，每个线程使用各自的只读连接，写入通过单独的连接串行执行
+    """
+
+    def __init__(self, path: str = "./kg_artifacts/graph.sqlite"):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._writer = sqlite3.connect(path, check_same_thread=False)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer.executescript(SCHEMA)
+        self._writer.commit()
+
+        # graph_analytics 依赖scipy，只取其中的查询语句
+        from graph_analytics import EDGE_LIST_QUERY
+        self._handlers = {
+            normalize_query(ENTITY_LEXICON_QUERY): self._entity_lexicon,
+            normalize_query(ALL_RELATIONS_QUERY): self._all_relations,
+            normalize_query(NEIGHBORHOOD_QUERY): self._neighborhood,
+            normalize_query(TYPED_NEIGHBORHOOD_QUERY): self._typed_neighborhood,
+            normalize_query(RANKED_NEIGHBORHOOD_QUERY): self._ranked_neighborhood,
+            normalize_query(SENTENCES_QUERY): self._sentences,
+            normalize_query(CONTEXT_EDGES_QUERY): self._context_edges,
+            normalize_query(ENTITY_DEGREE_QUERY): self._entity_degree,
+            normalize_query(EDGE_LIST_QUERY): self._edge_list,
+            normalize_query(GRAPH_VERSION_QUERY): self._graph_version
+        }
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _fetch(self, sql: str, params: Any = ()) -> List[Dict]:
+        return [dict(row) for row in self._reader().execute(sql, params)]
+
+    def query(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        """与 Neo4jGraph.query 接口一致，只支持问答系统使用的 kg_queries 查询"""
+        handler = self._handlers.get(normalize_query(query))
+        if handler is None:
+            raise ValueError(f"SQLiteGraph 不支持该查询:\n{query}")
+        return handler(params or {})
+
+    # ---- 查询 ----
+
+    def _entity_lexicon(self, params: Dict) -> List[Dict]:
+        rows = self._fetch("SELECT DISTINCT name, label FROM entities")
+        return [{'name': row['name'], 'labels': [row['label']]} for row in rows]
+
+    def _all_relations(self, params: Dict) -> List[Dict]:
+        return self._fetch("""
+            SELECT h.name AS entity1, r.type AS relation, t.name AS entity2, s.text AS context
+            FROM relations r
+            JOIN entities h ON h.id = r.head_id
+            JOIN entities t ON t.id = r.tail_id
+            LEFT JOIN sentences s ON s.id = r.context_id
+        """)
+
+    def _neighborhood_sql(self, params: Dict) -> tuple:
+        out_filter, out_params = _in_clause("r.type", params.get('out_types'), "out")
+        in_filter, in_params = _in_clause("r.type", params.get('in_types'), "in")
+        sql = _NEIGHBORHOOD_SQL.format(out_filter=out_filter, in_filter=in_filter)
+        return sql, {'name': params['name'], **out_params, **in_params}
+
+    def _neighborhood(self, params: Dict) -> List[Dict]:
+        return self._fetch(*self._neighborhood_sql({'name': params['name']}))
+
+    def _typed_neighborhood(self, params: Dict) -> List[Dict]:
+        return self._fetch(*self._neighborhood_sql(params))
+
+    def _ranked_neighborhood(self, params: Dict) -> List[Dict]:
+        sql, sql_params = self._neighborhood_sql(params)
+        return self._fetch(
+            f"SELECT * FROM ({sql}) ORDER BY importance DESC LIMIT :limit OFFSET :skip",
+            {**sql_params, 'limit': params['limit'], 'skip': params['skip']}
+        )
+
+    def _sentences(self, params: Dict) -> List[Dict]:
+        ids = list(params['ids'])
+        results = []
+        for start in range(0, len(ids), _MAX_VARIABLES):
+            batch = ids[start:start + _MAX_VARIABLES]
+            placeholders = ", ".join("?" * len(batch))
+            results += self._fetch(f"SELECT id, text FROM sentences WHERE id IN ({placeholders})", batch)
+        return results
+
+    def _context_edges(self, params: Dict) -> List[Dict]:
+        ids = list(dict.fromkeys(params['ids']))
+        results = []
+        for start in range(0, len(ids), _MAX_VARIABLES):
+            batch = ids[start:start + _MAX_VARIABLES]
+            placeholders = ", ".join("?" * len(batch))
+            results += self._fetch(f"""
+                SELECT h.name AS entity1, r.type AS relation, t.name AS entity2, NULL AS context,
+                       r.context_id AS context_id, 'out' AS direction, coalesce(t.pagerank, 0.0) AS importance
+                FROM relations r
+                JOIN entities h ON h.id = r.head_id
+                JOIN entities t ON t.id = r.tail_id
+                WHERE r.context_id IN ({placeholders})
+            """, batch)
+        return results
+
+    def _entity_degree(self, params: Dict) -> List[Dict]:
+        rows = self._fetch("""
+            SELECT e.name, e.label, coalesce(e.degree,
+                (SELECT count(*) FROM relations WHERE head_id = e.id)
+                + (SELECT count(*) FROM relations WHERE tail_id = e.id)) AS degree
+            FROM entities e
+        """)
+        return [{'name': row['name'], 'labels': [row['label']], 'degree': row['degree']} for row in rows]
+
+    def _edge_list(self, params: Dict) -> List[Dict]:
+        return self._fetch("""
+            SELECT h.name AS head, h.label AS head_label, t.name AS tail, t.label AS tail_label
+            FROM relations r
+            JOIN entities h ON h.id = r.head_id
+            JOIN entities t ON t.id = r.tail_id
+        """)
+
+    def _graph_version(self, params: Dict) -> List[Dict]:
+        return self._fetch("SELECT version FROM meta WHERE key = 'graph'")
+
+    # ---- 写入（由 KnowledgeGraphCreator 调用） ----
+
+    def clear(self) -> None:
+        """删除全部实体、关系和句子，保留图谱版本号"""
+        with self._write_lock:
+            self._writer.executescript("""
+                DELETE FROM relations;
+                DELETE FROM sentences;
+                DELETE FROM entities;
+            """)
+            self._writer.commit()
+
+    def write_triples(self, df: pd.DataFrame, entity_label_map: Dict, relation_color_map: Dict) -> Dict:
+        """
+        写入三元组，语义与Neo4j导入一致：实体按 (标签, 名称) 合并，
+        同一对实体间同类型的关系合并，原文取最后一次出现的句子
+        Args:
+            df: 三元组DataFrame
+            entity_label_map: 实体类型到标签和颜色的映射
+            relation_color_map: 关系类型到颜色的映射
+        """
+        default = {'label': 'Entity', 'color': '#CCCCCC'}
+        entities = {}
+        for prefix in ('head', 'tail'):
+            for name, label in zip(df[f'{prefix}_entity'], df[f'{prefix}_entity_label']):
+                info = entity_label_map.get(label, default)
+                entities[(info['label'], name)] = info['color']
+        sentences = {context_id(context): context for context in df['context'].unique()}
+
+        with self._write_lock:
+            conn = self._writer
+            conn.executemany("""
+                INSERT INTO entities (label, name, color) VALUES (?, ?, ?)
+                ON CONFLICT (label, name) DO UPDATE SET color = excluded.color
+            """, [(label, name, color) for (label, name), color in entities.items()])
+            conn.executemany(
+                "INSERT OR REPLACE INTO sentences (id, text) VALUES (?, ?)",
+                list(sentences.items())
+            )
+            ids = {(label, name): i for i, label, name in conn.execute("SELECT id, label, name FROM entities")}
+
+            rows = []
+            for row in df.itertuples(index=False):
+                head_label = entity_label_map.get(row.head_entity_label, default)['label']
+                tail_label = entity_label_map.get(row.tail_entity_label, default)['label']
+                rows.append((
+                    ids[(head_label, row.head_entity)],
+                    ids[(tail_label, row.tail_entity)],
+                    row.relation,
+                    relation_color_map.get(row.relation, '#CCCCCC'),
+                    context_id(row.context)
+                ))
+            conn.executemany("""
+                INSERT INTO relations (head_id, tail_id, type, color, context_id) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (head_id, type, tail_id) DO UPDATE SET
+                    color = excluded.color,
+                    context_id = excluded.context_id
+            """, rows)
+            conn.commit()
+        return {'entities': len(entities), 'sentences': len(sentences), 'relations': len(rows)}
+
+    def write_analytics(self, analytics) -> None:
+        """将 GraphAnalytics 的度数、PageRank和社区编号写回实体表"""
+        with self._write_lock:
+            self._writer.executemany(
+                "UPDATE entities SET degree = ?, pagerank = ?, community = ? WHERE label = ? AND name = ?",
+                [
+                    (int(analytics.degree[i]), float(analytics.pagerank[i]), int(analytics.community[i]), label, name)
+                    for i, (label, name) in enumerate(analytics.nodes)
+                ]
+            )
+            self._writer.commit()
+
+    def bump_version(self) -> int:
+        """递增图谱版本号，使依赖旧图谱的快照和缓存失效"""
+        with self._write_lock:
+            self._writer.execute("""
+                INSERT INTO meta (key, version, updated_at) VALUES ('graph', 1, ?)
+                ON CONFLICT (key) DO UPDATE SET version = version + 1, updated_at = excluded.updated_at
+            """, (time.time(),))
+            self._writer.commit()
+            return self._writer.execute("SELECT version FROM meta WHERE key = 'graph'").fetchone()[0]
+
+    def label_counts(self) -> Dict[str, int]:
+        return dict(self._reader().execute("SELECT label, count(*) FROM entities GROUP BY label").fetchall())
+
+    def relation_counts(self) -> Dict[str, int]:
+        return dict(self._reader().execute("SELECT type, count(*) FROM relations GROUP BY type").fetchall())
@@ -0,0 +1,98 @@
+# startup_report.py
+import re
+import sys
+import argparse
+import subprocess
+
+# 这些重型依赖应当在首次使用时才被导入，导入RAG模块后不应出现在sys.modules中
+LAZY_MODULES = ['ragas', 'langfuse', 'pyvis', 'redis', 'faiss', 'opencc', 'nest_asyncio', 'langchain.chains']
+
+# 构造HistoricalQA的目标耗时(秒)
+CONSTRUCTOR_TARGET = 1.0
+
+
+def measure_import(module: str = "RAG", top: int = 10) -> dict:
+    """在全新的解释器中测量模块导入耗时，并列出最耗时的依赖"""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print('IMPORT_SECONDS', time.perf_counter() - start)\n"
+        f"print('LOADED', ','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))\n"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{proc.stderr}")
+
+    seconds, loaded = None, []
+    for line in proc.stdout.splitlines():
+        if line.startswith("IMPORT_SECONDS"):
+            seconds = float(line.split()[1])
+        elif line.startswith("LOADED"):
+            loaded = [m for m in line[len("LOADED"):].strip().split(",") if m]
+
+    # -X importtime 输出格式: "import time: self [us] | cumulative | imported package"
+    offenders = []
+    for line in proc.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match and len(match.group(3)) <= 2:
+            offenders.append((int(match.group(2)) / 1e6, match.group(4)))
+    offenders.sort(reverse=True)
+
+    return {
+        "seconds": seconds,
+        "eagerly_loaded": loaded,
+        "top_imports": offenders[:top]
+    }
+
+
+def measure_constructor(graph, **kwargs):
+    """构造HistoricalQA并返回实例（含各阶段耗时）"""
+    from RAG import HistoricalQA
+    return HistoricalQA(graph, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG模块导入耗时与HistoricalQA构造耗时报告")
+    parser.add_argument("--module", default="RAG", help="要测量导入耗时的模块")
+    parser.add_argument("--skip-constructor", action="store_true", help="只测量导入耗时")
+    parser.add_argument("--neo4j-url", default="neo4j://localhost:7687/")
+    parser.add_argument("--username", default="neo4j")
+    parser.add_argument("--password", default="12345678")
+    parser.add_argument("--snapshot", default="./kg_artifacts/kg_snapshot.bin", help="图谱快照文件，用于测量热启动")
+    args = parser.parse_args()
+
+    report = measure_import(args.module)
+    print(f"导入 {args.module} 耗时: {report['seconds'] * 1000:.1f} ms")
+    print("耗时最多的顶层依赖:")
+    for seconds, name in report["top_imports"]:
+        print(f"  {name:<40} {seconds * 1000:8.1f} ms")
+    if report["eagerly_loaded"]:
+        print(f"⚠️ 以下依赖在导入时被提前加载: {', '.join(report['eagerly_loaded'])}")
+    else:
+        print("✅ 评估、追踪、可视化与缓存依赖均为延迟加载")
+
+    if args.skip_constructor:
+        return
+
+    from Create_KG import KnowledgeGraphCreator
+    creator = KnowledgeGraphCreator(
+        neo4j_url=args.neo4j_url,
+        username=args.username,
+        password=args.password
+    )
+    creator.connect_to_neo4j()
+    qa_system = measure_constructor(creator.graph, snapshot_path=args.snapshot)
+    print(qa_system.startup_report())
+
+    total = qa_system.startup_timings["total"]
+    status = "✅" if total < CONSTRUCTOR_TARGET else "⚠️"
+    print(f"{status} 构造耗时 {total:.3f}s（目标 < {CONSTRUCTOR_TARGET:.1f}s）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# stubs.py
+# 本地测试桩：内存图谱、对话模型和向量模型，无需Neo4j和OpenAI即可运行完整问答流程
+import csv
+import time
+import hashlib
+from typing import Any, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import SimpleChatModel
+
+from kg_queries import (
+    ENTITY_LEXICON_QUERY,
+    ALL_RELATIONS_QUERY,
+    NEIGHBORHOOD_QUERY,
+    TYPED_NEIGHBORHOOD_QUERY,
+    RANKED_NEIGHBORHOOD_QUERY,
+    ENTITY_DEGREE_QUERY,
+    SENTENCES_QUERY,
+    CONTEXT_EDGES_QUERY,
+    GRAPH_VERSION_QUERY,
+    normalize_query
+)
+from embedding_artifact import context_id
+
+LABELS = {
+    'PER': '人物',
+    'LOC': '地点',
+    'OFI': '官衔',
+    'BOOK': '书籍'
+}
+
+
+class InMemoryGraph:
+    """按 kg_queries 中的查询语句返回结果的内存图谱，接口与 Neo4jGraph.query 一致"""
+
+    def __init__(
+        self,
+        triples_path: str = "triples.csv",
+        latency: float = 0.0,
+        version: int = 1,
+        analytics_path: Optional[str] = None,
+        sentence_nodes: bool = False
+    ):
+        """
+        Args:
+            triples_path: json_to_csv 生成的三元组CSV
+            latency: 每次查询模拟的延迟(秒)
+            version: 图谱版本号
+            analytics_path: graph_analytics 保存的侧索引，提供节点的PageRank
+            sentence_nodes: 模拟句子节点模式，关系上只保存 context_id
+        """
+        self.latency = latency
+        self.version = version
+        self.sentence_nodes = sentence_nodes
+        self.sentences: Dict[str, str] = {}
+        self.pagerank: Dict[str, float] = {}
+        if analytics_path:
+            from graph_analytics import GraphAnalytics
+            self.pagerank = {
+                name: stats['pagerank']
+                for name, stats in GraphAnalytics.load(analytics_path).by_name().items()
+            }
+        self.nodes: Dict[str, List[str]] = {}
+        self.edges: List[Dict] = []
+        self.outgoing: Dict[str, List[Dict]] = {}
+        self.incoming: Dict[str, List[Dict]] = {}
+        self.by_context: Dict[str, List[Dict]] = {}
+
+        with open(triples_path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                self.add_edge(
+                    row['head_entity'],
+                    LABELS.get(row['head_entity_label'], 'Entity'),
+                    row['relation'],
+                    row['tail_entity'],
+                    LABELS.get(row['tail_entity_label'], 'Entity'),
+                    row['context']
+                )
+
+        self._handlers = {
+            normalize_query(ENTITY_LEXICON_QUERY): self._entity_lexicon,
+            normalize_query(ALL_RELATIONS_QUERY): self._all_relations,
+            normalize_query(NEIGHBORHOOD_QUERY): self._neighborhood,
+            normalize_query(TYPED_NEIGHBORHOOD_QUERY): self._typed_neighborhood,
+            normalize_query(RANKED_NEIGHBORHOOD_QUERY): self._ranked_neighborhood,
+            normalize_query(ENTITY_DEGREE_QUERY): self._entity_degree,
+            normalize_query(SENTENCES_QUERY): self._sentences,
+            normalize_query(CONTEXT_EDGES_QUERY): self._context_edges,
+            normalize_query(GRAPH_VERSION_QUERY): self._graph_version
+        }
+
+    def add_edge(self, head: str, head_label: str, relation: str, tail: str, tail_label: str, context: str) -> None:
+        for name, label in ((head, head_label), (tail, tail_label)):
+            labels = self.nodes.setdefault(name, [])
+            if label not in labels:
+                labels.append(label)
+        cid = context_id(context)
+        if self.sentence_nodes:
+            self.sentences[cid] = context
+            context = None
+        edge = {'head': head, 'relation': relation, 'tail': tail, 'context': context, 'context_id': cid}
+        self.edges.append(edge)
+        self.outgoing.setdefault(head, []).append(edge)
+        self.incoming.setdefault(tail, []).append(edge)
+        self.by_context.setdefault(cid, []).append(edge)
+
+    def query(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict]:
+        if self.latency:
+            time.sleep(self.latency)
+        handler = self._handlers.get(normalize_query(query))
+        if handler is None:
+            raise ValueError(f"InMemoryGraph 不支持该查询:\n{query}")
+        return handler(params or {})
+
+    def _entity_lexicon(self, params: Dict) -> List[Dict]:
+        return [{'name': name, 'labels': labels} for name, labels in self.nodes.items()]
+
+    def _all_relations(self, params: Dict) -> List[Dict]:
+        return [
+            {'entity1': e['head'], 'relation': e['relation'], 'entity2': e['tail'],
+             'context': e['context'] if e['context'] is not None else self.sentences.get(e['context_id'])}
+            for e in self.edges
+        ]
+
+    def _neighborhood(self, params: Dict, out_types=None, in_types=None) -> List[Dict]:
+        name = params['name']
+        results = [
+            {'entity1': name, 'relation': e['relation'], 'entity2': e['tail'], 'context': e['context'],
+             'context_id': e['context_id'], 'direction': 'out', 'importance': self.pagerank.get(e['tail'], 0.0)}
+            for e in self.outgoing.get(name, [])
+            if out_types is None or e['relation'] in out_types
+        ]
+        results += [
+            {'entity1': name, 'relation': e['relation'], 'entity2': e['head'], 'context': e['context'],
+             'context_id': e['context_id'], 'direction': 'in', 'importance': self.pagerank.get(e['head'], 0.0)}
+            for e in self.incoming.get(name, [])
+            if in_types is None or e['relation'] in in_types
+        ]
+        # UNION 会去除重复行
+        unique = {tuple(r.values()): r for r in results}
+        return list(unique.values())
+
+    def _typed_neighborhood(self, params: Dict) -> List[Dict]:
+        return self._neighborhood(params, set(params['out_types']), set(params['in_types']))
+
+    def _ranked_neighborhood(self, params: Dict) -> List[Dict]:
+        out_types = set(params['out_types']) if params.get('out_types') is not None else None
+        in_types = set(params['in_types']) if params.get('in_types') is not None else None
+        results = self._neighborhood(params, out_types, in_types)
+        results.sort(key=lambda r: -r['importance'])
+        return results[params['skip']:params['skip'] + params['limit']]
+
+    def _entity_degree(self, params: Dict) -> List[Dict]:
+        return [
+            {
+                'name': name,
+                'labels': labels,
+                'degree': len(self.outgoing.get(name, [])) + len(self.incoming.get(name, []))
+            }
+            for name, labels in self.nodes.items()
+        ]
+
+    def _sentences(self, params: Dict) -> List[Dict]:
+        return [{'id': cid, 'text': self.sentences[cid]} for cid in params['ids'] if cid in self.sentences]
+
+    def _context_edges(self, params: Dict) -> List[Dict]:
+        return [
+            {'entity1': e['head'], 'relation': e['relation'], 'entity2': e['tail'], 'context': e['context'],
+             'context_id': e['context_id'], 'direction': 'out', 'importance': self.pagerank.get(e['tail'], 0.0)}
+            for cid in dict.fromkeys(params['ids'])
+            for e in self.by_context.get(cid, [])
+        ]
+
+    def _graph_version(self, params: Dict) -> List[Dict]:
+        return [{'version': self.version}]
+
+
+class StubChatModel(SimpleChatModel):
+    """返回固定格式回答的对话模型，回答中列出收到的史料条数"""
+
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = "\n".join(str(m.content) for m in messages)
+        evidence = prompt.count("之间的关系是")
+        return f"根据史料记载（测试桩），共检索到 {evidence} 条相关史料。"
+
+
+class StubEmbeddings(Embeddings):
+    """基于文本哈希的确定性向量模型"""
+
+    def __init__(self, size: int = 64, latency: float = 0.0):
+        self.size = size
+        self.latency = latency
+
+    def _embed(self, text: str) -> List[float]:
+        digest = hashlib.sha256(text.encode('utf-8')).digest()
+        while len(digest) < self.size:
+            digest += hashlib.sha256(digest).digest()
+        return [b / 255.0 for b in digest[:self.size]]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._embed(text)
@@ -0,0 +1,25 @@
+# conftest.py
+# 测试使用 stubs 中的内存图谱和模型桩，无需Neo4j和OpenAI
+import csv
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+TRIPLE_FIELDS = ['head_entity', 'head_entity_label', 'relation', 'tail_entity', 'tail_entity_label', 'context']
+
+
+@pytest.fixture
+def write_triples(tmp_path):
+    """将 (头实体, 头标签, 关系, 尾实体, 尾标签, 原文) 写为 json_to_csv 格式的三元组CSV，返回路径"""
+    def write(rows: List[Tuple[str, str, str, str, str, str]], name: str = "triples.csv") -> str:
+        path = tmp_path / name
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(TRIPLE_FIELDS)
+            writer.writerows(rows)
+        return str(path)
+    return write
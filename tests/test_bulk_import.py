@@ -0,0 +1,43 @@
+# test_bulk_import.py
+import pandas as pd
+
+from bulk_import import write_bulk_import_files, verify_bulk_import_files
+from conftest import TRIPLE_FIELDS
+
+TRIPLES = [
+    ('段文', 'PER', '父母', '裕', 'PER', '段文生裕。'),
+    ('裕', 'PER', '驻守', '幽州', 'LOC', '裕镇幽州。')
+]
+
+
+def _write(output_dir, triples=TRIPLES):
+    from Create_KG import KnowledgeGraphCreator
+    return write_bulk_import_files(
+        pd.DataFrame(triples, columns=TRIPLE_FIELDS),
+        str(output_dir),
+        KnowledgeGraphCreator.ENTITY_LABEL_MAP,
+        KnowledgeGraphCreator.RELATION_COLOR_MAP,
+        KnowledgeGraphCreator.GRAPH_META_LABEL,
+        sentence_label=KnowledgeGraphCreator.SENTENCE_LABEL
+    )
+
+
+def test_verify_ignores_stale_files_from_previous_export(tmp_path):
+    # 上次导出包含官衔节点，本次没有；遗留的 nodes_OFI.csv 与本次节点ID重复
+    _write(tmp_path, TRIPLES + [('裕', 'PER', '任职', '刺史', 'OFI', '裕为刺史。')])
+    (tmp_path / "nodes_OFI.csv").write_text('"id:ID","name","color",":LABEL"\n"人物:裕","裕","#000","人物"\n', encoding='utf-8')
+    files = _write(tmp_path)
+    assert tmp_path / "nodes_OFI.csv" not in files['nodes']
+
+    result = verify_bulk_import_files(files)
+    assert result['errors'] == []
+    assert result['nodes'] == 3 + 1 + 2  # 实体、元数据节点、句子
+    assert result['relationships'] == 2
+
+
+def test_verify_reports_missing_endpoint(tmp_path):
+    files = _write(tmp_path)
+    nodes_loc = next(path for path in files['nodes'] if path.name == "nodes_LOC.csv")
+    files['nodes'].remove(nodes_loc)
+    errors = verify_bulk_import_files(files)['errors']
+    assert errors and all("幽州" in error for error in errors)
@@ -0,0 +1,78 @@
+# test_cassette.py
+import numpy as np
+import pytest
+
+from cassette import (
+    CassetteMiss,
+    CassetteStore,
+    CassetteChatModel,
+    CassetteEmbeddings,
+    chat_model_params,
+    embedding_model_params,
+    AUTO,
+    RECORD,
+    REPLAY
+)
+from stubs import StubChatModel, StubEmbeddings
+
+
+class ConfiguredChatModel(StubChatModel):
+    """带模型名称和温度参数的测试桩"""
+
+    model_name: str = "stub-model"
+    temperature: float = 0
+
+
+QUESTION = "裕的父母是谁"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CassetteStore(str(tmp_path / "cassette.sqlite"))
+    CassetteChatModel(store=store, inner=ConfiguredChatModel(), mode=RECORD).invoke(QUESTION)
+    return store
+
+
+def test_replay_with_same_model_params(store):
+    expected = ConfiguredChatModel().invoke(QUESTION).content
+    assert CassetteChatModel(store=store, inner=ConfiguredChatModel(), mode=REPLAY).invoke(QUESTION).content == expected
+    # 回放时不提供模型，直接给出录制时的模型参数
+    params = {"type": "stub-chat", "model_name": "stub-model", "temperature": 0.0}
+    assert chat_model_params(ConfiguredChatModel()) == params
+    assert CassetteChatModel(store=store, params=params).invoke(QUESTION).content == expected
+
+
+@pytest.mark.parametrize("model", [
+    ConfiguredChatModel(temperature=0.7),
+    ConfiguredChatModel(model_name="other-model"),
+    StubChatModel()
+])
+def test_replay_misses_for_different_model(store, model):
+    with pytest.raises(CassetteMiss):
+        CassetteChatModel(store=store, inner=model, mode=REPLAY).invoke(QUESTION)
+
+
+def test_replay_without_model_requires_params(store):
+    with pytest.raises(ValueError):
+        CassetteChatModel(store=store, mode=REPLAY)
+
+
+def test_embedding_key_includes_model(tmp_path):
+    store = CassetteStore(str(tmp_path / "cassette.sqlite"))
+    CassetteEmbeddings(store, StubEmbeddings(size=64), RECORD).embed_documents(["裕", "段文"])
+    # 录制的向量以float32保存
+    recorded = np.asarray(StubEmbeddings(size=64).embed_documents(["裕", "段文"]), dtype=np.float32).tolist()
+    assert embedding_model_params(StubEmbeddings(size=64)) == {"type": "StubEmbeddings", "size": 64}
+
+    # 同一模型：回放命中；不提供模型时按参数回放
+    assert CassetteEmbeddings(store, StubEmbeddings(size=64), REPLAY).embed_documents(["裕", "段文"]) == recorded
+    params = {"type": "StubEmbeddings", "size": 64}
+    assert CassetteEmbeddings(store, params=params).embed_documents(["裕"]) == recorded[:1]
+    with pytest.raises(ValueError):
+        CassetteEmbeddings(store, mode=REPLAY)
+
+    # 换用其他维度的模型：回放未命中，自动模式整批重新计算，不混用旧向量
+    with pytest.raises(CassetteMiss):
+        CassetteEmbeddings(store, StubEmbeddings(size=32), REPLAY).embed_documents(["裕"])
+    vectors = CassetteEmbeddings(store, StubEmbeddings(size=32), AUTO).embed_documents(["裕", "李克"])
+    assert {len(vector) for vector in vectors} == {32}
@@ -0,0 +1,44 @@
+# test_entity_typeahead.py
+import pytest
+
+from entity_typeahead import EntityTypeahead
+
+ENTITIES = [
+    ('劉裕', '人物', 30),
+    ('劉仁恭', '人物', 20),
+    ('裕', '人物', 10),
+    ('誰', '人物', 1),
+    ('幽州', '地点', 15)
+]
+
+
+@pytest.fixture
+def index():
+    return EntityTypeahead.build(ENTITIES, graph_version=3)
+
+
+def test_complete_prefers_longest_fragment(index):
+    fragment, suggestions = index.complete("刘仁")
+    assert fragment == "刘仁"
+    assert [s['name'] for s in suggestions] == ['劉仁恭']
+
+
+@pytest.mark.parametrize("text", ["裕的父母是谁", "幽州在哪"])
+def test_single_character_fragment_not_completed_mid_word(index, text):
+    assert index.complete(text) == ("", [])
+
+
+@pytest.mark.parametrize("text", ["裕", "李克的裕", "问一下：裕"])
+def test_single_character_fragment_completed_after_delimiter(index, text):
+    fragment, suggestions = index.complete(text)
+    assert fragment == "裕"
+    assert suggestions[0]['name'] == '裕'
+
+
+def test_load_rejects_stale_index(index, tmp_path):
+    path = str(tmp_path / "typeahead.npz")
+    index.save(path)
+    assert EntityTypeahead.load(path).graph_version == 3
+    assert len(EntityTypeahead.load(path, graph_version=3)) == len(ENTITIES)
+    with pytest.raises(ValueError, match="过期"):
+        EntityTypeahead.load(path, graph_version=4)
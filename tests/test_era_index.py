@@ -0,0 +1,67 @@
+# test_era_index.py
+import pandas as pd
+import pytest
+
+from conftest import TRIPLE_FIELDS
+from era_index import EraIndex
+from kg_queries import normalize_query
+from stubs import InMemoryGraph, StubChatModel, StubEmbeddings
+
+TRIPLES = [
+    ('李克', 'PER', '驻守', '幽州', 'LOC', '会昌三年，李克镇幽州。'),
+    ('王建', 'PER', '任职', '刺史', 'OFI', '会昌五年乙丑，王建为刺史。'),
+    ('裕', 'PER', '任职', '刺史', 'OFI', '裕为刺史。'),
+    ('段文', 'PER', '父母', '裕', 'PER', '乙丑，段文生裕。')
+]
+
+
+def _index(graph_version=1):
+    return EraIndex.build(pd.DataFrame(TRIPLES, columns=TRIPLE_FIELDS), graph_version=graph_version)
+
+
+def test_ganzhi_indexed_only_with_era():
+    index = _index()
+    assert index.keys == ['会昌', '会昌:乙丑']
+    assert index.detect("会昌年间有哪些刺史") == ['会昌']
+    assert index.detect("会昌五年乙丑发生了什么") == ['会昌:乙丑']
+    assert index.detect("乙丑年发生了什么") == []
+
+
+@pytest.fixture
+def qa(write_triples, tmp_path):
+    from RAG import HistoricalQA
+    path = str(tmp_path / "era_index.npz")
+    _index().save(path)
+    graph = InMemoryGraph(write_triples(TRIPLES), sentence_nodes=True)
+    return HistoricalQA(
+        graph, llm=StubChatModel(), embedding_model=StubEmbeddings(),
+        neighborhood_cache_size=0, era_index=path
+    )
+
+
+def test_period_edges_fetched_in_one_query(qa, monkeypatch):
+    queries = []
+    query = qa.graph.query
+    monkeypatch.setattr(qa.graph, 'query', lambda q, params=None: queries.append(normalize_query(q)) or query(q, params))
+
+    names, results = qa._retrieve("会昌年间发生了什么")
+    assert names == ['会昌']
+    assert len(queries) == 2  # 该时期的关系 + 句子原文
+    assert {(r['entity1'], r['entity2']) for r in results} == {('李克', '幽州'), ('王建', '刺史')}
+    assert all(r['context'].startswith('会昌') for r in results)
+
+    # 问题实体只用于在本地筛选
+    queries.clear()
+    names, results = qa._retrieve("会昌年间李克驻守何处")
+    assert '李克' in names
+    assert [(r['entity1'], r['entity2']) for r in results] == [('李克', '幽州')]
+    assert len(queries) == 2
+
+
+def test_stale_index_dropped(write_triples, tmp_path):
+    from RAG import HistoricalQA
+    path = str(tmp_path / "era_index.npz")
+    _index(graph_version=1).save(path)
+    graph = InMemoryGraph(write_triples(TRIPLES), version=2, sentence_nodes=True)
+    qa = HistoricalQA(graph, llm=StubChatModel(), embedding_model=StubEmbeddings(), era_index=path)
+    assert qa.era_index is None
@@ -0,0 +1,85 @@
+# test_fast_path.py
+import pytest
+
+from fast_path import OneHopFastPath
+from query_planner import RelationFilter, RelationQueryPlanner
+from stubs import InMemoryGraph, StubChatModel, StubEmbeddings
+
+# 父母 关系的头实体为父/母；上下级 关系的头实体为上级
+TRIPLES = [
+    ('段文', 'PER', '父母', '裕', 'PER', '段文生裕。'),
+    ('裕', 'PER', '任职', '刺史', 'OFI', '裕为刺史。'),
+    ('裕', 'PER', '上下级', '李克', 'PER', '裕以李克为部将。'),
+    ('王建', 'PER', '上下级', '裕', 'PER', '王建以裕为部将。'),
+    ('李克', 'PER', '父母', '李成', 'PER', '李克生李成。')
+]
+
+
+@pytest.fixture
+def qa(write_triples):
+    from RAG import HistoricalQA
+    graph = InMemoryGraph(write_triples(TRIPLES))
+    return HistoricalQA(graph, llm=StubChatModel(), embedding_model=StubEmbeddings(), max_neighbors=50)
+
+
+def test_parent_question_answered_from_graph(qa):
+    answer = qa.answer_question("裕的父母是谁")
+    assert answer.startswith("根据史料记载，裕的父母为段文。")
+    assert "段文生裕。" in answer
+
+
+@pytest.mark.parametrize("question", [
+    "为什么史书只记载了裕的父母是谁",   # 原因类问法
+    "裕、李克的父母是谁",               # 两个实体
+    "裕的父母和下属是谁",               # 两种关系意图
+])
+def test_complex_questions_fall_back(qa, question):
+    entities, _, plan = qa._analyze(question)
+    assert qa.fast_path.match(question, entities, plan) is None
+    assert qa._answer_fast(question) is None
+
+
+def test_asymmetric_relation_in_both_directions_falls_back(qa):
+    # "君臣" 同时检索 上下级 的两个方向，裕既是上级又是下级，无法套用单一模板
+    assert qa._answer_fast("裕的君臣有谁") is None
+
+
+def test_answer_rejects_both_directions_of_asymmetric_relation():
+    fast_path = OneHopFastPath(RelationQueryPlanner())
+    relation_filter = RelationFilter(frozenset({'上下级'}), frozenset({'上下级'}))
+    results = [
+        {'entity1': '裕', 'relation': '上下级', 'entity2': '李克', 'context': '', 'direction': 'out'},
+        {'entity1': '裕', 'relation': '上下级', 'entity2': '王建', 'context': '', 'direction': 'in'}
+    ]
+    assert fast_path.answer('裕', relation_filter, results) is None
+    assert fast_path.answer('裕', relation_filter, results[:1]).startswith("根据史料记载，裕的下属有李克")
+
+
+class RecordingQueue:
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, job):
+        self.jobs.append(job)
+
+
+class FakeLangfuse:
+    def __init__(self):
+        self.traces = []
+
+    def trace(self, **kwargs):
+        self.traces.append(kwargs)
+        return type("Trace", (), {"id": f"trace-{len(self.traces)}"})()
+
+
+def test_fast_path_answers_are_evaluated(qa):
+    qa.eval_queue = RecordingQueue()
+    qa.langfuse = FakeLangfuse()
+
+    answer = qa.answer_question("裕的父母是谁", session_id="s1")
+    [job] = qa.eval_queue.jobs
+    assert job.answer == answer
+    assert job.contexts == ["段文生裕。"]
+    assert job.trace_id == "trace-1"
+    assert job.session_id == "s1"
+    assert qa.langfuse.traces[0]["output"] == answer
@@ -0,0 +1,58 @@
+# test_model_dispatcher.py
+import threading
+
+from model_dispatcher import ModelDispatcher
+from stubs import InMemoryGraph, StubChatModel, StubEmbeddings
+
+
+class CountingEmbeddings(StubEmbeddings):
+    """记录每次批量调用收到的文本"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return super().embed_documents(texts)
+
+
+def test_sessions_share_one_batcher(write_triples):
+    from RAG import HistoricalQA
+    provider = CountingEmbeddings()
+    dispatcher = ModelDispatcher(embedding_window=0.2)
+    graph = InMemoryGraph(write_triples([('段文', 'PER', '父母', '裕', 'PER', '段文生裕。')]))
+    sessions = [
+        HistoricalQA(graph, llm=StubChatModel(), embedding_model=provider, dispatcher=dispatcher)
+        for _ in range(2)
+    ]
+    assert sessions[0].embedding_model is sessions[1].embedding_model
+
+    # 两个会话并发请求向量，在同一窗口内合并为一次调用
+    barrier = threading.Barrier(2)
+    results = {}
+
+    def ask(i):
+        barrier.wait()
+        results[i] = sessions[i].embedding_model.embed_documents([f"问题{i}", "共同的史料"])
+
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(provider.calls) == 1
+    assert sorted(provider.calls[0]) == sorted(["问题0", "问题1", "共同的史料"])
+    assert results[0][1] == results[1][1]
+    stats = dispatcher.stats()['embeddings']
+    assert stats['requests'] == 2
+    assert stats['provider_calls'] == 1
+    assert stats['provider_texts'] == 3
+
+
+def test_different_models_get_separate_batchers():
+    dispatcher = ModelDispatcher()
+    first, second = StubEmbeddings(), StubEmbeddings()
+    assert dispatcher.wrap_embeddings(first) is dispatcher.wrap_embeddings(first)
+    assert dispatcher.wrap_embeddings(first) is not dispatcher.wrap_embeddings(second)
@@ -0,0 +1,36 @@
+# test_sentence_nodes.py
+from embedding_artifact import context_id
+from kg_queries import SENTENCES_QUERY, normalize_query
+from stubs import InMemoryGraph, StubChatModel, StubEmbeddings
+
+TRIPLES = [
+    ('段文', 'PER', '父母', '裕', 'PER', '段文生裕。'),
+    ('裕', 'PER', '任职', '刺史', 'OFI', '裕为刺史。'),
+    ('裕', 'PER', '上下级', '李克', 'PER', '裕以李克为部将。'),
+    ('李克', 'PER', '任职', '刺史', 'OFI', '李克亦为刺史。')
+]
+
+
+def test_contexts_fetched_once_and_cached_by_id(write_triples, monkeypatch):
+    from RAG import HistoricalQA
+    graph = InMemoryGraph(write_triples(TRIPLES), sentence_nodes=True)
+    qa = HistoricalQA(graph, llm=StubChatModel(), embedding_model=StubEmbeddings(), relation_planning=False)
+
+    queries = []
+    query = graph.query
+    monkeypatch.setattr(graph, 'query', lambda q, params=None: queries.append(normalize_query(q)) or query(q, params))
+
+    names, results = qa._retrieve("裕和李克是什么关系")
+    assert {'裕', '李克'} <= set(names)
+    assert queries.count(normalize_query(SENTENCES_QUERY)) == 1
+    assert {r['context'] for r in results} == {text for *_, text in TRIPLES}
+
+    # 缓存中只保存 context_id，原文在每次检索后按编号补齐
+    expected = {(head, relation, tail): context_id(text) for head, _, relation, tail, _, text in TRIPLES}
+    for name in ('裕', '李克'):
+        cached = qa.neighborhood_cache.get(name)
+        assert cached
+        for r in cached:
+            edge = (name, r['relation'], r['entity2']) if r['direction'] == 'out' else (r['entity2'], r['relation'], name)
+            assert r['context'] is None
+            assert r['context_id'] == expected[edge]
@@ -0,0 +1,129 @@
+# test_sqlite_graph.py
+import pandas as pd
+import pytest
+
+from conftest import TRIPLE_FIELDS
+from kg_queries import (
+    NEIGHBORHOOD_QUERY,
+    TYPED_NEIGHBORHOOD_QUERY,
+    RANKED_NEIGHBORHOOD_QUERY,
+    SENTENCES_QUERY,
+    CONTEXT_EDGES_QUERY,
+    GRAPH_VERSION_QUERY
+)
+from stubs import InMemoryGraph
+
+TRIPLES = [
+    ('段文', 'PER', '父母', '裕', 'PER', '段文生裕。'),
+    ('裕', 'PER', '任职', '刺史', 'OFI', '裕为刺史。'),
+    ('裕', 'PER', '上下级', '李克', 'PER', '裕以李克为部将。'),
+    ('王建', 'PER', '上下级', '裕', 'PER', '王建以裕为部将。'),
+    ('裕', 'PER', '驻守', '幽州', 'LOC', '裕镇幽州。'),
+    ('李克', 'PER', '任职', '刺史', 'OFI', '李克亦为刺史。'),
+    ('李克', 'PER', '父母', '李成', 'PER', '李克生李成。')
+]
+
+
+def _rows(rows):
+    """忽略行顺序比较查询结果"""
+    return sorted(tuple(sorted((k, round(v, 9) if isinstance(v, float) else v) for k, v in r.items())) for r in rows)
+
+
+def _build(tmp_path, write_triples, triples, analytics=True):
+    from Create_KG import KnowledgeGraphCreator
+    creator = KnowledgeGraphCreator()
+    creator.connect_to_sqlite(str(tmp_path / "graph.sqlite"))
+    creator.create_knowledge_graph(pd.DataFrame(triples, columns=TRIPLE_FIELDS))
+    analytics_path = None
+    if analytics:
+        analytics_path = str(tmp_path / "graph_analytics.npz")
+        creator.compute_graph_analytics(analytics_path)
+    memory = InMemoryGraph(write_triples(triples), sentence_nodes=True, analytics_path=analytics_path)
+    return creator.graph, memory
+
+
+@pytest.fixture
+def graphs(tmp_path, write_triples):
+    return _build(tmp_path, write_triples, TRIPLES)
+
+
+@pytest.mark.parametrize("name", ['裕', '李克', '刺史', '不存在'])
+def test_neighborhood_matches_in_memory(graphs, name):
+    sqlite, memory = graphs
+    params = {'name': name}
+    assert _rows(sqlite.query(NEIGHBORHOOD_QUERY, params)) == _rows(memory.query(NEIGHBORHOOD_QUERY, params))
+
+
+@pytest.mark.parametrize("out_types,in_types", [
+    (['上下级'], ['父母']),
+    ([], ['上下级']),      # 空的 IN () 列表不返回该方向的边
+    (['任职', '驻守'], []),
+    ([], [])
+])
+def test_typed_neighborhood_matches_in_memory(graphs, out_types, in_types):
+    sqlite, memory = graphs
+    params = {'name': '裕', 'out_types': out_types, 'in_types': in_types}
+    expected = _rows(memory.query(TYPED_NEIGHBORHOOD_QUERY, params))
+    assert _rows(sqlite.query(TYPED_NEIGHBORHOOD_QUERY, params)) == expected
+    if not out_types and not in_types:
+        assert expected == []
+
+
+def test_ranked_neighborhood_pages(graphs):
+    sqlite, memory = graphs
+    full = {'name': '裕', 'out_types': None, 'in_types': None, 'skip': 0, 'limit': 100}
+    assert _rows(sqlite.query(RANKED_NEIGHBORHOOD_QUERY, full)) == _rows(memory.query(RANKED_NEIGHBORHOOD_QUERY, full))
+
+    everything = _rows(sqlite.query(NEIGHBORHOOD_QUERY, {'name': '裕'}))
+    page = {**full, 'skip': 1, 'limit': 2}
+    sqlite_page = sqlite.query(RANKED_NEIGHBORHOOD_QUERY, page)
+    memory_page = memory.query(RANKED_NEIGHBORHOOD_QUERY, page)
+    assert len(sqlite_page) == len(memory_page) == 2
+    # 重要度相同的邻居在两个后端的先后顺序可以不同，只比较重要度
+    assert [round(r['importance'], 9) for r in sqlite_page] == [round(r['importance'], 9) for r in memory_page]
+    assert set(_rows(sqlite_page)) <= set(everything)
+    assert sqlite.query(RANKED_NEIGHBORHOOD_QUERY, {**full, 'skip': 10, 'limit': 2}) == []
+
+
+def test_sentences_match_in_memory(graphs):
+    sqlite, memory = graphs
+    ids = [r['context_id'] for r in sqlite.query(NEIGHBORHOOD_QUERY, {'name': '裕'})] + ['missing']
+    params = {'ids': ids}
+    assert _rows(sqlite.query(SENTENCES_QUERY, params)) == _rows(memory.query(SENTENCES_QUERY, params))
+    assert sqlite.query(SENTENCES_QUERY, {'ids': []}) == []
+
+
+def test_context_edges_match_in_memory(graphs):
+    sqlite, memory = graphs
+    ids = [r['context_id'] for r in sqlite.query(NEIGHBORHOOD_QUERY, {'name': '李克'})] + ['missing']
+    params = {'ids': ids}
+    rows = sqlite.query(CONTEXT_EDGES_QUERY, params)
+    assert len(rows) == 3
+    assert _rows(rows) == _rows(memory.query(CONTEXT_EDGES_QUERY, params))
+    assert sqlite.query(CONTEXT_EDGES_QUERY, {'ids': []}) == []
+
+
+def test_union_removes_duplicate_rows(tmp_path, write_triples):
+    # 同名不同类型的两个实体在邻域中产生完全相同的行，UNION 只保留一行
+    triples = TRIPLES + [
+        ('裕', 'PER', '到达', '建康', 'LOC', '裕至建康。'),
+        ('裕', 'PER', '到达', '建康', 'OFI', '裕至建康。')
+    ]
+    sqlite, memory = _build(tmp_path, write_triples, triples, analytics=False)
+    rows = sqlite.query(NEIGHBORHOOD_QUERY, {'name': '裕'})
+    assert sum(r['entity2'] == '建康' for r in rows) == 1
+    assert _rows(rows) == _rows(memory.query(NEIGHBORHOOD_QUERY, {'name': '裕'}))
+
+
+def test_import_bumps_graph_version(tmp_path):
+    from Create_KG import KnowledgeGraphCreator
+    creator = KnowledgeGraphCreator()
+    creator.connect_to_sqlite(str(tmp_path / "graph.sqlite"))
+    assert creator.graph.query(GRAPH_VERSION_QUERY) == []
+    df = pd.DataFrame(TRIPLES, columns=TRIPLE_FIELDS)
+    creator.create_knowledge_graph(df)
+    assert creator.graph.query(GRAPH_VERSION_QUERY) == [{'version': 1}]
+    # 清空数据不重置版本号，重新导入后版本递增
+    creator.clear_database()
+    creator.create_knowledge_graph(df)
+    assert creator.graph.query(GRAPH_VERSION_QUERY) == [{'version': 2}]
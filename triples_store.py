@@ -0,0 +1,108 @@
+# triples_store.py
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+# 以字典编码存储的列（取值重复度高）
+DICTIONARY_COLUMNS = [
+    'head_entity',
+    'head_entity_label',
+    'relation',
+    'tail_entity',
+    'tail_entity_label'
+]
+
+
+def contexts_path(path: str) -> Path:
+    """句子表与三元组表放在同一目录，文件名加 _contexts 后缀"""
+    path = Path(path)
+    return path.with_name(f"{path.stem}_contexts{path.suffix}")
+
+
+def write_triples_parquet(df: pd.DataFrame, path: str, row_group_size: int = 2048) -> None:
+    """
+    以列式格式写出三元组
+    Args:
+        df: json_to_csv 生成的三元组DataFrame
+        path: 三元组表路径，句子表写在同目录的 *_contexts.parquet
+        row_group_size: 每个行组的行数，决定流式读取的粒度
+    """
+    # 每个句子只存一次，三元组表中以整数ID引用
+    context_codes, contexts = pd.factorize(df['context'])
+
+    columns = {
+        col: pa.array(df[col].astype(str)).dictionary_encode()
+        for col in DICTIONARY_COLUMNS
+    }
+    columns['context_id'] = pa.array(context_codes, type=pa.int32())
+    pq.write_table(
+        pa.table(columns),
+        path,
+        row_group_size=row_group_size,
+        compression='zstd'
+    )
+
+    contexts_table = pa.table({
+        'context_id': pa.array(range(len(contexts)), type=pa.int32()),
+        'context': pa.array(contexts.astype(str))
+    })
+    pq.write_table(contexts_table, contexts_path(path), compression='zstd')
+
+
+def read_contexts(path: str) -> pd.Index:
+    """读取句子表，返回按ID排列的句子"""
+    table = pq.read_table(contexts_path(path))
+    return pd.Index(table.column('context').to_pylist())
+
+
+def _attach_context(df: pd.DataFrame, contexts: pd.Index) -> pd.DataFrame:
+    """将句子ID还原为句子列（分类类型，不复制句子文本）"""
+    df['context'] = pd.Categorical.from_codes(df['context_id'].to_numpy(), categories=contexts)
+    return df
+
+
+def read_triples_parquet(
+    path: str,
+    columns: Optional[List[str]] = None,
+    with_context: bool = True
+) -> pd.DataFrame:
+    """
+    读取列式三元组，字典编码列还原为pandas分类类型
+    Args:
+        path: 三元组表路径
+        columns: 只读取指定列
+        with_context: 是否还原句子列
+    """
+    read_columns = None
+    if columns is not None:
+        read_columns = [c for c in columns if c != 'context']
+        if with_context and 'context_id' not in read_columns:
+            read_columns.append('context_id')
+    df = pq.read_table(path, columns=read_columns).to_pandas()
+    if with_context:
+        df = _attach_context(df, read_contexts(path))
+    return df
+
+
+def iter_triples_parquet(
+    path: str,
+    batch_size: int = 2048,
+    columns: Optional[List[str]] = None,
+    with_context: bool = True
+) -> Iterator[pd.DataFrame]:
+    """按行组流式读取三元组，内存占用与批大小成正比"""
+    contexts = read_contexts(path) if with_context else None
+    read_columns = None
+    if columns is not None:
+        read_columns = [c for c in columns if c != 'context']
+        if with_context and 'context_id' not in read_columns:
+            read_columns.append('context_id')
+
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=read_columns):
+        df = batch.to_pandas()
+        if with_context:
+            df = _attach_context(df, contexts)
+        yield df